@@ -0,0 +1,337 @@
+# Non-interactive batch runs: normalize every table listed in a manifest, several at a time,
+# without the prompts of main. The manifest is a CSV with one job per row and the columns
+#
+#   table   the input CSV
+#   fds     the FD file, or "discover" / "hybrid" to mine the FDs from the data
+#   mvds    the MVD file, optional
+#   form    the normal form to reach: 1, 2, 3, S, B, 4 or 5
+#   key     the primary key, as "A, B", optional (found from the FDs when empty)
+#   multivalued  the multivalued attributes, as "A, B", optional
+#   name    the name of the job and of its input relation, optional (the table's file name)
+#
+# Relative paths are taken from the manifest's directory. Each job runs in a process of its
+# own so it can be stopped at its timeout, and writes its printed log, its output.txt and
+# the data files of its relations (see writers.py) to a directory named after it. A summary
+# of every job is printed and written as summary.csv.
+#
+#   python batch.py jobs.csv --output-dir out --workers 4 --timeout 600
+import argparse
+import contextlib
+import csv
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from multiprocessing.connection import wait
+
+import main
+from normalizer import update_relationNames
+from writers import HAS_PYARROW, WRITERS
+
+FORMS = ["1", "2", "3", "S", "B", "4", "5"]
+SUMMARY_FIELDS = ["name", "status", "seconds", "rows", "rows_per_second", "relations"]
+
+
+class Job:
+    def __init__(
+        self,
+        name: str,
+        table: str,
+        FDs: str,
+        MVDs: str,
+        form: str,
+        key: list[str],
+        mvAttributes: list[str],
+    ):
+        self.name = name  # Name of the job, its output directory and its input relation
+        self.table = table  # Path of the input CSV
+        self.FDs = FDs  # Path of the FD file, or "discover" / "hybrid"
+        self.MVDs = MVDs  # Path of the MVD file, or None
+        self.form = form  # Normal form to reach
+        self.key = key  # Primary key, or None to find it from the FDs
+        self.mvAttributes = mvAttributes  # Multivalued attributes, or None
+
+
+# Split a manifest cell listing attributes as "A, B", None when it is empty
+def attribute_list(cell: str) -> list[str]:
+    attributes = [a.strip() for a in (cell or "").split(",") if a.strip() != ""]
+    return attributes if len(attributes) > 0 else None
+
+
+# Read the jobs of a manifest, raising ValueError on a row that cannot be run
+def read_manifest(path: str) -> list[Job]:
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(cell: str) -> str:
+        return os.path.join(base, cell) if cell else None
+
+    jobs = []
+    names = set()
+    with open(path, newline="") as f:
+        for line, row in enumerate(csv.DictReader(f, skipinitialspace=True), start=2):
+            row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+            if not row.get("table") or not row.get("fds"):
+                raise ValueError(f"{path}:{line}: a job needs a table and an fds file")
+            form = row.get("form") or "B"
+            if form not in FORMS:
+                raise ValueError(
+                    f"{path}:{line}: form must be one of {', '.join(FORMS)}, not {form}"
+                )
+            name = (
+                row.get("name") or os.path.splitext(os.path.basename(row["table"]))[0]
+            )
+            # The name is the job's output directory, which must stay inside the output dir
+            if (
+                name in ["", ".", ".."]
+                or os.path.isabs(name)
+                or any(sep in name for sep in ["/", "\\"])
+            ):
+                raise ValueError(
+                    f"{path}:{line}: job name {name} must not be a path, give it a plain name"
+                )
+            if name in names:
+                raise ValueError(f"{path}:{line}: job name {name} is used twice")
+            names.add(name)
+            FDs = row["fds"]
+            jobs.append(
+                Job(
+                    name,
+                    resolve(row["table"]),
+                    FDs if FDs in ["discover", "hybrid"] else resolve(FDs),
+                    resolve(row.get("mvds")),
+                    form,
+                    attribute_list(row.get("key")),
+                    attribute_list(row.get("multivalued")),
+                )
+            )
+    return jobs
+
+
+# Normalize the table of one job, printing to the job's log. The rows of the relations go to
+# data files of the format in the job's relations directory, or into its output.txt when
+# the format is None. Returns the rows of the input table and the number of relations.
+def normalize_job(job: Job, directory: str, data_format: str) -> tuple[int, int]:
+    df = main.table_parser(job.table)
+    for attribute in (job.key or []) + (job.mvAttributes or []):
+        if attribute not in df.columns:
+            raise ValueError("Attribute " + attribute + " is not a column of the table")
+
+    FDs, MVDs = main.load_dependencies(df, job.table, job.FDs, job.MVDs)
+    Relations, hnf = main.normalize(
+        df, FDs, MVDs, job.form, job.key, job.mvAttributes, job.name
+    )
+    print("\n------------------------------------")
+    update_relationNames(Relations, rename=False)
+    main.write_output(
+        Relations,
+        job.form,
+        hnf,
+        os.path.join(directory, "output.txt"),
+        data_format,
+        os.path.join(directory, "relations") if data_format is not None else None,
+    )
+    return len(df), len(Relations)
+
+
+# Run a job in a worker process and send its result back through the connection
+def run_job(
+    job: Job, directory: str, connection, discovery_workers: int, data_format: str
+):
+    main.DISCOVERY_WORKERS = discovery_workers
+    result = {"status": "ok", "rows": None, "relations": None, "error": None}
+    with open(os.path.join(directory, "log.txt"), "w") as log:
+        with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+            try:
+                result["rows"], result["relations"] = normalize_job(
+                    job, directory, data_format
+                )
+            except Exception as error:
+                traceback.print_exc()
+                result["status"] = "failed"
+                result["error"] = type(error).__name__ + ": " + str(error)
+    connection.send(result)
+    connection.close()
+
+
+# Run the jobs with at most workers of them at a time, stopping any job still running after
+# timeout seconds. Every job gets its own process, which is what lets a job that runs over
+# be terminated without losing the others. Returns a summary row for every job, in the
+# order of the jobs.
+def run_jobs(
+    jobs: list[Job],
+    output_dir: str,
+    workers: int,
+    timeout: float,
+    discovery_workers: int = 1,
+    data_format: str = main.OUTPUT_FORMAT,
+) -> list[dict]:
+    pending = list(enumerate(jobs))
+    running = {}  # Sentinel -> (index, job, process, connection, start)
+    results = [None] * len(jobs)
+
+    def finish(sentinel, status: str = None):
+        index, job, process, connection, start = running.pop(sentinel)
+        seconds = time.perf_counter() - start
+        result = {"status": "failed", "rows": None, "relations": None, "error": None}
+        if status is not None:
+            result["status"] = status
+            result["error"] = "stopped after " + str(timeout) + " seconds"
+        elif connection.poll():
+            result = connection.recv()
+        else:
+            result["error"] = "worker exited with code " + str(process.exitcode)
+        connection.close()
+        rows = result["rows"]
+        results[index] = {
+            "name": job.name,
+            "status": result["status"],
+            "seconds": round(seconds, 3),
+            "rows": rows,
+            "rows_per_second": int(rows / seconds) if rows and seconds > 0 else None,
+            "relations": result["relations"],
+            "error": result["error"],
+        }
+        print(
+            "[" + str(sum(r is not None for r in results)) + "/" + str(len(jobs)) + "]",
+            job.name,
+            result["status"],
+            "in",
+            round(seconds, 3),
+            "s",
+            "(" + result["error"] + ")" if result["error"] else "",
+        )
+
+    while pending or running:
+        while pending and len(running) < workers:
+            index, job = pending.pop(0)
+            directory = os.path.join(output_dir, job.name)
+            os.makedirs(directory, exist_ok=True)
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=run_job,
+                args=(job, directory, sender, discovery_workers, data_format),
+                name="normalize-" + job.name,
+            )
+            process.start()
+            sender.close()
+            running[process.sentinel] = (
+                index,
+                job,
+                process,
+                receiver,
+                time.perf_counter(),
+            )
+
+        # Wait for a job to end or for the earliest timeout
+        now = time.perf_counter()
+        deadline = min(start + timeout for _, _, _, _, start in running.values())
+        for sentinel in wait(list(running), timeout=max(0.0, deadline - now)):
+            running[sentinel][2].join()
+            finish(sentinel)
+        now = time.perf_counter()
+        for sentinel, (_, _, process, _, start) in list(running.items()):
+            if now - start >= timeout:
+                process.terminate()
+                process.join()
+                finish(sentinel, "timeout")
+
+    return results
+
+
+# Print the summary of the jobs and write it as a CSV
+def write_summary(results: list[dict], path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS + ["error"])
+        writer.writeheader()
+        writer.writerows(results)
+
+    print()
+    print(
+        f"{'job':<24} {'status':>8} {'seconds':>10} {'rows':>10} {'rows/s':>10} {'relations':>9}"
+    )
+    for result in results:
+        row = {k: "" if v is None else v for k, v in result.items()}
+        print(
+            f"{row['name']:<24} {row['status']:>8} {row['seconds']:>10} {row['rows']:>10} {row['rows_per_second']:>10} {row['relations']:>9}"
+        )
+    done = sum(result["status"] == "ok" for result in results)
+    print(
+        "\n" + str(done),
+        "of",
+        len(results),
+        "jobs normalized, summary written to",
+        path,
+    )
+
+
+def parse_arguments(arguments: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Normalize every table listed in a manifest CSV, without prompts."
+    )
+    parser.add_argument("manifest", help="CSV of jobs: table, fds, mvds, form, key")
+    parser.add_argument(
+        "--output-dir",
+        default="batch_output",
+        help="directory for the outputs and logs of the jobs (default: batch_output)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="jobs run at the same time (default: the number of CPUs)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=600.0,
+        help="seconds before a job is stopped (default: 600)",
+    )
+    parser.add_argument(
+        "--discovery-workers",
+        type=int,
+        default=1,
+        help="processes each job uses to discover FDs (default: 1)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(WRITERS) + ["text"],
+        default=main.OUTPUT_FORMAT or "text",
+        help="files the rows of the relations are written to, or text to print them"
+        " into output.txt (default: " + (main.OUTPUT_FORMAT or "text") + ")",
+    )
+    arguments = parser.parse_args(arguments)
+    if arguments.workers < 1 or arguments.discovery_workers < 1:
+        parser.error("--workers and --discovery-workers must be at least 1")
+    if arguments.timeout <= 0:
+        parser.error("--timeout must be positive")
+    if arguments.format == "parquet" and not HAS_PYARROW:
+        parser.error("--format parquet requires pyarrow")
+    return arguments
+
+
+def batch_main(arguments: list[str] = None) -> int:
+    arguments = parse_arguments(arguments)
+    try:
+        jobs = read_manifest(arguments.manifest)
+    except (OSError, ValueError) as error:
+        print(error, file=sys.stderr)
+        return 2
+
+    os.makedirs(arguments.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    results = run_jobs(
+        jobs,
+        arguments.output_dir,
+        arguments.workers,
+        arguments.timeout,
+        arguments.discovery_workers,
+        arguments.format if arguments.format != "text" else None,
+    )
+    write_summary(results, os.path.join(arguments.output_dir, "summary.csv"))
+    print("Total wall time:", round(time.perf_counter() - start, 3), "s")
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(batch_main())
@@ -0,0 +1,759 @@
+import itertools
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from chase import verify_decomposition
+from closure import ClosureEngine, candidate_keys
+from discovery import discover_FDs, discover_FDs_hybrid
+from form_finder import (
+    SuperkeyCache,
+    analyze_1NF,
+    classify,
+    group_codes,
+    is_superkey,
+)
+from ingest import CSV_OPTIONS, encode_table, read_table
+from join_dependencies import find_join_dependencies
+from validation import validate_FDs, validate_MVDs_data, verify_join
+from writers import write_relations
+from normalizer import (
+    FunctionalDependency,
+    MultiValuedDependency,
+    Relation,
+    decompose_1NF,
+    decompose_4NF,
+    decompose_BCNF,
+    minimal_cover,
+    project,
+    synthesize_3NF,
+    transform_to_3NF,
+)
+
+
+# Build a synthetic string-heavy table shaped like the normalizer inputs
+def synthetic_table(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "StudentID": np.arange(rows).astype(str),
+            "Course": rng.integers(0, 500, rows).astype(str),
+            "Professor": rng.integers(0, 200, rows).astype(str),
+            "classRoom": rng.integers(0, 50, rows).astype(str),
+        }
+    )
+
+
+# Build a wide integer table where every third column is a function of the two before it
+def synthetic_wide_table(rows: int, columns: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        if i % 3 == 2:
+            data["C" + str(i)] = (
+                data["C" + str(i - 2)] * 7 + data["C" + str(i - 1)]
+            ) % 97
+        else:
+            data["C" + str(i)] = rng.integers(0, 10 + 40 * i, rows)
+    return pd.DataFrame(data)
+
+
+# Time a callable over a few repeats and return the best wall time in seconds
+def best_time(func, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# The row-wise string join superkey check the normalizer used before group codes
+def legacy_is_superkey(df: pd.DataFrame, determinant: list[str]) -> bool:
+    df["combined"] = df[determinant].apply(
+        lambda row: " ".join(row.values.astype(str)), axis=1
+    )
+    is_unique = df["combined"].nunique() == len(df["combined"])
+    df.drop(columns=["combined"], inplace=True)
+    return is_unique
+
+
+# The string splitting fixpoint closure the normalizer used before the closure engine
+def legacy_find_closure(FDs, candidate):
+    closure = set(candidate)
+    changed = True
+    while changed:
+        changed = False
+        for FD in FDs:
+            determinant = FD.determinant.split(", ")
+            dependent = FD.dependent.split(", ")
+            if set(determinant).issubset(closure) and not set(dependent).issubset(
+                closure
+            ):
+                closure = closure.union(set(dependent))
+                changed = True
+    return closure
+
+
+# Build a random FD set over a wide schema
+def synthetic_FDs(attributes: int, count: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    names = ["A" + str(i) for i in range(attributes)]
+    FDs = []
+    for _ in range(count):
+        lhs = rng.choice(attributes, rng.integers(1, 4), replace=False)
+        rhs = rng.choice(attributes, rng.integers(1, 3), replace=False)
+        FDs.append(
+            FunctionalDependency(
+                ", ".join(names[i] for i in lhs)
+                + " -> "
+                + ", ".join(names[i] for i in rhs)
+            )
+        )
+    return names, FDs
+
+
+# Compare the legacy closure loop against the bitmask closure engine
+def bench_closure(shapes: list[tuple] = [(50, 200), (200, 2000), (400, 5000)]):
+    print("Attribute closure (microseconds per closure)")
+    print(
+        f"{'attributes':>10} {'FDs':>6} {'legacy':>12} {'bitmask':>10} {'speedup':>8}"
+    )
+    for attributes, count in shapes:
+        names, FDs = synthetic_FDs(attributes, count)
+        engine = ClosureEngine(FDs, names)
+        rng = np.random.default_rng(1)
+        candidates = [list(rng.choice(names, 3, replace=False)) for _ in range(20)]
+        masks = [engine.mask(candidate) for candidate in candidates]
+        for candidate in candidates:
+            assert legacy_find_closure(FDs, candidate) == engine.closure(candidate)
+
+        legacy = best_time(lambda: [legacy_find_closure(FDs, c) for c in candidates], 1)
+        fast = best_time(lambda: [engine.closure_mask(m) for m in masks])
+        legacy, fast = legacy / len(candidates) * 1e6, fast / len(candidates) * 1e6
+        print(
+            f"{attributes:>10} {count:>6} {legacy:>12.1f} {fast:>10.1f} {legacy / fast:>7.1f}x"
+        )
+    print()
+
+
+# Time candidate key enumeration on wide schemas
+def bench_candidate_keys(shapes: list[tuple] = [(50, 100), (200, 400), (300, 1000)]):
+    print("Candidate key enumeration (seconds, at most 64 keys)")
+    print(f"{'attributes':>10} {'FDs':>6} {'keys':>6} {'smallest':>9} {'seconds':>10}")
+    for attributes, count in shapes:
+        names, FDs = synthetic_FDs(attributes, count, seed=2)
+        keys = []
+        elapsed = best_time(lambda: keys.append(candidate_keys(FDs, names)), 1)
+        smallest = min(len(key) for key in keys[0])
+        print(
+            f"{attributes:>10} {count:>6} {len(keys[0]):>6} {smallest:>9} {elapsed:>10.4f}"
+        )
+    print()
+
+
+# Time the minimal cover stage on generated FD files
+def bench_minimal_cover(
+    shapes: list[tuple] = [(100, 1000), (300, 3000), (1000, 10000), (3000, 30000)]
+):
+    print("Minimal cover (seconds)")
+    print(f"{'attributes':>10} {'FDs':>6} {'cover':>6} {'removed':>8} {'seconds':>10}")
+    for attributes, count in shapes:
+        names, FDs = synthetic_FDs(attributes, count, seed=3)
+        result = []
+        elapsed = best_time(lambda: result.append(minimal_cover(FDs)), 1)
+        cover, removed = result[0]
+        print(
+            f"{attributes:>10} {count:>6} {len(cover):>6} {len(removed):>8} {elapsed:>10.4f}"
+        )
+    print()
+
+
+# Time TANE discovery on wide generated tables
+def bench_discovery(
+    shapes: list[tuple] = [(100_000, 9), (100_000, 15), (1_000_000, 9)]
+):
+    print("FD discovery, determinants of up to 3 attributes (seconds)")
+    print(f"{'rows':>10} {'columns':>8} {'FDs':>6} {'nodes':>7} {'seconds':>10}")
+    for rows, columns in shapes:
+        df = synthetic_wide_table(rows, columns)
+        FDs, stats = discover_FDs(df, max_lhs=3)
+        print(
+            f"{rows:>10} {columns:>8} {len(FDs):>6} {stats['nodes']:>7} {stats['seconds']:>10.4f}"
+        )
+    print()
+
+
+# Time parallel discovery against the serial run for increasing worker counts
+def bench_discovery_workers(rows: int = 500_000, columns: int = 15):
+    df = synthetic_wide_table(rows, columns)
+    serial, stats = discover_FDs(df, max_lhs=3)
+    print(f"Parallel FD discovery on {rows} rows x {columns} columns (seconds)")
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+    print(f"{'serial':>8} {stats['seconds']:>10.4f} {1:>7.1f}x")
+    workers = 2
+    while workers <= max(os.cpu_count() or 1, 2):
+        FDs, parallel = discover_FDs(df, max_lhs=3, workers=workers)
+        assert [fd.fd for fd in FDs] == [fd.fd for fd in serial]
+        speedup = stats["seconds"] / parallel["seconds"]
+        print(f"{workers:>8} {parallel['seconds']:>10.4f} {speedup:>7.1f}x")
+        workers *= 2
+    print()
+
+
+# Compare hybrid discovery over a streamed CSV against TANE on the loaded table
+def bench_hybrid(rows: int = 1_000_000, columns: int = 9):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "wide.csv")
+        synthetic_wide_table(rows, columns).to_csv(path, index=False)
+
+        start = time.perf_counter()
+        df = pd.read_csv(path, dtype=str)
+        exact, stats = discover_FDs(df, max_lhs=3)
+        tane = time.perf_counter() - start
+        del df
+
+        hybrid, phases = discover_FDs_hybrid(path, max_lhs=3)
+        assert sorted(fd.fd for fd in hybrid) == sorted(fd.fd for fd in exact)
+
+    print(f"Hybrid FD discovery on {rows} rows x {columns} columns")
+    print(f"  TANE, load and search:    {tane:.4f} s")
+    print(f"  hybrid, sample and stream: {phases['seconds']:.4f} s")
+    print(f"  sampled rows:        {phases['sample_rows']}")
+    print(f"  agree sets:          {phases['agree_sets']}")
+    print(f"  sample non-FDs:      {phases['sample_non_FDs']}")
+    print(f"  candidates:          {phases['candidates']}")
+    print(f"  candidates failed:   {phases['candidates_failed']}")
+    print(f"  validation passes:   {phases['validation_passes']}")
+    print()
+
+
+# Validate thousands of FDs that share determinants against a large table in one batch
+def bench_validate_FDs(rows: int = 1_000_000, columns: int = 20, count: int = 2000):
+    df = synthetic_wide_table(rows, columns)
+    rng = np.random.default_rng(4)
+    names = list(df.columns)
+    FDs = []
+    for _ in range(count):
+        lhs = rng.choice(columns, rng.integers(1, 3), replace=False)
+        rhs = rng.choice(
+            [i for i in range(columns) if i not in lhs],
+            rng.integers(1, 3),
+            replace=False,
+        )
+        FDs.append(
+            FunctionalDependency(
+                ", ".join(names[i] for i in lhs)
+                + " -> "
+                + ", ".join(names[i] for i in rhs)
+            )
+        )
+    relation = Relation(df, [], FDs, [], "Synthetic", None)
+    determinants = len(set(fd.determinant for fd in FDs))
+
+    start = time.perf_counter()
+    violations = validate_FDs(relation)
+    elapsed = time.perf_counter() - start
+    print(f"FD validation of {count} FDs ({determinants} determinants) on {rows} rows")
+    print(f"  {len(violations)} FDs violated, {elapsed:.4f} s")
+    print()
+
+
+# Check MVDs on a table built as a join of independent value lists, so some MVDs hold
+def bench_validate_MVDs(groups: int = 20_000, width: int = 8):
+    key = np.repeat(np.arange(groups), width * width)
+    df = pd.DataFrame(
+        {
+            "Course": key,
+            "Professor": np.tile(np.repeat(np.arange(width), width), groups) + key % 7,
+            "classRoom": np.tile(np.arange(width), groups * width),
+            "Term": key % 4,
+        }
+    )
+    MVDs = [
+        MultiValuedDependency("Course ->> Professor"),
+        MultiValuedDependency("Course ->> Professor, Term"),
+        MultiValuedDependency("Course ->> classRoom"),
+        MultiValuedDependency("Professor ->> Term"),
+    ]
+    relation = Relation(df, [], [], MVDs, "Synthetic", None)
+
+    start = time.perf_counter()
+    violations = validate_MVDs_data(relation)
+    elapsed = time.perf_counter() - start
+    print(f"MVD validation of {len(MVDs)} MVDs on {len(df)} rows")
+    print(f"  {len(violations)} MVDs violated, {elapsed:.4f} s")
+    print()
+
+
+# Build a table where the key determines several attributes that each determine another one
+def synthetic_star_table(
+    rows: int, pairs: int, seed: int = 6
+) -> tuple[pd.DataFrame, list[str]]:
+    rng = np.random.default_rng(seed)
+    data = {"ID": np.arange(rows)}
+    FDs = []
+    for i in range(pairs):
+        data["K" + str(i)] = rng.integers(0, 1000 * (i + 1), rows)
+        data["V" + str(i)] = data["K" + str(i)] % 97
+        FDs.append("ID -> K" + str(i))
+        FDs.append("K" + str(i) + " -> V" + str(i))
+    return pd.DataFrame(data), FDs
+
+
+# Compare splitting out transitive FDs one at a time against 3NF synthesis
+def bench_synthesis(rows: int = 200_000, pairs: int = 6):
+    df, FDs = synthetic_star_table(rows, pairs)
+
+    def relation():
+        return Relation(
+            df, ["ID"], [FunctionalDependency(fd) for fd in FDs], [], "Star", []
+        )
+
+    print(f"3NF decomposition of {pairs} transitive FDs on {rows} rows (seconds)")
+    split, synthesized = [], []
+    legacy = best_time(lambda: split.append(transform_to_3NF([relation()])), 1)
+    fast = best_time(lambda: synthesized.append(synthesize_3NF([relation()])), 1)
+    print(f"{'splitting':>10} {legacy:>10.4f}  relations: {len(split[0])}")
+    print(f"{'synthesis':>10} {fast:>10.4f}  relations: {len(synthesized[0])}")
+    print()
+
+
+# Time the worklist BCNF decomposition and report how much data it touched
+def bench_BCNF(rows: int = 200_000, pairs: int = 12):
+    df, FDs = synthetic_star_table(rows, pairs)
+    relation = Relation(
+        df, ["ID"], [FunctionalDependency(fd) for fd in FDs], [], "Star", []
+    )
+
+    start = time.perf_counter()
+    relations, stats = decompose_BCNF([relation])
+    elapsed = time.perf_counter() - start
+    print(f"BCNF decomposition of {pairs} transitive FDs on {rows} rows")
+    print(f"  {len(relations)} relations, {elapsed:.4f} s")
+    print(
+        f"  splits: {stats['steps']}  projections: {stats['projections']}  rows copied: {stats['rows_copied']}  MB copied: {stats['bytes_copied'] / 2**20:.1f}"
+    )
+    print()
+
+
+# Time the schema-level lossless-join and dependency preservation checks on BCNF
+# decompositions with dozens of relations
+def bench_chase(sizes: list[int] = [10, 25, 50]):
+    print("Decomposition check by the chase (milliseconds)")
+    print(f"{'relations':>10} {'lossless':>9} {'lost FDs':>9} {'milliseconds':>13}")
+    for pairs in sizes:
+        df, FDs = synthetic_star_table(1000, pairs)
+        FDs = [FunctionalDependency(fd) for fd in FDs]
+        relations, _ = decompose_BCNF([Relation(df, ["ID"], FDs, [], "Star", [])])
+        result = []
+        elapsed = best_time(
+            lambda: result.append(verify_decomposition(relations, FDs, [], ["ID"]))
+        )
+        lossless, lost = result[0]
+        print(
+            f"{len(relations):>10} {str(lossless):>9} {len(lost):>9} {elapsed * 1000:>13.2f}"
+        )
+    print()
+
+
+# Join a BCNF decomposition of a large table back together and compare it to the table
+def bench_verify_join(
+    rows: int = 5_000_000, pairs: int = 4, partition_rows: int = 1_000_000
+):
+    df, FDs = synthetic_star_table(rows, pairs)
+    FDs = [FunctionalDependency(fd) for fd in FDs]
+    relations, _ = decompose_BCNF([Relation(df, ["ID"], FDs, [], "Star", [])])
+
+    rebuilt, stats = verify_join(df, relations, partition_rows)
+    print(f"Join-back check of {len(relations)} relations on {rows} rows")
+    print(
+        f"  rebuilt: {rebuilt}  partitions: {stats['partitions']}  {stats['seconds']:.4f} s"
+    )
+    print()
+
+
+# Decompose a table where every course pairs each of its attribute values with all the others,
+# stating an MVD for every combination of up to four attributes
+def bench_4NF(courses: int = 200, attributes: int = 8):
+    names = ["A" + str(i) for i in range(attributes)]
+    grid = np.array(list(itertools.product([0, 1], repeat=attributes)))
+    df = pd.DataFrame(np.tile(grid, (courses, 1)), columns=names)
+    df.insert(0, "Course", np.repeat(np.arange(courses), len(grid)))
+    df[names] += df[["Course"]].to_numpy() % 5
+    MVDs = [
+        MultiValuedDependency("Course ->> " + ", ".join(combination))
+        for size in range(1, 5)
+        for combination in itertools.combinations(names, size)
+    ]
+    relation = Relation(df, None, [], [], "Grid", [])
+
+    start = time.perf_counter()
+    relations, stats = decompose_4NF([relation], MVDs)
+    elapsed = time.perf_counter() - start
+    print(f"4NF decomposition with {len(MVDs)} MVDs on {len(df)} rows")
+    print(f"  {len(relations)} relations, {elapsed:.4f} s")
+    print(
+        f"  splits: {stats['steps']}  projections: {stats['projections']}  rows copied: {stats['rows_copied']}  MB copied: {stats['bytes_copied'] / 2**20:.1f}"
+    )
+    print()
+
+
+# Search for join dependencies on an all-key table that is the join of three random pair
+# sets, so *(AC, CP, AP) holds, and on a random table of the same size where it does not
+def bench_5NF(values: int = 3000, density: float = 0.02):
+    rng = np.random.default_rng(7)
+
+    def pairs(left: str, right: str) -> pd.DataFrame:
+        count = int(values * values * density)
+        return pd.DataFrame(
+            {
+                left: rng.integers(0, values, count),
+                right: rng.integers(0, values, count),
+            }
+        ).drop_duplicates()
+
+    joined = pairs("Agent", "Company").merge(pairs("Company", "Product"))
+    joined = joined.merge(pairs("Agent", "Product"))
+    noise = pd.DataFrame(
+        {col: rng.integers(0, values, len(joined)) for col in joined.columns}
+    )
+
+    print(f"Join dependency search on {len(joined)} rows (seconds)")
+    for label, df in [("holds", joined), ("random", noise)]:
+        start = time.perf_counter()
+        found, stats = find_join_dependencies(df, [], list(df.columns))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:>8} {elapsed:>10.4f}  found: {stats['found']}  pruned by sample: {stats['pruned_by_sample']}  failed: {stats['failed']}  aborted: {stats['aborted']}"
+        )
+    print()
+
+
+# Compare the python engine read the normalizer used before against chunked, compacted ingestion
+def bench_ingest(rows: int = 1_000_000):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "table.csv")
+        synthetic_table(rows).to_csv(path, index=False)
+
+        start = time.perf_counter()
+        legacy = pd.read_csv(path, engine="python", **CSV_OPTIONS)
+        seconds = time.perf_counter() - start
+        memory = legacy.memory_usage(deep=True).sum()
+        del legacy
+
+        df, stats = read_table(path, engine="c", chunksize=250_000)
+
+    print(f"CSV ingestion of {rows} rows")
+    print(f"{'reader':>10} {'seconds':>10} {'rows/s':>12} {'memory MB':>10}")
+    print(
+        f"{'python':>10} {seconds:>10.4f} {rows / seconds:>12.0f} {memory / 2**20:>10.1f}"
+    )
+    print(
+        f"{'chunked':>10} {stats['seconds']:>10.4f} {stats['rows_per_second']:>12.0f} {stats['memory'] / 2**20:>10.1f}"
+    )
+    print()
+
+
+# Compare checks on the table as read and on its dictionary-encoded copy
+def bench_encoding(rows: int = 1_000_000):
+    df = synthetic_table(rows)
+    encoded, stats = encode_table(df)
+    columns = ["Course", "Professor", "classRoom"]
+
+    print(f"Dictionary encoding of {rows} rows (seconds)")
+    print(
+        f"memory: {stats['memory_before'] / 2**20:.1f} MB -> {stats['memory_after'] / 2**20:.1f} MB"
+    )
+    print(f"{'operation':>16} {'plain':>10} {'encoded':>10} {'speedup':>8}")
+    operations = [
+        ("grouping", lambda table: group_codes(table, columns)),
+        ("drop_duplicates", lambda table: table[columns].drop_duplicates()),
+        ("discovery", lambda table: discover_FDs(table.head(rows // 5))),
+    ]
+    for label, operation in operations:
+        plain = best_time(lambda: operation(df), repeat=1)
+        fast = best_time(lambda: operation(encoded), repeat=1)
+        print(f"{label:>16} {plain:>10.4f} {fast:>10.4f} {plain / fast:>7.1f}x")
+    print()
+
+
+# The projection the splitting transforms used to build: one column copy at a time into an
+# empty frame, then drop_duplicates, with the moved columns dropped from the source in place
+def legacy_project(table: pd.DataFrame, attributes: list[str], moved: list[str]):
+    projection = pd.DataFrame()
+    for col in attributes:
+        projection[col] = table[col].copy()
+    projection = projection.drop_duplicates()
+    table.drop(columns=moved, inplace=True)
+    return projection
+
+
+# Compare bytes allocated and time of splitting one FD out of a table the legacy way and
+# with the single-pass projection that leaves the source as it is. The legacy split changes
+# its table, so it works on a copy, as the caller had to keep one to verify the result.
+def bench_projection(rows: int = 1_000_000):
+    df, _ = synthetic_star_table(rows, 3)
+    encoded, _ = encode_table(df.astype(str))
+    attributes, moved = ["K0", "V0"], ["V0"]
+
+    print(f"Projection of one FD out of {rows} rows")
+    print(f"{'table':>8} {'operator':>8} {'seconds':>10} {'MB allocated':>13}")
+    for label, table in [("plain", df), ("encoded", encoded)]:
+        for name, operator in [
+            ("legacy", lambda: legacy_project(table.copy(), attributes, moved)),
+            (
+                "project",
+                lambda: (
+                    project(table, attributes),
+                    project(
+                        table, [c for c in table.columns if c not in moved], key=["ID"]
+                    ),
+                ),
+            ),
+        ]:
+            elapsed = best_time(operator, repeat=1)
+            tracemalloc.start()
+            operator()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{label:>8} {name:>8} {elapsed:>10.4f} {peak / 2**20:>13.1f}")
+    print()
+
+
+# The atomicity check check_1NF used to run: the type of every cell, one Python call each
+def legacy_is_atomic(column: pd.Series) -> bool:
+    data_types = column.apply(lambda x: type(x)).unique()
+    return len(data_types) == 1 and data_types[0] in [int, float, str]
+
+
+# Compare the per-cell atomicity check against the vectorized 1NF analysis, on a table of
+# numeric, string and delimited list columns as read and dictionary-encoded
+def bench_1NF(rows: int = 1_000_000, columns: int = 20):
+    rng = np.random.default_rng(0)
+    courses = np.array(
+        ["CS101", "Math101", "Bio101", "CS101, Math101", "Bio101, CS101"]
+    )
+    data = {}
+    for i in range(columns):
+        if i % 4 == 0:
+            data["N" + str(i)] = rng.integers(0, 1000, rows)
+        elif i % 4 == 3:
+            data["L" + str(i)] = courses[rng.integers(0, len(courses), rows)]
+        else:
+            data["S" + str(i)] = rng.integers(0, 5000, rows).astype(str)
+    df = pd.DataFrame(data)
+    encoded, _ = encode_table(df)
+
+    print(f"1NF analysis of {columns} columns and {rows} rows (seconds)")
+    legacy = best_time(lambda: [legacy_is_atomic(df[col]) for col in df.columns], 1)
+    print(f"{'per-cell':>10} {legacy:>10.4f}")
+    for label, table in [("plain", df), ("encoded", encoded)]:
+        reports = []
+        elapsed = best_time(lambda: reports.append(analyze_1NF(table)), 1)
+        print(
+            f"{label:>10} {elapsed:>10.4f} {legacy / elapsed:>7.1f}x  multivalued: {len(reports[0].multivalued)}"
+        )
+    print()
+
+
+# Compare exploding delimited multivalued attributes one after another on the whole table,
+# as transform_to_1NF used to, against the one-pass engine that gives each its own relation
+def bench_explode(rows: int = 200_000, width: int = 3):
+    rng = np.random.default_rng(0)
+    values = np.array(["V" + str(i) for i in range(50)])
+
+    def lists() -> np.ndarray:
+        cells = values[rng.integers(0, len(values), (rows, width))]
+        return np.array([", ".join(cell) for cell in cells])
+
+    df = pd.DataFrame({"ID": np.arange(rows), "A": lists(), "B": lists()})
+    encoded, _ = encode_table(df)
+
+    def legacy():
+        table = df.assign(A=df["A"].str.split(", "), B=df["B"].str.split(", "))
+        for col in ["A", "B"]:
+            table = table.explode(col)
+        return table
+
+    print(f"1NF explode of 2 attributes with {width} values on {rows} rows")
+    print(f"{'engine':>10} {'seconds':>10} {'rows out':>10} {'MB allocated':>13}")
+    for label, operation in [
+        ("legacy", lambda: [legacy()]),
+        (
+            "one-pass",
+            lambda: decompose_1NF([Relation(df, ["ID"], [], [], "T", ["A", "B"])])[0],
+        ),
+        (
+            "encoded",
+            lambda: decompose_1NF([Relation(encoded, ["ID"], [], [], "T", ["A", "B"])])[
+                0
+            ],
+        ),
+    ]:
+        elapsed = best_time(operation, repeat=1)
+        tracemalloc.start()
+        relations = operation()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        out = sum(len(getattr(r, "table", r)) for r in relations)
+        print(f"{label:>10} {elapsed:>10.4f} {out:>10} {peak / 2**20:>13.1f}")
+    print()
+
+
+# The original lookup: scan every FD of the relation
+def legacy_find_FD_Determinant(relation: Relation, attribute: str) -> list:
+    return [fd for fd in relation.FDs if attribute in fd.determinants]
+
+
+# Compare the linear scans of the FDs against the relation's attribute index, including the
+# cost of keeping the index current as FDs are moved out of the relation
+def bench_dependency_index(
+    shapes: list[tuple] = [(50, 1000), (200, 5000), (400, 20000)]
+):
+    print("FD lookups by attribute (microseconds per lookup)")
+    print(
+        f"{'attributes':>10} {'FDs':>6} {'scan':>10} {'index':>10} {'speedup':>8} {'move ms':>8}"
+    )
+    for attributes, count in shapes:
+        names, FDs = synthetic_FDs(attributes, count)
+        relation = Relation(pd.DataFrame(columns=names), [], FDs, [], "T", None)
+        for name in names[:5]:
+            assert legacy_find_FD_Determinant(relation, name) == (
+                relation.find_FD_Determinant(name)
+            )
+        legacy = best_time(
+            lambda: [legacy_find_FD_Determinant(relation, name) for name in names]
+        )
+        indexed = best_time(
+            lambda: [relation.find_FD_Determinant(name) for name in names]
+        )
+
+        # Move a tenth of the FDs to another relation and back
+        moved = FDs[::10]
+        other = Relation(pd.DataFrame(columns=names), [], [], [], "U", None)
+
+        def move():
+            for fd in moved:
+                relation.FDs.remove(fd)
+                other.FDs.append(fd)
+            for fd in moved:
+                other.FDs.remove(fd)
+                relation.FDs.append(fd)
+
+        moving = best_time(move, repeat=1)
+        print(
+            f"{attributes:>10} {count:>6} {legacy / len(names) * 1e6:>10.1f} {indexed / len(names) * 1e6:>10.1f} {legacy / indexed:>7.1f}x {moving * 1e3:>8.1f}"
+        )
+    print()
+
+
+# Compare writing an encoded table whole (as text and as one CSV) against streaming it in
+# chunks, by time and by the memory allocated while writing
+def bench_writers(rows: int = 1_000_000, chunk_rows: int = 100_000):
+    df, _ = encode_table(synthetic_table(rows))
+    relation = Relation(df, ["StudentID", "Course"], [], [], "T", None)
+
+    print(f"Writing an encoded relation of {rows} rows")
+    print(f"{'writer':>10} {'seconds':>10} {'rows/s':>12} {'MB allocated':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "whole.csv")
+        for label, operation in [
+            ("str", lambda: str(df)),
+            ("whole csv", lambda: df.to_csv(path, index=False)),
+            (
+                "csv",
+                lambda: write_relations([relation], directory, "csv", chunk_rows),
+            ),
+            (
+                "json",
+                lambda: write_relations([relation], directory, "json", chunk_rows),
+            ),
+        ]:
+            elapsed = best_time(operation, repeat=1)
+            tracemalloc.start()
+            operation()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"{label:>10} {elapsed:>10.4f} {rows / elapsed:>12.0f} {peak / 2**20:>13.1f}"
+            )
+    print()
+
+
+# Compare the legacy superkey check against the factorized one
+def bench_superkey(sizes: list[int] = [10_000, 100_000, 500_000]):
+    print("Superkey check (seconds)")
+    print(
+        f"{'rows':>10} {'columns':>28} {'legacy':>10} {'factorized':>10} {'speedup':>8}"
+    )
+    for rows in sizes:
+        df = synthetic_table(rows)
+        for determinant in [["Course", "Professor"], ["StudentID", "Course"]]:
+            assert legacy_is_superkey(df, determinant) == is_superkey(df, determinant)
+            legacy = best_time(lambda: legacy_is_superkey(df, determinant), repeat=1)
+            fast = best_time(lambda: is_superkey(df, determinant))
+            print(
+                f"{rows:>10} {', '.join(determinant):>28} {legacy:>10.4f} {fast:>10.4f} {legacy / fast:>7.1f}x"
+            )
+    print()
+
+
+# Run the full normal-form ladder with and without the shared superkey cache
+def bench_ladder(rows: int = 200_000):
+    df = synthetic_table(rows)
+    FDs = [
+        FunctionalDependency("Course, Professor -> classRoom"),
+        FunctionalDependency("StudentID -> Course"),
+    ]
+    MVDs = [MultiValuedDependency("Course ->> Professor")]
+    relation = Relation(df, ["StudentID"], FDs, MVDs, "Synthetic", None)
+
+    print(f"Normal-form ladder on {rows} rows (seconds)")
+    for label, entries in [("uncached", 0), ("cached", SuperkeyCache().max_entries)]:
+        elapsed = best_time(
+            lambda: classify(
+                relation, MVDs, cache=SuperkeyCache(max_entries=entries)
+            ).highest,
+            repeat=1,
+        )
+        cache = SuperkeyCache(max_entries=entries)
+        classify(relation, MVDs, cache=cache)
+        print(
+            f"{label:>10} {elapsed:>10.4f}  passes: {cache.misses}  cache hits: {cache.hits}"
+        )
+    print()
+
+
+def main():
+    bench_superkey()
+    bench_ladder()
+    bench_closure()
+    bench_candidate_keys()
+    bench_minimal_cover()
+    bench_discovery()
+    bench_discovery_workers()
+    bench_hybrid()
+    bench_validate_FDs()
+    bench_validate_MVDs()
+    bench_synthesis()
+    bench_BCNF()
+    bench_chase()
+    bench_verify_join()
+    bench_4NF()
+    bench_5NF()
+    bench_ingest()
+    bench_encoding()
+    bench_projection()
+    bench_1NF()
+    bench_explode()
+    bench_dependency_index()
+    bench_writers()
+
+
+if __name__ == "__main__":
+    main()
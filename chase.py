@@ -0,0 +1,229 @@
+# Schema-level checks of a decomposition: a lossless-join test by the chase and a dependency
+# preservation test, both run on attribute masks of a ClosureEngine and never on the data.
+# The tableau holds one row of integer symbols per relation. Symbol 0 is the distinguished
+# symbol of a column, and a bitmask per row records which of its columns are distinguished.
+from closure import ClosureEngine, iter_bits
+
+
+class Tableau:
+    def __init__(self, width: int, schemas: list[int]):
+        self.width = width  # Number of attributes
+        self.full = (1 << width) - 1  # Mask of a row made only of distinguished symbols
+        self.symbols = []  # Row -> symbol of each column
+        self.distinguished = (
+            []
+        )  # Row -> mask of the columns holding the distinguished symbol
+        self.seen = set()  # Rows already in the tableau, so MVD steps add each row once
+        self.stale = False  # Whether seen must be rebuilt after symbols were equated
+        self.fresh = len(schemas) + 1  # Next symbol that no row holds yet
+        for i, schema in enumerate(schemas):
+            self.add([0 if schema >> column & 1 else i + 1 for column in range(width)])
+
+    def add(self, symbols: list[int]) -> bool:
+        if self.stale:
+            self.seen = set(tuple(symbols) for symbols in self.symbols)
+            self.stale = False
+        row = tuple(symbols)
+        if row in self.seen:
+            return False
+        self.seen.add(row)
+        self.symbols.append(list(symbols))
+        mask = 0
+        for column, symbol in enumerate(symbols):
+            if symbol == 0:
+                mask |= 1 << column
+        self.distinguished.append(mask)
+        return True
+
+    # Whether some row has become all distinguished, which makes the join lossless
+    @property
+    def solved(self) -> bool:
+        return any(mask == self.full for mask in self.distinguished)
+
+    # Make every occurrence of the given symbols in a column the smallest of them
+    def equate(self, column: int, values: set[int]):
+        target = min(values)
+        for row, symbols in enumerate(self.symbols):
+            if symbols[column] in values:
+                symbols[column] = target
+                if target == 0:
+                    self.distinguished[row] |= 1 << column
+        self.stale = True
+
+    # Rows grouped by their symbols on the determinant columns
+    def groups(self, lhs: int) -> list[list[int]]:
+        columns = list(iter_bits(lhs))
+        groups = {}
+        for row, symbols in enumerate(self.symbols):
+            groups.setdefault(tuple(symbols[c] for c in columns), []).append(row)
+        return [rows for rows in groups.values() if len(rows) > 1]
+
+    # Apply X -> Y: rows agreeing on X are made to agree on Y
+    def apply_FD(self, lhs: int, rhs: int) -> bool:
+        changed = False
+        for rows in self.groups(lhs):
+            for column in iter_bits(rhs & ~lhs):
+                values = {self.symbols[row][column] for row in rows}
+                if len(values) > 1:
+                    self.equate(column, values)
+                    changed = True
+        return changed
+
+    # Apply X ->> Y: for two rows agreeing on X, add the row taking X and Y from the
+    # first and every other column from the second
+    def apply_MVD(self, lhs: int, rhs: int) -> bool:
+        changed = False
+        dependent = rhs & ~lhs
+        for rows in self.groups(lhs):
+            for first in rows:
+                for second in rows:
+                    if first == second:
+                        continue
+                    symbols = [
+                        (
+                            self.symbols[first][c]
+                            if (lhs | dependent) >> c & 1
+                            else self.symbols[second][c]
+                        )
+                        for c in range(self.width)
+                    ]
+                    changed |= self.add(symbols)
+        return changed
+
+    # Apply the join dependency *(C1, ..., Ck): every row of the join of the projections of
+    # the rows on the components is added. A join dependency of a part of the attributes is
+    # embedded, so the columns outside its components get a new symbol each.
+    def apply_JD(self, components: list[int]) -> bool:
+        scope = 0
+        joined = [{}]
+        for component in components:
+            scope |= component
+            columns = list(iter_bits(component))
+            projections = {
+                tuple(symbols[c] for c in columns) for symbols in self.symbols
+            }
+            joined = [
+                {**row, **dict(zip(columns, values))}
+                for row in joined
+                for values in projections
+                if all(row.get(c, v) == v for c, v in zip(columns, values))
+            ]
+
+        columns = list(iter_bits(scope))
+        present = {tuple(symbols[c] for c in columns) for symbols in self.symbols}
+        changed = False
+        for row in joined:
+            values = tuple(row[c] for c in columns)
+            if values in present:
+                continue
+            present.add(values)
+            symbols = []
+            for column in range(self.width):
+                if scope >> column & 1:
+                    symbols.append(row[column])
+                else:
+                    symbols.append(self.fresh)
+                    self.fresh += 1
+            changed |= self.add(symbols)
+        return changed
+
+
+# Chase the tableau of a decomposition with the engine's FDs, the given MVDs (as mask pairs)
+# and join dependencies (as lists of component masks) until a row is all distinguished or
+# nothing changes. The join is lossless exactly when such a row appears.
+def lossless_join(
+    engine: ClosureEngine,
+    schemas: list[int],
+    MVDs: list[tuple[int, int]] = None,
+    JDs: list[list[int]] = None,
+) -> bool:
+    FDs = [
+        (lhs, rhs)
+        for lhs, rhs, active in zip(engine.lhs, engine.rhs, engine.active)
+        if active and rhs & ~lhs
+    ]
+    tableau = Tableau(len(engine.names), schemas)
+    changed = True
+    while changed and not tableau.solved:
+        changed = False
+        for lhs, rhs in FDs:
+            changed |= tableau.apply_FD(lhs, rhs)
+        for lhs, rhs in MVDs or []:
+            changed |= tableau.apply_MVD(lhs, rhs)
+        for components in JDs or []:
+            changed |= tableau.apply_JD(components)
+    return tableau.solved
+
+
+# Find the FDs (as mask pairs) that the decomposition does not preserve. X -> Y is preserved
+# when Y is reached from X by closures taken inside the relation schemas only.
+def lost_dependencies(
+    engine: ClosureEngine, schemas: list[int], FDs: list[tuple[int, int]]
+) -> list[tuple[int, int]]:
+    lost = []
+    for lhs, rhs in FDs:
+        # An FD lying inside one schema is preserved by it
+        if any((lhs | rhs) & ~schema == 0 for schema in schemas):
+            continue
+        reached = lhs
+        while rhs & ~reached:
+            grown = reached
+            for schema in schemas:
+                if reached & schema or engine.unconditional & schema:
+                    grown |= (
+                        engine.closure_mask(reached & schema, target=schema) & schema
+                    )
+            if grown == reached:
+                break
+            reached = grown
+        if rhs & ~reached:
+            lost.append((lhs, rhs))
+    return lost
+
+
+# Check that relations decomposed from a table with the given FDs, MVDs, join dependencies
+# and declared key join back losslessly and preserve the FDs. Returns whether the join is
+# lossless and the FDs that are lost. The key is treated as an FD key -> all attributes.
+def verify_decomposition(
+    relations: list,
+    FDs: list,
+    MVDs: list = None,
+    key: list[str] = None,
+    JDs: list = None,
+) -> tuple[bool, list]:
+    attributes = []
+    for relation in relations:
+        for col in relation.table.columns:
+            if col not in attributes:
+                attributes.append(col)
+    FDs = [
+        fd
+        for fd in FDs
+        if all(col in attributes for col in fd.determinants + fd.dependents)
+    ]
+    MVDs = [
+        mvd
+        for mvd in MVDs or []
+        if all(col in attributes for col in mvd.determinants + mvd.dependents)
+    ]
+
+    engine = ClosureEngine(FDs, attributes)
+    schema = engine.mask(attributes)
+    if key and all(col in attributes for col in key):
+        engine.add_mask(engine.mask(key), schema)
+
+    schemas = [engine.mask(relation.table.columns) for relation in relations]
+    MVD_masks = [
+        (engine.mask(mvd.determinants), engine.mask(mvd.dependents)) for mvd in MVDs
+    ]
+    FD_masks = [
+        (engine.mask(fd.determinants), engine.mask(fd.dependents)) for fd in FDs
+    ]
+    JD_masks = [
+        [engine.mask(component) for component in jd.components]
+        for jd in JDs or []
+        if all(col in attributes for component in jd.components for col in component)
+    ]
+    lossless = lossless_join(engine, schemas, MVD_masks, JD_masks)
+    lost = lost_dependencies(engine, schemas, FD_masks)
+    return lossless, [fd for fd, pair in zip(FDs, FD_masks) if pair in lost]
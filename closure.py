@@ -0,0 +1,377 @@
+# Attribute closure over functional dependencies using bitmask attribute sets.
+# Attribute names are interned to bit positions once, every FD is stored as a pair of
+# bitmasks, and X+ is computed in time linear in the size of the FD set by keeping a
+# counter of unmatched left hand side attributes per FD (Beeri and Bernstein).
+
+
+class ClosureEngine:
+    def __init__(self, FDs: list = None, attributes: list[str] = None):
+        self.index = {}  # Attribute name -> bit position
+        self.names = []  # Bit position -> attribute name
+        self.lhs = []  # Determinant mask of each FD
+        self.rhs = []  # Dependent mask of each FD
+        self.lhs_size = []  # Number of determinant attributes of each FD
+        self.counters = []  # Unmatched determinant attributes per FD, between closures
+        self.active = []  # Whether each FD still takes part in closures
+        self.watch = []  # Bit position -> FDs whose determinant contains that attribute
+        self.unconditional = (
+            0  # Union of the dependents of FDs with an empty determinant
+        )
+
+        for attribute in attributes or []:
+            self.intern(attribute)
+        for fd in FDs or []:
+            self.add(fd.determinants, fd.dependents)
+
+    # Return the bit position of an attribute, assigning the next free one if it is new
+    def intern(self, attribute: str) -> int:
+        bit = self.index.get(attribute)
+        if bit is None:
+            bit = len(self.names)
+            self.index[attribute] = bit
+            self.names.append(attribute)
+            self.watch.append([])
+        return bit
+
+    # Add the FD determinant -> dependent given as attribute name lists
+    def add(self, determinant: list[str], dependent: list[str]) -> int:
+        lhs = 0
+        for attribute in determinant:
+            lhs |= 1 << self.intern(attribute)
+        rhs = 0
+        for attribute in dependent:
+            rhs |= 1 << self.intern(attribute)
+        return self.add_mask(lhs, rhs)
+
+    def add_mask(self, lhs: int, rhs: int) -> int:
+        position = len(self.lhs)
+        self.lhs.append(lhs)
+        self.rhs.append(rhs)
+        self.lhs_size.append(lhs.bit_count())
+        self.counters.append(lhs.bit_count())
+        self.active.append(True)
+        if lhs == 0:
+            self.unconditional |= rhs
+        for bit in iter_bits(lhs):
+            self.watch[bit].append(position)
+        return position
+
+    # Stop using the FD at a position without renumbering the others
+    def remove(self, position: int):
+        self.active[position] = False
+        if self.lhs[position] == 0:
+            self.unconditional = self._unconditional()
+
+    # Union of the dependents of active FDs with an empty determinant, optionally ignoring one
+    def _unconditional(self, skip: int = -1) -> int:
+        unconditional = 0
+        for position, lhs in enumerate(self.lhs):
+            if lhs == 0 and self.active[position] and position != skip:
+                unconditional |= self.rhs[position]
+        return unconditional
+
+    def mask(self, attributes) -> int:
+        mask = 0
+        for attribute in attributes:
+            mask |= 1 << self.intern(attribute)
+        return mask
+
+    def names_of(self, mask: int) -> list[str]:
+        return [self.names[bit] for bit in iter_bits(mask)]
+
+    @property
+    def all_mask(self) -> int:
+        return (1 << len(self.names)) - 1
+
+    # Compute the closure of an attribute mask, optionally ignoring one FD by position.
+    # The search stops early once every attribute of target (all attributes by default) is reached.
+    def closure_mask(self, mask: int, skip: int = -1, target: int = None) -> int:
+        if target is None:
+            target = self.all_mask
+        closure = mask | self.unconditional
+        if skip >= 0 and self.lhs[skip] == 0:
+            # The skipped FD may be the only source of some unconditional attributes
+            closure = mask | self._unconditional(skip)
+
+        if target & ~closure == 0:
+            return closure
+
+        # The counters are shared by every closure and put back for the FDs this one
+        # touched, so a closure costs the FDs it reaches instead of every FD of the engine
+        counters, lhs_size = self.counters, self.lhs_size
+        watch, rhs, active = self.watch, self.rhs, self.active
+        touched = []
+        pending = list(iter_bits(closure))
+        while pending and target & ~closure:
+            attribute = pending.pop()
+            touched.append(attribute)
+            for position in watch[attribute]:
+                counters[position] -= 1
+                if counters[position] == 0 and position != skip and active[position]:
+                    new = rhs[position] & ~closure
+                    if new:
+                        closure |= new
+                        if new & (new - 1) == 0:
+                            pending.append(new.bit_length() - 1)
+                        else:
+                            pending.extend(iter_bits(new))
+        for attribute in touched:
+            for position in watch[attribute]:
+                counters[position] = lhs_size[position]
+        return closure
+
+    def closure(self, attributes) -> set[str]:
+        return set(self.names_of(self.closure_mask(self.mask(attributes))))
+
+    # Check whether the FD set implies lhs -> rhs
+    def implies_mask(self, lhs: int, rhs: int, skip: int = -1) -> bool:
+        return rhs & ~self.closure_mask(lhs, skip, rhs) == 0
+
+    def implies(self, determinant: list[str], dependent: list[str]) -> bool:
+        return self.implies_mask(self.mask(determinant), self.mask(dependent))
+
+
+# Yield the bit positions set in a mask, lowest first
+def iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# Shrink a superkey of the schema to a candidate key by dropping attributes one at a time.
+# Attributes in core are never derivable and so cannot be dropped.
+def minimize_key(engine: ClosureEngine, schema: int, mask: int, core: int = 0) -> int:
+    for bit in iter_bits(mask & ~core):
+        reduced = mask & ~(1 << bit)
+        if schema & ~engine.closure_mask(reduced, target=schema) == 0:
+            mask = reduced
+    return mask
+
+
+# Enumerate candidate keys of the schema implied by the FDs (Lucchesi and Osborn).
+# Every new key is derived from a known key K and an FD X -> Y as a minimal subset of
+# X | (K - Y), so the search never walks the attribute subset lattice. At most limit keys are returned.
+def candidate_key_masks(
+    engine: ClosureEngine, schema: int, seeds: list[int] = None, limit: int = 64
+) -> list[int]:
+    # Only FDs whose determinant lies inside the schema say anything about its keys. When
+    # the FDs also name attributes outside it, what a determinant gives within the schema
+    # is its closure, which can pass through those attributes.
+    FDs = [
+        (lhs, rhs)
+        for lhs, rhs, active in zip(engine.lhs, engine.rhs, engine.active)
+        if active
+    ]
+    inside = all((lhs | rhs) & ~schema == 0 for lhs, rhs in FDs)
+    applicable = []
+    derivable = 0
+    for lhs, rhs in FDs:
+        if lhs & ~schema == 0:
+            if not inside:
+                rhs = engine.closure_mask(lhs, target=schema)
+            if rhs & schema & ~lhs:
+                applicable.append((lhs, rhs & schema))
+                derivable |= rhs & schema & ~lhs
+
+    # An attribute outside every key can be derived from the rest of the schema
+    if not inside:
+        derivable = 0
+        for bit in iter_bits(schema):
+            if engine.closure_mask(schema & ~(1 << bit), target=1 << bit) >> bit & 1:
+                derivable |= 1 << bit
+    core = schema & ~derivable
+
+    keys = []
+    for seed in (seeds or []) + [schema]:
+        if schema & ~engine.closure_mask(seed & schema, target=schema) == 0:
+            keys.append(minimize_key(engine, schema, seed & schema, core))
+            break
+
+    position = 0
+    while position < len(keys) and len(keys) < limit:
+        key = keys[position]
+        position += 1
+        for lhs, rhs in applicable:
+            superkey = lhs | (key & ~rhs)
+            if any(known & ~superkey == 0 for known in keys):
+                continue
+            keys.append(minimize_key(engine, schema, superkey, core))
+            if len(keys) >= limit:
+                break
+
+    return keys
+
+
+# Find the candidate keys of a table with the given columns from its FDs.
+# A declared key is treated as an extra FD key -> all columns and tried first.
+def candidate_keys(
+    FDs: list, attributes: list[str], key: list[str] = None, limit: int = 64
+) -> list[list[str]]:
+    engine = ClosureEngine(FDs, attributes)
+    schema = engine.mask(attributes)
+    seeds = []
+    if key and all(col in attributes for col in key):
+        seeds.append(engine.mask(key))
+        engine.add_mask(engine.mask(key), schema)
+
+    order = {attribute: i for i, attribute in enumerate(attributes)}
+    keys = []
+    for mask in candidate_key_masks(engine, schema, seeds, limit):
+        keys.append(sorted(engine.names_of(mask), key=order.get))
+    return keys
+
+
+# Union of the closures of the single attributes of lhs, which is part of the closure of
+# lhs. singles caches those closures. It is only valid while FDs are added to the engine,
+# never removed, and a cached closure is computed again once the engine has grown by half
+# since.
+def singles_closure(engine: ClosureEngine, singles: dict, lhs: int) -> int:
+    known = lhs
+    for bit in iter_bits(lhs):
+        closure, size = singles.get(bit, (0, -1))
+        if size < 0 or len(engine.lhs) > size + size // 2 + 16:
+            closure = engine.closure_mask(1 << bit)
+            singles[bit] = (closure, len(engine.lhs))
+        known |= closure
+    return known
+
+
+# Check whether the engine's FDs imply lhs -> rhs, searching only when the closures of the
+# single attributes of lhs do not already give rhs
+def implied_by(engine: ClosureEngine, singles: dict, lhs: int, rhs: int) -> bool:
+    known = singles_closure(engine, singles, lhs)
+    if rhs & ~known == 0:
+        return True
+    if lhs and lhs & (lhs - 1) == 0:
+        # The cached closure of a single attribute is out of date: compute it again
+        if singles[lhs.bit_length() - 1][1] == len(engine.lhs):
+            return False
+        known = engine.closure_mask(lhs)
+        singles[lhs.bit_length() - 1] = (known, len(engine.lhs))
+        return rhs & ~known == 0
+    return engine.implies_mask(known, rhs)
+
+
+# Compute a minimal cover of the engine's active FDs. Dependents are split into single
+# attributes, extraneous determinant attributes are removed and FDs implied by the rest are
+# dropped. Returns the cover as (determinant, dependent) masks together with the
+# extraneous attributes removed from each split FD and the redundant FDs that were dropped.
+def minimal_cover_masks(
+    engine: ClosureEngine,
+) -> tuple[list[tuple[int, int]], list[tuple[int, int, int]], list[tuple[int, int]]]:
+    # Split every dependent into single attributes, dropping trivial and repeated FDs
+    split = {}
+    for lhs, rhs, active in zip(engine.lhs, engine.rhs, engine.active):
+        if active:
+            for bit in iter_bits(rhs & ~lhs):
+                split.setdefault((lhs, 1 << bit), None)
+
+    # Closures over the split FDs are taken over the ones not implied by the FDs before them
+    # instead. Those are equivalent to the whole set and, on large redundant FD files, a
+    # fraction of it, so each closure reaches far fewer FDs. An FD that is the only one for
+    # its dependent is kept without a closure.
+    sources = {}
+    for lhs, rhs in split:
+        sources[rhs] = sources.get(rhs, 0) + 1
+    basis = ClosureEngine(attributes=engine.names)
+    singles = {}  # Attribute -> (closure of it alone, FDs kept when it was computed)
+    for lhs, rhs in split:
+        if sources[rhs] == 1 or not implied_by(basis, singles, lhs, rhs):
+            basis.add_mask(lhs, rhs)
+
+    # Remove extraneous determinant attributes
+    extraneous = []
+    reduced = {}
+    for lhs, rhs in split:
+        kept = lhs
+        if lhs.bit_count() > 1:
+            for bit in iter_bits(lhs):
+                candidate = kept & ~(1 << bit)
+                if implied_by(basis, singles, candidate, rhs):
+                    kept = candidate
+        if kept != lhs:
+            extraneous.append((lhs, rhs, lhs & ~kept))
+        reduced.setdefault((kept, rhs), None)
+    reduced = list(reduced)
+
+    # Drop FDs implied by the remaining ones, in order: an FD goes when the FDs kept before it
+    # and all the FDs after it imply it. Going backwards first finds the FDs implied by the
+    # FDs after them, which go without a closure. The others are equivalent to all the FDs
+    # after them, so the closures for them reach only the kept FDs and the others after
+    # them. An FD that is the only remaining source of its dependent cannot be redundant.
+    remover = ClosureEngine(attributes=engine.names)
+    positions = [None] * len(reduced)
+    sources = {}
+    singles = {}
+    for index in range(len(reduced) - 1, -1, -1):
+        lhs, rhs = reduced[index]
+        if rhs not in sources or not implied_by(remover, singles, lhs, rhs):
+            positions[index] = remover.add_mask(lhs, rhs)
+        sources[rhs] = sources.get(rhs, 0) + 1
+
+    cover = []
+    redundant = []
+    for position, (lhs, rhs) in zip(positions, reduced):
+        if position is not None:
+            remover.remove(position)
+        if position is None or sources[rhs] > 1 and remover.implies_mask(lhs, rhs):
+            sources[rhs] -= 1
+            redundant.append((lhs, rhs))
+        else:
+            remover.add_mask(lhs, rhs)
+            cover.append((lhs, rhs))
+    return cover, extraneous, redundant
+
+
+# Find a BCNF violation of the FDs projected onto a schema. Returns (X, X+ within the schema)
+# for a determinant X that is not a superkey of the schema, or None when none is found.
+# Determinants of the stored FDs are tried first. Otherwise an attribute A derived from the
+# schema without A and some B (Tsou and Fischer) is given a minimal determinant, and that
+# determinant is checked.
+def bcnf_violation(engine: ClosureEngine, schema: int):
+    for lhs, active in zip(engine.lhs, engine.active):
+        if active and lhs & ~schema == 0:
+            closure = engine.closure_mask(lhs, target=schema) & schema
+            if closure != schema and closure & ~lhs:
+                return lhs, closure
+
+    bits = list(iter_bits(schema))
+    for a in bits:
+        for b in bits:
+            if a == b:
+                continue
+            rest = schema & ~(1 << a) & ~(1 << b)
+            if not engine.implies_mask(rest, 1 << a):
+                continue
+            determinant = rest
+            for bit in iter_bits(rest):
+                reduced = determinant & ~(1 << bit)
+                if engine.implies_mask(reduced, 1 << a):
+                    determinant = reduced
+            closure = engine.closure_mask(determinant, target=schema) & schema
+            if closure != schema:
+                return determinant, closure
+    return None
+
+
+# Compute the dependency basis of a determinant: the partition of the other attributes of the
+# universe into blocks such that X ->> Y holds exactly for the unions Y of blocks (Beeri).
+# A block is split by V ->> W when V shares no attribute with it and W cuts it.
+def dependency_basis(universe: int, lhs: int, MVDs: list[tuple[int, int]]) -> list[int]:
+    blocks = [universe & ~lhs] if universe & ~lhs else []
+    changed = True
+    while changed:
+        changed = False
+        split = []
+        for block in blocks:
+            for v, w in MVDs:
+                inside = block & w
+                if block & v == 0 and inside and inside != block:
+                    split.extend([inside, block & ~inside])
+                    changed = True
+                    break
+            else:
+                split.append(block)
+        blocks = split
+    return blocks
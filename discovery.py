@@ -0,0 +1,514 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from closure import iter_bits
+from form_finder import factorize_column
+from ingest import CSV_OPTIONS
+from normalizer import FunctionalDependency
+
+# Tables with fewer cells than this are mined serially even when workers are given: starting
+# the process pool and its shared memory costs more than the whole search saves on them
+PARALLEL_MIN_CELLS = 500_000
+
+
+# A stripped partition of the rows of a table by the values of an attribute set.
+# Only rows in classes of two or more rows are kept: rows[i] belongs to class classes[i].
+class StrippedPartition:
+    def __init__(self, rows: np.ndarray, classes: np.ndarray, count: int):
+        self.rows = rows  # Row positions that share their value with another row
+        self.classes = classes  # Class id of each kept row, numbered 0..count-1
+        self.count = count  # Number of non-singleton classes
+
+    # e(X): the number of rows that would have to be removed for X to become a key
+    @property
+    def error(self) -> int:
+        return len(self.rows) - self.count
+
+    # Build the partition of one column from its integer codes
+    @staticmethod
+    def from_codes(codes: np.ndarray) -> "StrippedPartition":
+        return StrippedPartition.from_groups(
+            np.arange(len(codes), dtype=np.int32), codes
+        )
+
+    # Keep the rows whose group id occurs more than once and renumber their groups densely
+    @staticmethod
+    def from_groups(rows: np.ndarray, groups: np.ndarray) -> "StrippedPartition":
+        # Count directly over the id range when it is small enough, otherwise hash first
+        if len(groups) > 0 and groups.max() >= 4 * len(groups) + 1024:
+            groups, _ = pd.factorize(groups)
+        counts = np.bincount(groups)
+        shared = counts > 1
+        keep = shared[groups]
+        renumber = np.cumsum(shared, dtype=np.int32) - 1
+        return StrippedPartition(rows[keep], renumber[groups[keep]], int(shared.sum()))
+
+    # Partition of the union of both attribute sets. probe is scratch space of one entry per row.
+    def product(
+        self, other: "StrippedPartition", probe: np.ndarray
+    ) -> "StrippedPartition":
+        probe[other.rows] = other.classes
+        other_classes = probe[self.rows]
+        probe[other.rows] = -1
+
+        both = other_classes >= 0
+        groups = self.classes[both].astype(np.int64) * other.count + other_classes[both]
+        return StrippedPartition.from_groups(self.rows[both], groups)
+
+
+# Factorize every column once into integer codes, keeping nulls as their own value.
+# Dictionary-encoded columns give their codes without hashing.
+def column_codes(df: pd.DataFrame) -> list[np.ndarray]:
+    codes = []
+    for col in df.columns:
+        col_codes, _ = factorize_column(df, col)
+        codes.append(col_codes.astype(np.int32))
+    return codes
+
+
+# Group minimal FDs found as (determinant mask, dependent bit) into FunctionalDependency objects
+def to_FDs(found: dict, columns: list[str]) -> list[FunctionalDependency]:
+    merged = {}
+    for lhs, rhs in sorted(found.items(), key=lambda item: item[0]):
+        merged.setdefault(lhs, 0)
+        merged[lhs] |= rhs
+
+    FDs = []
+    for lhs, rhs in merged.items():
+        determinant = ", ".join(columns[bit] for bit in iter_bits(lhs))
+        dependent = ", ".join(columns[bit] for bit in iter_bits(rhs))
+        FDs.append(FunctionalDependency(determinant + " -> " + dependent))
+    return FDs
+
+
+# Generate the next lattice level from the sets whose every subset survived this level.
+# Sets sharing all attributes but their highest one are joined pairwise (apriori-gen).
+def next_level(level: list[int]) -> list[tuple[int, int, int]]:
+    survivors = set(level)
+    blocks = {}
+    for mask in sorted(level):
+        prefix = mask & ~(1 << (mask.bit_length() - 1))
+        blocks.setdefault(prefix, []).append(mask)
+
+    candidates = []
+    for block in blocks.values():
+        for i in range(len(block)):
+            for j in range(i + 1, len(block)):
+                union = block[i] | block[j]
+                if all(union & ~(1 << bit) in survivors for bit in iter_bits(union)):
+                    candidates.append((union, block[i], block[j]))
+    return candidates
+
+
+# Computes e(X) for lattice levels by multiplying the stripped partitions of the level below
+class PartitionLattice:
+    def __init__(self, codes: list[np.ndarray], rows: int):
+        self.partitions = {}
+        for bit, col_codes in enumerate(codes):
+            self.partitions[1 << bit] = StrippedPartition.from_codes(col_codes)
+        self.probe = np.full(rows, -1, dtype=np.int32)
+
+    def first_level(self) -> dict:
+        return {mask: partition.error for mask, partition in self.partitions.items()}
+
+    # Return e(X) of every candidate (X, left, right), or None if the deadline passed first
+    def next_level(
+        self, candidates: list[tuple[int, int, int]], deadline: float
+    ) -> dict:
+        partitions = {}
+        for union, left, right in candidates:
+            partitions[union] = self.partitions[left].product(
+                self.partitions[right], self.probe
+            )
+            if time.perf_counter() > deadline:
+                return None
+
+        # Partitions of the level below are no longer needed
+        self.partitions = partitions
+        return {mask: partition.error for mask, partition in partitions.items()}
+
+    def close(self):
+        self.partitions = {}
+
+
+# Computes e(X) for lattice levels in a process pool. The column codes live in one shared
+# memory block that every worker maps, so no DataFrame or partition is ever pickled, and
+# each worker counts the distinct value combinations of X directly: e(X) = rows - |distinct X|.
+class SharedCodesLattice:
+    def __init__(self, codes: list[np.ndarray], rows: int, workers: int):
+        self.rows = rows
+        self.workers = workers
+        self.cardinalities = [
+            int(col_codes.max()) + 1 if rows > 0 else 1 for col_codes in codes
+        ]
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=max(len(codes) * rows * 4, 1)
+        )
+        shared = np.ndarray((len(codes), rows), dtype=np.int32, buffer=self.memory.buf)
+        for bit, col_codes in enumerate(codes):
+            shared[bit] = col_codes
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach_codes,
+            initargs=(self.memory.name, (len(codes), rows), self.cardinalities),
+        )
+        self.width = len(codes)
+
+    def first_level(self) -> dict:
+        return self.next_level(
+            [(1 << bit, 0, 0) for bit in range(self.width)], float("inf")
+        )
+
+    def next_level(
+        self, candidates: list[tuple[int, int, int]], deadline: float
+    ) -> dict:
+        masks = [union for union, _, _ in candidates]
+
+        # A few chunks per worker keeps them busy without paying per-node task overhead
+        size = max(1, len(masks) // (self.workers * 4))
+        chunks = [masks[i : i + size] for i in range(0, len(masks), size)]
+
+        errors = {}
+        for chunk, distinct in zip(chunks, self.pool.map(_count_distinct, chunks)):
+            for mask, count in zip(chunk, distinct):
+                errors[mask] = self.rows - count
+            if time.perf_counter() > deadline:
+                return None
+        return errors
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        self.memory.close()
+        self.memory.unlink()
+
+
+# Worker state: the shared column codes, mapped once per worker process
+_shared_codes = None
+_shared_memory = None
+_cardinalities = None
+
+
+def _attach_codes(name: str, shape: tuple, cardinalities: list[int]):
+    global _shared_codes, _shared_memory, _cardinalities
+    _shared_memory = shared_memory.SharedMemory(name=name)
+    _shared_codes = np.ndarray(shape, dtype=np.int32, buffer=_shared_memory.buf)
+    _cardinalities = cardinalities
+
+
+# Count the distinct value combinations of each attribute set in the shared column codes
+def _count_distinct(masks: list[int]) -> list[int]:
+    rows = _shared_codes.shape[1]
+    counts = []
+    for mask in masks:
+        groups = np.zeros(rows, dtype=np.int64)
+        cardinality = 1
+        for bit in iter_bits(mask):
+            size = _cardinalities[bit]
+            # Re-factorize before the mixed radix product could overflow int64
+            if cardinality * size >= 2**62:
+                groups, uniques = pd.factorize(groups)
+                cardinality = max(len(uniques), 1)
+            groups = groups * size + _shared_codes[bit]
+            cardinality *= size
+
+        if cardinality <= 4 * rows + 1024:
+            counts.append(int(np.count_nonzero(np.bincount(groups, minlength=1))))
+        else:
+            counts.append(len(pd.unique(groups)))
+    return counts
+
+
+# Mine all minimal non-trivial FDs that hold in the table with TANE: a level-wise walk of the
+# attribute lattice where X\A -> A holds exactly when e(X\A) equals e(X).
+# Determinants are limited to max_lhs attributes, and the search stops early once
+# time_budget seconds have passed. With workers > 1 the e(X) values of each level are
+# computed in a process pool once the table has PARALLEL_MIN_CELLS cells; the lattice walk
+# itself stays serial, so the FDs found are identical to a serial run. Returns the FDs and statistics about the run.
+def discover_FDs(
+    df: pd.DataFrame, max_lhs: int = None, time_budget: float = None, workers: int = 1
+) -> tuple[list[FunctionalDependency], dict]:
+    start = time.perf_counter()
+    deadline = float("inf") if time_budget is None else start + time_budget
+    columns = [str(col) for col in df.columns]
+    width = len(columns)
+    rows = len(df)
+    max_lhs = width - 1 if max_lhs is None else max_lhs
+    everything = (1 << width) - 1
+    if rows * width < PARALLEL_MIN_CELLS:
+        workers = 1
+
+    stats = {
+        "rows": rows,
+        "columns": width,
+        "workers": workers,
+        "levels": 0,
+        "nodes": 0,
+        "validity_checks": 0,
+        "constant_columns": [],
+        "complete": True,
+    }
+
+    codes = column_codes(df)
+    if workers > 1:
+        lattice = SharedCodesLattice(codes, rows, workers)
+    else:
+        lattice = PartitionLattice(codes, rows)
+
+    # e(empty set): every row in a single class
+    errors = {0: max(rows - 1, 0)}
+    cplus = {0: everything}
+    found = {}  # Determinant mask -> dependent mask of minimal FDs
+    by_dependent = [
+        [] for _ in range(width)
+    ]  # Dependent bit -> determinant masks found
+
+    try:
+        level_errors = lattice.first_level()
+        size = 1
+        while len(level_errors) > 0 and size <= max_lhs + 1:
+            level = sorted(level_errors)
+            errors.update(level_errors)
+            stats["levels"] = size
+            stats["nodes"] += len(level)
+
+            # Compute the dependencies whose determinant is one attribute smaller than the node
+            for mask in level:
+                candidates = everything
+                for bit in iter_bits(mask):
+                    candidates &= cplus[mask & ~(1 << bit)]
+
+                for bit in iter_bits(mask & candidates):
+                    lhs = mask & ~(1 << bit)
+                    stats["validity_checks"] += 1
+                    if errors[lhs] == errors[mask]:
+                        # Constant columns are reported, but an empty determinant is not a usable FD
+                        if lhs == 0:
+                            stats["constant_columns"].append(columns[bit])
+                        else:
+                            found[lhs] = found.get(lhs, 0) | (1 << bit)
+                        by_dependent[bit].append(lhs)
+                        candidates &= ~(1 << bit)
+                        candidates &= mask
+                cplus[mask] = candidates
+
+                if time.perf_counter() > deadline:
+                    stats["complete"] = False
+                    break
+            if not stats["complete"]:
+                break
+
+            # Prune nodes with no candidates left, and superkeys after emitting their own FDs
+            survivors = []
+            for mask in level:
+                if cplus[mask] == 0:
+                    continue
+                if errors[mask] == 0:
+                    if size <= max_lhs:
+                        for bit in iter_bits(cplus[mask] & ~mask):
+                            if not any(lhs & ~mask == 0 for lhs in by_dependent[bit]):
+                                found[mask] = found.get(mask, 0) | (1 << bit)
+                                by_dependent[bit].append(mask)
+                    continue
+                survivors.append(mask)
+
+            if size > max_lhs:
+                break
+
+            level_errors = lattice.next_level(next_level(survivors), deadline)
+            if level_errors is None:
+                stats["complete"] = False
+                break
+            size += 1
+    finally:
+        lattice.close()
+
+    stats["seconds"] = time.perf_counter() - start
+    return to_FDs(found, columns), stats
+
+
+# Draw a uniform sample of about sample_size rows while streaming the CSV in chunks
+def sample_csv(
+    path: str, sample_size: int, chunksize: int, seed: int = 0
+) -> tuple[pd.DataFrame, int]:
+    rng = np.random.default_rng(seed)
+    sample = None
+    rows = 0
+    for chunk in pd.read_csv(path, dtype=str, chunksize=chunksize, **CSV_OPTIONS):
+        rows += len(chunk)
+        # Reservoir sampling with one random priority per row: keep the lowest priorities seen
+        chunk = chunk.assign(_priority=rng.random(len(chunk)))
+        sample = chunk if sample is None else pd.concat([sample, chunk])
+        sample = sample.nsmallest(sample_size, "_priority")
+    sample = sample.drop(columns="_priority").reset_index(drop=True)
+    return sample, rows
+
+
+# Collect the agree sets of row pairs in the sample. Rows are compared with their neighbours
+# after sorting by each column in turn, which finds the pairs most likely to agree.
+def agree_sets(sample: pd.DataFrame, window: int) -> set[int]:
+    codes = np.stack(column_codes(sample), axis=1) if len(sample.columns) > 0 else None
+    if codes is None or len(sample) < 2:
+        return set()
+
+    found = set()
+    for col in range(codes.shape[1]):
+        ordered = codes[np.argsort(codes[:, col], kind="stable")]
+        for distance in range(1, min(window, len(ordered) - 1) + 1):
+            agree = ordered[:-distance] == ordered[distance:]
+            for row in np.unique(agree, axis=0):
+                found.add(sum(1 << int(bit) for bit in np.flatnonzero(row)))
+    return found
+
+
+# Find the minimal attribute sets of at most max_lhs attributes, drawn from allowed, that are
+# not contained in any of the non-FD determinants. These are the candidate determinants of one
+# dependent; every other candidate is a superset of one of them.
+def minimal_candidates(non_FDs: list[int], allowed: int, max_lhs: int) -> list[int]:
+    if len(non_FDs) == 0:
+        return [0]
+
+    candidates = []
+    level = [0]
+    for size in range(1, max_lhs + 1):
+        next_level = set()
+        for mask in level:
+            # Extend only with higher attributes so every set is generated once
+            start = mask.bit_length()
+            for bit in iter_bits(allowed >> start << start):
+                union = mask | (1 << bit)
+                if any(candidate & ~union == 0 for candidate in candidates):
+                    continue
+                if any(union & ~negative == 0 for negative in non_FDs):
+                    next_level.add(union)
+                else:
+                    candidates.append(union)
+        level = sorted(next_level)
+    return candidates
+
+
+# Stream the CSV and check which candidate FDs hold on every row. The distinct projection of
+# each determinant and its dependents is kept across chunks, so memory follows the number of
+# distinct values rather than the number of rows. Returns the (determinant, dependent bit)
+# pairs that failed.
+def validate_candidates(
+    path: str, columns: list[str], candidates: dict, chunksize: int
+) -> tuple[set[tuple[int, int]], int]:
+    alive = {lhs: set(bits) for lhs, bits in candidates.items()}
+    seen = {lhs: None for lhs in alive}
+    failed = set()
+    rows = 0
+
+    for chunk in pd.read_csv(path, dtype=str, chunksize=chunksize, **CSV_OPTIONS):
+        chunk.columns = columns
+        rows += len(chunk)
+        for lhs in list(alive):
+            determinant = [columns[bit] for bit in iter_bits(lhs)]
+            dependents = [columns[bit] for bit in sorted(alive[lhs])]
+            part = chunk[determinant + dependents].drop_duplicates()
+            if seen[lhs] is not None:
+                part = pd.concat(
+                    [seen[lhs][determinant + dependents], part]
+                ).drop_duplicates()
+            seen[lhs] = part
+
+            for bit in sorted(alive[lhs]):
+                if determinant:
+                    pairs = part[determinant + [columns[bit]]].drop_duplicates()
+                    holds = not pairs.duplicated(determinant).any()
+                else:
+                    holds = part[columns[bit]].nunique(dropna=False) <= 1
+                if not holds:
+                    alive[lhs].discard(bit)
+                    failed.add((lhs, bit))
+
+            if len(alive[lhs]) == 0:
+                del alive[lhs]
+                del seen[lhs]
+
+    return failed, rows
+
+
+# Mine all minimal non-trivial FDs of a CSV too large for the lattice walk (HyFD style).
+# Row pairs from a sample give FDs that certainly do not hold; the minimal determinants that
+# escape all of them are validated against the full file streamed in chunks, and any that fail
+# become new non-FDs until every remaining candidate holds. Sampling only prunes, so the result
+# is the same as discover_FDs on the whole table. Returns the FDs and per-phase statistics.
+def discover_FDs_hybrid(
+    path: str,
+    max_lhs: int = None,
+    sample_size: int = 10_000,
+    chunksize: int = 200_000,
+    window: int = 4,
+    seed: int = 0,
+) -> tuple[list[FunctionalDependency], dict]:
+    start = time.perf_counter()
+    sample, rows = sample_csv(path, sample_size, chunksize, seed)
+    columns = [str(col) for col in sample.columns]
+    sample.columns = columns
+    width = len(columns)
+    max_lhs = width - 1 if max_lhs is None else max_lhs
+    everything = (1 << width) - 1
+
+    # Phase 1: non-FDs from the sample. An agree set S means S -> A fails for every A outside S.
+    agreements = agree_sets(sample, window)
+    non_FDs = [[] for _ in range(width)]
+    for agree in agreements:
+        for bit in iter_bits(everything & ~agree):
+            non_FDs[bit].append(agree)
+    stats = {
+        "rows": rows,
+        "sample_rows": len(sample),
+        "agree_sets": len(agreements),
+        "sample_non_FDs": sum(len(negatives) for negatives in non_FDs),
+        "candidates": 0,
+        "validation_passes": 0,
+        "rows_validated": 0,
+        "candidates_failed": 0,
+        "constant_columns": [],
+    }
+
+    # Phase 2: validate the minimal candidates on the full file, refining until none fail
+    found = {}  # Dependent bit -> determinant masks that hold
+    pending = set(range(width))
+    while len(pending) > 0:
+        candidates = {}
+        for bit in sorted(pending):
+            for lhs in minimal_candidates(
+                non_FDs[bit], everything & ~(1 << bit), max_lhs
+            ):
+                if lhs not in found.get(bit, []):
+                    candidates.setdefault(lhs, []).append(bit)
+        count = sum(len(bits) for bits in candidates.values())
+        if count == 0:
+            break
+
+        stats["candidates"] += count
+        stats["validation_passes"] += 1
+        failed, streamed = validate_candidates(path, columns, candidates, chunksize)
+        stats["rows_validated"] += streamed
+        stats["candidates_failed"] += len(failed)
+
+        pending = set()
+        for lhs, bits in candidates.items():
+            for bit in bits:
+                if (lhs, bit) in failed:
+                    non_FDs[bit].append(lhs)
+                    pending.add(bit)
+                else:
+                    found.setdefault(bit, []).append(lhs)
+
+    # Constant columns are reported, but an empty determinant is not a usable FD
+    merged = {}
+    for bit, determinants in found.items():
+        if 0 in determinants:
+            stats["constant_columns"].append(columns[bit])
+            continue
+        for lhs in determinants:
+            merged[lhs] = merged.get(lhs, 0) | (1 << bit)
+
+    stats["seconds"] = time.perf_counter() - start
+    return to_FDs(merged, columns), stats
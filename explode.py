@@ -0,0 +1,107 @@
+# Splitting multivalued attributes and exploding them into one row per value. A split column
+# is held as a list column in the Arrow layout: one flat array of values and an offsets array
+# where row i holds values[offsets[i]:offsets[i + 1]]. Delimited strings are split once per
+# distinct value and the rows are gathered from those splits, so no Python code runs per row.
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+class ListColumn:
+    def __init__(self, offsets: np.ndarray, values: pd.Series):
+        self.offsets = offsets  # Row i holds values[offsets[i]:offsets[i + 1]]
+        self.values = values  # The values of every row, one row after another
+
+    # Number of values in each row
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    # Bytes held by the offsets and the values
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + int(self.values.memory_usage(index=False))
+
+
+# Offsets of rows holding the given numbers of values
+def lengths_to_offsets(lengths: np.ndarray) -> np.ndarray:
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+# Split distinct strings into their raw pieces, as a series of pieces indexed by the position
+# of the string they came from. storage is a delimiter, "nested" for bracketed lists written
+# as text, or None for strings that hold a single value.
+def split_distinct(values: pd.Series, storage: str) -> pd.Series:
+    values = values.reset_index(drop=True)
+    if storage is None:
+        return values
+    if storage == "nested":
+        values = values.str.strip().str.slice(1, -1)
+        storage = ","
+    return values.str.split(storage, regex=False).explode()
+
+
+# Split a column into a list column. Strings are split by their storage once per distinct
+# value, and the pieces are trimmed once per distinct piece; an encoded column's pieces share
+# a new dictionary. "list" columns hold containers, and a storage of None makes every value
+# a one-value list. Nulls and empty pieces are dropped, so a null becomes an empty list.
+def split_column(column: pd.Series, storage: str) -> ListColumn:
+    if storage == "list":
+        lengths = column.map(len, na_action="ignore").fillna(0).to_numpy(np.int64)
+        cells = column[lengths > 0]
+        values = pd.Series(list(itertools.chain.from_iterable(cells)), dtype=object)
+        return ListColumn(lengths_to_offsets(lengths), values)
+
+    codes, uniques = pd.factorize(column)
+    pieces = split_distinct(pd.Series(uniques).astype(str), storage)
+
+    # Trim every distinct piece once and drop the ones left empty
+    raw_codes, raw = pd.factorize(pieces.to_numpy())
+    trimmed = pd.Series(raw).astype(str).str.strip()
+    if storage == "nested":
+        trimmed = trimmed.str.strip("\"'")
+    piece_codes, dictionary = pd.factorize(trimmed.to_numpy())
+    piece_codes = piece_codes[raw_codes]
+    kept = ~np.isin(piece_codes, np.flatnonzero(dictionary == ""))
+    piece_codes = piece_codes[kept]
+    piece_counts = np.bincount(pieces.index[kept], minlength=len(uniques))
+    piece_offsets = lengths_to_offsets(piece_counts)
+
+    # Gather the pieces of every row from the pieces of its distinct value
+    lengths = np.where(codes >= 0, piece_counts[np.maximum(codes, 0)], 0)
+    offsets = lengths_to_offsets(lengths)
+    rows = np.repeat(np.arange(len(column)), lengths)
+    take = piece_offsets[codes[rows]] + np.arange(offsets[-1]) - offsets[rows]
+
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        values = pd.Series(pd.Categorical.from_codes(piece_codes[take], dictionary))
+    else:
+        values = pd.Series(dictionary.take(piece_codes[take]))
+    return ListColumn(offsets, values)
+
+
+# Explode a table on list columns in one pass: each row is repeated once per value and the
+# list columns are laid out in lockstep, so they must hold as many values in every row.
+# The other columns are gathered with one take and keep their dtypes; rows with no values
+# are dropped. Returns the exploded table.
+def explode_table(table: pd.DataFrame, lists: dict[str, ListColumn]) -> pd.DataFrame:
+    lengths = None
+    for col, split in lists.items():
+        if lengths is None:
+            lengths = split.lengths
+        elif not np.array_equal(lengths, split.lengths):
+            raise ValueError(
+                "Multivalued attributes "
+                + ", ".join(lists)
+                + " do not hold the same number of values in every row"
+            )
+
+    rows = np.repeat(np.arange(len(table)), lengths)
+    others = [col for col in table.columns if col not in lists]
+    exploded = table[others].take(rows)
+    for col, split in lists.items():
+        exploded[col] = split.values.set_axis(exploded.index)
+    return exploded[list(table.columns)]
@@ -1,8 +1,21 @@
+import weakref
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
+from closure import ClosureEngine, candidate_keys
+from ingest import dictionary_codes
+from join_dependencies import find_join_dependencies
+
+# Largest product of column cardinalities that can be packed into one int64 group id
+_MAX_RADIX = 2**62
+
 
 # Check that the table is in 1NF, meaning there is a proper primary key, and each column must be atomic.  No multi-valued attributes or sets.
-def check_1NF(df: pd.DataFrame, key: list[str], mvAttributes: list[str]) -> bool:
+def check_1NF(
+    df: pd.DataFrame, key: list[str], mvAttributes: list[str], cache=None
+) -> bool:
     # Check that there are no multivalued attributes
     if mvAttributes is not None:
         return False
@@ -13,103 +26,257 @@ def check_1NF(df: pd.DataFrame, key: list[str], mvAttributes: list[str]) -> bool
             return False
 
     # Check that the primary key is unique and has no null values
-    df["combined"] = df[key].apply(lambda row: " ".join(row.values.astype(str)), axis=1)
-    is_unique = df["combined"].nunique() == len(df["combined"])
+    is_unique = is_superkey(df, key, cache)
     has_no_null = df[key].notnull().all().all()
 
-    df.drop(columns=["combined"], inplace=True)
-
     if not is_unique or not has_no_null:
         return False
 
-    # Check that each column contains atomic values
-    # Check that all entries in a column are of the same kind
-    for name in df.columns:
-        data_types = df[name].apply(lambda x: type(x)).unique()
-        if len(data_types) > 1 or not data_types[0] in [int, float, str]:
-            return False
+    # Check that each column contains one atomic value per cell
+    return analyze_1NF(df).atomic
+
+
+# Strings that separate the values of a multivalued attribute stored in one cell
+LIST_DELIMITERS = [",", ";", "|"]
+
+# Numbers written with thousands separators, such as 1,000 or -12,345.67, which are one value
+_THOUSANDS = r"^[+-]?\d{1,3}(,\d{3})+(\.\d+)?$"
+
+# Kinds of values pandas' type inference reports, grouped into the kinds a column can have
+_INFERRED_KINDS = {
+    "string": "string",
+    "integer": "numeric",
+    "floating": "numeric",
+    "mixed-integer-float": "numeric",
+    "decimal": "numeric",
+    "boolean": "boolean",
+    "datetime": "datetime",
+    "datetime64": "datetime",
+    "date": "datetime",
+    "time": "datetime",
+    "timedelta": "datetime",
+    "timedelta64": "datetime",
+    "empty": "empty",
+}
+
+
+# Kind of the values of a column: "numeric", "boolean", "datetime", "string", "empty" or
+# "mixed" when they are of several kinds or are containers. The dtype decides it when it
+# can; object columns take one vectorized pass of pandas' type inference, and an encoded
+# column is inferred from its dictionary. Nulls do not count as a kind of their own.
+def column_kind(column: pd.Series) -> str:
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        column = pd.Series(column.cat.categories)
+    dtype = column.dtype
+    if dtype.kind in "iufc":
+        return "numeric"
+    if dtype.kind == "b":
+        return "boolean"
+    if dtype.kind in "mM" or isinstance(dtype, pd.DatetimeTZDtype):
+        return "datetime"
+    if isinstance(dtype, pd.StringDtype):
+        return "string"
+    return _INFERRED_KINDS.get(pd.api.types.infer_dtype(column, skipna=True), "mixed")
+
+
+# Check that all entries in a column are of the same kind and that kind is atomic
+def is_atomic(column: pd.Series) -> bool:
+    return column_kind(column) != "mixed"
+
+
+# Result of the 1NF analysis of a table: the kind of every column and the columns found to
+# hold several values per cell, with how they are stored: "list" for container cells,
+# "nested" for bracketed lists or objects written as text, or the delimiter between values.
+class AtomicityReport:
+    def __init__(self):
+        self.kinds = {}  # Column -> kind of its values
+        self.multivalued = {}  # Column -> how the values of one cell are stored
+
+    # Columns mixing kinds of values without being multivalued
+    @property
+    def mixed(self) -> list[str]:
+        return [
+            col
+            for col, kind in self.kinds.items()
+            if kind == "mixed" and col not in self.multivalued
+        ]
+
+    # Whether every column holds one atomic value per cell
+    @property
+    def atomic(self) -> bool:
+        return len(self.multivalued) == 0 and len(self.mixed) == 0
+
+    def print(self):
+        for col, storage in self.multivalued.items():
+            print("Multivalued attribute", col, "(" + storage + ")")
+        for col in self.mixed:
+            print("Column", col, "mixes kinds of values")
+
+
+# How the distinct string values of a column store several values per cell, or None.
+# Bracketed text counts as nested when at least min_share of the values are bracketed.
+# Numbers with thousands separators are single values. A delimiter counts when every value
+# containing it splits into non-empty pieces, and either some value holds at least
+# min_pieces of them while no piece has several words, which prose and addresses do, or at
+# least min_share of the distinct pieces recur at different positions, a value standing
+# alone being a position of its own. Pieces that only recur at the same position, as the
+# surname of "Doe, John" and "Doe, Jane", are fields of a structured value instead.
+def string_storage(
+    values: pd.Series,
+    delimiters: list[str],
+    min_share: float = 0.5,
+    min_pieces: int = 3,
+) -> str:
+    if len(values) == 0:
+        return None
+    stripped = values.str.strip()
+    bracketed = stripped.str.match(r"^(\[.*\]|\{.*\})$")
+    if bracketed.any() and bracketed.sum() >= min_share * len(values):
+        return "nested"
+
+    numbers = stripped.str.match(_THOUSANDS)
+    values, stripped = values[~numbers], stripped[~numbers]
+    for delimiter in delimiters:
+        split = values[values.str.contains(delimiter, regex=False)]
+        if len(split) == 0:
+            continue
+        lists = split.str.split(delimiter, regex=False)
+        pieces = lists.explode().str.strip()
+        if (pieces == "").any():
+            continue
+        words = pieces.str.contains(r"\s", regex=True).any()
+        if lists.str.len().max() >= min_pieces and not words:
+            return delimiter
+
+        alone = stripped[~values.index.isin(split.index)]
+        occurrences = pd.DataFrame(
+            {
+                "piece": np.concatenate([pieces.to_numpy(), alone.to_numpy()]),
+                "position": np.concatenate(
+                    [
+                        pieces.groupby(level=0).cumcount().to_numpy(),
+                        np.full(len(alone), -1),
+                    ]
+                ),
+            }
+        )
+        positions = occurrences.drop_duplicates().value_counts("piece")
+        distinct = positions[positions.index.isin(pieces)]
+        if len(distinct) > 0 and (distinct > 1).sum() >= min_share * len(distinct):
+            return delimiter
+    return None
+
+
+# Analyze the columns of a table for 1NF without a Python call per cell. Column kinds come
+# from the dtypes and vectorized type inference; string columns are scanned once per distinct
+# value (the dictionary of an encoded column), or a fixed sample of max_values of them, for
+# list delimiters and nested structures, and mixed object columns are checked for container
+# cells. Returns an AtomicityReport.
+def analyze_1NF(
+    df: pd.DataFrame,
+    delimiters: list[str] = LIST_DELIMITERS,
+    max_values: int = 10_000,
+) -> AtomicityReport:
+    report = AtomicityReport()
+    for col in df.columns:
+        column = df[col]
+        kind = column_kind(column)
+        report.kinds[col] = kind
+
+        if kind == "string":
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                values = pd.Series(column.cat.categories)
+            else:
+                values = pd.Series(pd.unique(column.dropna()))
+            if len(values) > max_values:
+                values = values.sample(max_values, random_state=0)
+            storage = string_storage(values.astype(str), delimiters)
+            if storage is not None:
+                report.multivalued[col] = storage
+        elif kind == "mixed" and column.dtype == object:
+            containers = column.map(pd.api.types.is_list_like, na_action="ignore")
+            if containers.fillna(False).astype(bool).any():
+                report.multivalued[col] = "list"
+    return report
+
+
+# Check that the table is in 2NF, meaning it is in 1NF and every non-prime attribute is fully functionally dependent on every candidate key.
+def check_2NF(df: pd.DataFrame, FDs, key: list[str], cache=None) -> bool:
+    if cache is None:
+        cache = SuperkeyCache()
+    if not check_1NF(df, key, None, cache):
+        return False
 
-    return True
+    keys = candidate_keys(FDs, list(df.columns), key)
+    return len(partial_dependencies(FDs, keys)) == 0
 
 
-# Check that the table is in 2NF, meaning it is in 1NF and every non-prime attribute is fully functionally dependent on the primary key.
-def check_2NF(df: pd.DataFrame, FDs, key: list[str]) -> bool:
-    if not check_1NF(df, key, None):
+# Check that the table is in 3NF, meaning it is in 2NF and every non-prime attribute is non-transitively dependent on the candidate keys.
+def check_3NF(df: pd.DataFrame, FDs: list[str], key: list[str], cache=None) -> bool:
+    if cache is None:
+        cache = SuperkeyCache()
+    if not check_2NF(df, FDs, key, cache):
         return False
 
-    # Check that every non-prime attribute is fully functionally dependent on the primary key
-    for fd in FDs:
-        partial = False
-        determinant, dependent = fd.determinant, fd.dependent
-        determinant = determinant.split(", ")
-        dependent = dependent.split(", ")
-
-        # Check for partial dependency with non-prime attribute in dependent
-        if determinant != key:
-            for det in determinant:
-                if det in key:
-                    partial = True
-            if partial:
-                for col in dependent:
-                    # If non-prime attribute is in dependent, but determinant doesn't contain all of the key, then partial dependency
-                    if col not in key:
-                        return False
-
-    return True
+    keys = candidate_keys(FDs, list(df.columns), key)
+    return len(transitive_dependencies(df, FDs, keys, cache)) == 0
 
 
-# Check that the table is in 3NF, meaning it is in 2NF and every non-prime attribute is non-transitively dependent on the primary key.
-def check_3NF(df: pd.DataFrame, FDs: list[str], key: list[str]) -> bool:
-    if not check_2NF(df, FDs, key):
-        return False
-
-    # Check that every non-prime attribute is non-transitively dependent on the primary key
-    for FD in FDs:
-        determinant, dependent = FD.determinant, FD.dependent
-        determinant = determinant.split(", ")
-        dependent = dependent.split(", ")
-
-        # Check for transitive dependency with non-prime attribute in dependent
-        if determinant != key:
-            # Non-prime attribute
-            if dependent not in key:
-                if not is_superkey(df, determinant):
-                    return False
-    return True
+# Find the FDs where a proper part of a candidate key determines a non-prime attribute
+def partial_dependencies(FDs, keys: list[list[str]]) -> list:
+    prime = set(attribute for key in keys for attribute in key)
+    partial = []
+    for fd in FDs:
+        determinant = set(fd.determinants)
+        if any(determinant < set(key) for key in keys):
+            if any(col not in prime for col in fd.dependents):
+                partial.append(fd)
+    return partial
+
+
+# Find the FDs whose determinant is not a superkey of the table and that determine a non-prime attribute
+def transitive_dependencies(
+    df: pd.DataFrame, FDs, keys: list[list[str]], cache=None
+) -> list:
+    prime = set(attribute for key in keys for attribute in key)
+    transitive = []
+    for fd in FDs:
+        non_prime = [
+            col
+            for col in fd.dependents
+            if col not in prime and col not in fd.determinants
+        ]
+        if len(non_prime) > 0 and not is_superkey(df, fd.determinants, cache):
+            transitive.append(fd)
+    return transitive
 
 
 # Check that the table is in BCNF, meaning it is in 3NF and every determinant is a superkey
-def check_BCNF(df: pd.DataFrame, FDs: list[str], key: list[str]) -> bool:
-    if not check_3NF(df, FDs, key):
+def check_BCNF(df: pd.DataFrame, FDs: list[str], key: list[str], cache=None) -> bool:
+    if cache is None:
+        cache = SuperkeyCache()
+    if not check_3NF(df, FDs, key, cache):
         return False
 
     # Check that every determinant is a superkey
     for FD in FDs:
-        determinant, dependent = FD.determinant, FD.dependent
-        determinant = determinant.split(", ")
-        dependent = dependent.split(", ")
-
-        # Check for the determinant being a superkey
-        if not is_superkey(df, determinant):
+        if not is_superkey(df, FD.determinants, cache):
             return False
     return True
 
 
 # Check that the table is in 4NF, meaning it is in BCNF and for every non-trivial multivalued dependency X ->> Y, X is a superkey
 def check_4NF(
-    df: pd.DataFrame, FDs: list[str], MVFDs: list[str], key: list[str]
+    df: pd.DataFrame, FDs: list[str], MVFDs: list[str], key: list[str], cache=None
 ) -> bool:
-    if not check_BCNF(df, FDs, key):
+    if cache is None:
+        cache = SuperkeyCache()
+    if not check_BCNF(df, FDs, key, cache):
         return False
 
-    # Check for multivalued dependencies
-    for FD in MVFDs:
-        determinant, dependent = FD.determinant, FD.dependent
-        determinant = determinant.split(", ")
-        dependent = dependent.split(", ")
-
-        # Check determinant of multivalued dependency is a superkey
-        if not is_superkey(df, determinant):
+    # Check that the determinant of every multivalued dependency is a superkey
+    for MVD in MVFDs:
+        if not is_superkey(df, MVD.determinants, cache):
             return False
 
     return True
@@ -117,51 +284,241 @@ def check_4NF(
 
 # Check that the table is in 5NF, meaning it is in 4NF and for every non-trivial join dependency the intersection of the candidate keys of the relations contains a superky of R
 def check_5NF(
-    df: pd.DataFrame, FDs: list[str], MVDs: list[str], key: list[str]
+    df: pd.DataFrame, FDs: list[str], MVDs: list[str], key: list[str], cache=None
 ) -> bool:
-    if not check_4NF(df, FDs, MVDs, key):
+    if cache is None:
+        cache = SuperkeyCache()
+    if not check_4NF(df, FDs, MVDs, key, cache):
         return False
 
-    # Check that for every non-trivial join dependency the intersection of the candidate keys of the relations contains a superky of R
-    attributes = set(df.columns)
+    # Every join dependency that holds must be implied by the candidate keys
+    return len(find_join_dependencies(df, FDs, key, MVDs)[0]) == 0
 
-    for attribute in attributes:
-        remaining_attributes = attributes - set([attribute])
-        if not find_closure(df, attributes, remaining_attributes) == attributes:
-            return False
 
-    return True
+NORMAL_FORMS = ["1NF", "2NF", "3NF", "BCNF", "4NF", "5NF"]
 
 
-def is_superkey(df: pd.DataFrame, determinant: list[str]) -> bool:
-    df["combined"] = df[determinant].apply(
-        lambda row: " ".join(row.values.astype(str)), axis=1
-    )
-    is_unique = df["combined"].nunique() == len(df["combined"])
-    df.drop(columns=["combined"], inplace=True)
+# Result of classifying a relation: the violations found at each normal form level.
+# 1NF violations are descriptions, 2NF through BCNF violations are the offending FDs,
+# 4NF violations are the offending MVDs and 5NF violations are the offending join dependencies.
+class NormalFormReport:
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.violations = {form: [] for form in NORMAL_FORMS}
+        self.checked = []  # Levels that were evaluated, in ladder order
 
-    if is_unique:
+    # A relation is in a normal form when that level and every level below it have no violations
+    def satisfies(self, form: str) -> bool:
+        for level in NORMAL_FORMS[: NORMAL_FORMS.index(form) + 1]:
+            if level not in self.checked or len(self.violations[level]) > 0:
+                return False
         return True
+
+    @property
+    def highest(self) -> str:
+        highest = None
+        for form in NORMAL_FORMS:
+            if not self.satisfies(form):
+                break
+            highest = form
+        return highest
+
+    def print(self):
+        print("Normal form report for", self.name)
+        for form in self.checked:
+            status = "OK" if len(self.violations[form]) == 0 else "violated by:"
+            print(" ", form, status)
+            for violation in self.violations[form]:
+                text = getattr(violation, "jd", violation)
+                text = getattr(violation, "mvd", text)
+                print("     ", getattr(violation, "fd", text))
+
+
+# Classify a relation against every normal form level in one pass.
+# The atomicity scan and each distinct superkey test run once and are shared by every level;
+# the superkey results live in a cache for this call only, unless one is passed in.
+def classify(
+    relation, MVDs: list = None, upto: str = "5NF", cache=None
+) -> NormalFormReport:
+    if cache is None:
+        cache = SuperkeyCache()
+    df, key = relation.table, relation.key
+    FDs = relation.FDs
+    MVDs = relation.MVDs if MVDs is None else MVDs
+    report = NormalFormReport(relation.name)
+    levels = NORMAL_FORMS[: NORMAL_FORMS.index(upto) + 1]
+
+    # 1NF: no multivalued attributes, a unique non-null key and atomic columns
+    violations = report.violations["1NF"]
+    if relation.mvAttributes:
+        for attribute in relation.mvAttributes:
+            violations.append("multivalued attribute " + attribute)
+    missing = [col for col in key if col not in df.columns]
+    for col in missing:
+        violations.append("key column " + col + " is not in the table")
+    if len(missing) == 0:
+        if not is_superkey(df, key, cache):
+            violations.append("key " + ", ".join(key) + " is not unique")
+        if not df[key].notnull().all().all():
+            violations.append("key " + ", ".join(key) + " has null values")
+    atomicity = analyze_1NF(df)
+    for name in atomicity.multivalued:
+        if name not in (relation.mvAttributes or []):
+            violations.append("multivalued attribute " + name)
+    for name in atomicity.mixed:
+        violations.append("column " + name + " is not atomic")
+    report.checked.append("1NF")
+
+    for form in levels[1:]:
+        violations = report.violations[form]
+
+        # 2NF: a proper part of a candidate key must not determine a non-prime attribute
+        if form == "2NF":
+            keys = candidate_keys(FDs, list(df.columns), key)
+            violations.extend(partial_dependencies(FDs, keys))
+
+        # 3NF: a non-superkey must not determine a non-prime attribute
+        if form == "3NF":
+            violations.extend(transitive_dependencies(df, FDs, keys, cache))
+
+        # BCNF: every determinant must be a superkey
+        if form == "BCNF":
+            for fd in FDs:
+                if not is_superkey(df, fd.determinants, cache):
+                    violations.append(fd)
+
+        # 4NF: every multivalued dependency determinant must be a superkey
+        if form == "4NF":
+            for mvd in MVDs:
+                if not is_superkey(df, mvd.determinants, cache):
+                    violations.append(mvd)
+
+        # 5NF: every join dependency that holds must be implied by the candidate keys
+        if form == "5NF":
+            violations.extend(find_join_dependencies(df, FDs, key, MVDs)[0])
+
+        report.checked.append(form)
+
+    return report
+
+
+# Factorize one column into integer codes and its number of distinct values.
+# Nulls are kept as their own value so they group the same way the old string join did.
+# Dictionary-encoded columns already hold their codes and are not hashed again.
+def factorize_column(df: pd.DataFrame, col: str, cache: dict = None) -> tuple:
+    if cache is not None and col in cache:
+        return cache[col]
+    if isinstance(df[col].dtype, pd.CategoricalDtype):
+        result = dictionary_codes(df[col])
     else:
+        col_codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+        result = (col_codes, max(len(uniques), 1))
+    if cache is not None:
+        cache[col] = result
+    return result
+
+
+# Encode the combination of columns as one integer group id per row without touching the dataframe.
+# Passing the same cache dict to several calls factorizes each column only once.
+def group_codes(df: pd.DataFrame, columns: list[str], cache: dict = None) -> np.ndarray:
+    if len(columns) == 0:
+        return np.zeros(len(df), dtype=np.int64)
+
+    codes = np.zeros(len(df), dtype=np.int64)
+    cardinality = 1
+    for col in columns:
+        col_codes, size = factorize_column(df, col, cache)
+
+        # Re-factorize the running codes before the mixed radix product could overflow int64
+        if cardinality * size >= _MAX_RADIX:
+            codes, combined = pd.factorize(codes)
+            cardinality = max(len(combined), 1)
+
+        codes = codes * size + col_codes
+        cardinality *= size
+
+    return codes
+
+
+# Bounded LRU cache of superkey results, kept per table and keyed by the attribute set.
+# A table's entries are dropped as soon as its fingerprint (columns and row count) changes,
+# so transforms that add or drop columns never see stale answers. An edit of values in place
+# keeps the fingerprint, so a cache only lives as long as one classify or check_* call,
+# during which the tables are not modified.
+class SuperkeyCache:
+    def __init__(self, max_tables: int = 64, max_entries: int = 1024):
+        self.max_tables = max_tables  # How many tables are remembered at once
+        self.max_entries = (
+            max_entries  # How many attribute sets are remembered per table
+        )
+        self.tables = OrderedDict()  # id(table) -> (weakref, fingerprint, results)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame) -> tuple:
+        return (tuple(df.columns), len(df))
+
+    # Return the results for a table, starting fresh if the table changed or is a new object
+    def _results(self, df: pd.DataFrame) -> OrderedDict:
+        entry = self.tables.get(id(df))
+        fingerprint = self.fingerprint(df)
+        if entry is None or entry[0]() is not df or entry[1] != fingerprint:
+            entry = (weakref.ref(df), fingerprint, OrderedDict())
+            self.tables[id(df)] = entry
+            if len(self.tables) > self.max_tables:
+                self.tables.popitem(last=False)
+        self.tables.move_to_end(id(df))
+        return entry[2]
+
+    def get(self, df: pd.DataFrame, attributes: list[str]):
+        results = self._results(df)
+        attributes = frozenset(attributes)
+        if attributes in results:
+            self.hits += 1
+            results.move_to_end(attributes)
+            return results[attributes]
+        self.misses += 1
+        return None
+
+    def put(self, df: pd.DataFrame, attributes: list[str], unique: bool):
+        results = self._results(df)
+        results[frozenset(attributes)] = unique
+        if len(results) > self.max_entries:
+            results.popitem(last=False)
+
+    def invalidate(self, df: pd.DataFrame = None):
+        if df is None:
+            self.tables.clear()
+        else:
+            self.tables.pop(id(df), None)
+
+
+# Check if the determinant uniquely identifies every row of the table, looking the result up
+# in the cache first when one is given
+def is_superkey(
+    df: pd.DataFrame, determinant: list[str], cache: SuperkeyCache = None
+) -> bool:
+    # Determinants that reference columns no longer in the table can never be superkeys
+    if any(col not in df.columns for col in determinant):
         return False
 
+    if len(df) <= 1:
+        return True
+
+    unique = cache.get(df, determinant) if cache is not None else None
+    if unique is None:
+        codes = group_codes(df, determinant)
+        unique = len(pd.unique(codes)) == len(codes)
+        if cache is not None:
+            cache.put(df, determinant, unique)
+
+    return unique
+
 
-def find_closure(df, attributes, candidate):
-    closure = set(candidate)
-    changed = True
-    while changed:
-        changed = False
-        for FD in attributes:
-            determinant, dependent = FD.determinant, FD.dependent
-            determinant = determinant.split(", ")
-            dependent = dependent.split(", ")
-            if set(determinant).issubset(closure) and not set(dependent).issubset(
-                closure
-            ):
-                closure = closure.union(set(dependent))
-                changed = True
-
-    return closure
+# Find the closure of the candidate attributes under the FDs
+def find_closure(df, FDs, candidate):
+    return ClosureEngine(FDs).closure(candidate)
 
 
 # Main function for testing
@@ -0,0 +1,215 @@
+# Loading input CSV files into compact DataFrames. The file is read with the C engine in
+# chunks, or in one go with the multithreaded pyarrow engine when it is installed, and every
+# column is stored in the smallest dtype that holds it: integers are downcast and strings
+# with few distinct values become categoricals. encode_table then dictionary-encodes the
+# remaining string columns, so the rest of the program works on integer codes.
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+try:
+    import pyarrow  # noqa: F401
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+CSV_OPTIONS = {"header": 0, "sep": ",", "quotechar": '"', "encoding": "utf8"}
+
+
+# Peak resident memory of the process in bytes, or None where it cannot be measured
+def peak_memory() -> int:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Store a column in a smaller dtype when that loses nothing. Integers take the smallest
+# width that holds their range, strings with at most categorical_ratio distinct values per
+# row become categoricals and categoricals with more go back to strings.
+def compact_column(column: pd.Series, categorical_ratio: float) -> pd.Series:
+    if pd.api.types.is_integer_dtype(column.dtype):
+        return pd.to_numeric(column, downcast="integer")
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        if len(column.cat.categories) > categorical_ratio * len(column):
+            return column.astype(column.cat.categories.dtype)
+        return column
+    if pd.api.types.is_string_dtype(column.dtype) and len(column) > 0:
+        if column.nunique(dropna=False) <= categorical_ratio * len(column):
+            return column.astype("category")
+    return column
+
+
+# Read a CSV with the C engine in chunks, parsing the file once. The dtypes are inferred
+# chunk by chunk and a column keeps numbers or booleans while all its chunks agree on them,
+# so every column gets one dtype for the whole file. A column holding text is stored as
+# strings; when some of its chunks were parsed as something else, their text is gone and
+# that column alone is read again as text at the end. String chunks are turned into
+# categoricals as they arrive and joined through the union of their categories, which keeps
+# the raw strings of only one chunk in memory.
+def read_chunks(path: str, chunksize: int) -> tuple[pd.DataFrame, int]:
+    parts = None
+    kinds = {}  # Column -> kind of its chunks: "number", "bool" or "text"
+    reread = []  # Text columns whose text has to be read again
+    rows = 0
+    chunks = 0
+    with warnings.catch_warnings():
+        # Chunks of mixed types are read again below, the parser need not warn about them
+        warnings.simplefilter("ignore", pd.errors.DtypeWarning)
+        for chunk in pd.read_csv(path, engine="c", chunksize=chunksize, **CSV_OPTIONS):
+            rows += len(chunk)
+            chunks += 1
+            if parts is None:
+                parts = {col: [] for col in chunk.columns}
+            for col in chunk.columns:
+                if col in reread:
+                    continue
+                part = chunk[col]
+                kind = chunk_kind(part)
+                if kind is not None and kinds.setdefault(col, kind) == kind:
+                    parts[col].append(
+                        part.astype("category") if kind == "text" else part
+                    )
+                else:
+                    # The kinds disagree, or the chunk mixes numbers and strings, which the
+                    # parser gives when it reads a chunk in blocks: the text of some is gone
+                    reread.append(col)
+                    parts[col] = None
+
+    # Without rows there is nothing to infer dtypes from
+    if rows == 0:
+        return pd.read_csv(path, engine="c", **CSV_OPTIONS), 1
+
+    texts = read_text(path, reread, chunksize)
+    columns = {}
+    for col in list(parts):
+        if col in texts:
+            columns[col] = texts.pop(col)
+        elif kinds[col] == "text":
+            columns[col] = pd.Series(
+                pd.api.types.union_categoricals(parts.pop(col), ignore_order=True)
+            )
+        else:
+            columns[col] = pd.concat(parts.pop(col), ignore_index=True)
+    return pd.DataFrame(columns), chunks
+
+
+# Kind of values of a chunk of a column as read_csv inferred them: "number", "bool", "text"
+# when every value is a string or a null, and None for anything else
+def chunk_kind(part: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(part.dtype):
+        return "bool"
+    if part.dtype.kind in "iuf":
+        return "number"
+    if pd.api.types.infer_dtype(part) in ["string", "empty"]:
+        return "text"
+    return None
+
+
+# Read some columns of a CSV as text, in categorical chunks joined by their categories
+def read_text(path: str, columns: list[str], chunksize: int) -> dict[str, pd.Series]:
+    if len(columns) == 0:
+        return {}
+    parts = {col: [] for col in columns}
+    for chunk in pd.read_csv(
+        path,
+        engine="c",
+        usecols=columns,
+        chunksize=chunksize,
+        dtype=str,
+        **CSV_OPTIONS,
+    ):
+        for col in columns:
+            parts[col].append(chunk[col].astype("category"))
+    return {
+        col: pd.Series(pd.api.types.union_categoricals(parts[col], ignore_order=True))
+        for col in columns
+    }
+
+
+# Load a CSV into a compact DataFrame. The engine is "c", "pyarrow" or "auto", which uses
+# pyarrow when it is installed; the C engine reads chunksize rows at a time. Returns the
+# table with the rows read, the chunks, the time taken, the rows per second, the memory the
+# table takes and the peak memory of the process.
+def read_table(
+    path: str,
+    engine: str = "auto",
+    chunksize: int = 1_000_000,
+    categorical_ratio: float = 0.5,
+) -> tuple[pd.DataFrame, dict]:
+    start = time.perf_counter()
+    if engine == "auto":
+        engine = "pyarrow" if HAS_PYARROW else "c"
+    if engine == "pyarrow":
+        df = pd.read_csv(path, engine="pyarrow", **CSV_OPTIONS)
+        chunks = 1
+    else:
+        df, chunks = read_chunks(path, chunksize)
+
+    for col in df.columns:
+        df[col] = compact_column(df[col], categorical_ratio)
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "engine": engine,
+        "rows": len(df),
+        "chunks": chunks,
+        "seconds": seconds,
+        "rows_per_second": len(df) / seconds if seconds > 0 else float("inf"),
+        "memory": int(df.memory_usage(deep=True).sum()),
+        "peak_memory": peak_memory(),
+    }
+    return df, stats
+
+
+# Dictionary-encode a table once: every column that is not numeric becomes a categorical,
+# an integer code per row (int8 up to int32, by the number of values) and one dictionary of
+# its distinct values. Projections and deduplicated copies share the dictionaries, so the
+# checks and transforms group, compare and drop duplicates on the codes, and values are
+# only looked up again when the table is printed or written. Returns the encoded table with
+# its memory before and after and the number of columns encoded.
+def encode_table(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    stats = {
+        "memory_before": int(df.memory_usage(deep=True).sum()),
+        "memory_after": 0,
+        "encoded": 0,
+    }
+    columns = {}
+    for col in df.columns:
+        column = df[col]
+        if column.dtype.kind in "iufb" or isinstance(column.dtype, pd.CategoricalDtype):
+            columns[col] = column
+        else:
+            columns[col] = column.astype("category")
+            stats["encoded"] += 1
+    encoded = pd.DataFrame(columns, index=df.index)
+    stats["memory_after"] = int(encoded.memory_usage(deep=True).sum())
+    return encoded, stats
+
+
+# Integer codes of a dictionary-encoded (categorical) column and the size of its dictionary.
+# The codes are used as they are; nulls (code -1) get the code just past the dictionary.
+def dictionary_codes(column: pd.Series) -> tuple[np.ndarray, int]:
+    codes = column.cat.codes.to_numpy()
+    size = len(column.cat.categories)
+    if column.hasnans:
+        codes = np.where(codes < 0, size, codes)
+        size += 1
+    return codes, max(size, 1)
+
+
+# Print the table, or an evenly spread sample of max_rows of its rows when it is larger
+def print_table(df: pd.DataFrame, max_rows: int = 20, seed: int = 0):
+    if len(df) <= max_rows:
+        print(df)
+    else:
+        print(df.sample(max_rows, random_state=seed).sort_index())
+        print("[" + str(max_rows), "of", len(df), "rows shown]")
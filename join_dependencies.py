@@ -0,0 +1,218 @@
+# Detection of join dependencies that hold in a table but are not implied by its candidate
+# keys, the violations of 5NF. Candidates come from the MVDs (binary) and from triples of key
+# attributes (ternary). Each is tested by joining the projections of the table back together
+# and counting the rows, first on a sample and then on the full table.
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from chase import lossless_join
+from closure import ClosureEngine, candidate_keys
+from ingest import dictionary_codes
+
+
+class JoinDependency:
+    def __init__(self, components: list[list[str]]):
+        self.components = (
+            components  # Attribute lists whose projections join back to the table
+        )
+        self.jd = "*(" + " | ".join(", ".join(c) for c in components) + ")"
+
+    def print(self):
+        print(self.jd)
+
+
+# Suggest candidate join dependencies of a table. An MVD X ->> Y gives the binary *(XY, XZ)
+# and three key attributes a, b, c with the other columns D give the ternary
+# *(abD, bcD, acD), which holds when the key values only pair up through their projections.
+def candidate_JDs(
+    columns: list[str], keys: list[list[str]], MVDs: list = None
+) -> list[JoinDependency]:
+    order = {col: i for i, col in enumerate(columns)}
+    candidates = []
+    seen = set()
+
+    def add(components: list[set]):
+        components = [sorted(c, key=order.get) for c in components]
+        signature = frozenset(frozenset(c) for c in components)
+        if signature not in seen and all(len(c) < len(columns) for c in components):
+            seen.add(signature)
+            candidates.append(JoinDependency(components))
+
+    for mvd in MVDs or []:
+        if not all(col in columns for col in mvd.determinants):
+            continue
+        determinant = set(mvd.determinants)
+        dependent = set(col for col in mvd.dependents if col in columns) - determinant
+        rest = set(columns) - determinant - dependent
+        if dependent and rest:
+            add([determinant | dependent, determinant | rest])
+
+    for key in keys:
+        for a, b, c in itertools.combinations(key, 3):
+            rest = set(columns) - {a, b, c}
+            add([rest | {a, b}, rest | {b, c}, rest | {a, c}])
+
+    return candidates
+
+
+# Join the deduplicated projections of a table of codes and count the rows, stopping once
+# the count passes stop. The first projection is joined in chunks sized from the exact
+# fan-out of the first join, so no intermediate result holds much more than max_rows.
+# Returns None when a single chunk still grows past max_rows or the deadline passes.
+def project_join_size(
+    codes: pd.DataFrame,
+    components: list[list[str]],
+    stop: int,
+    max_rows: int,
+    deadline: float,
+) -> int:
+    projections = [codes[c].drop_duplicates() for c in components]
+
+    # Join next the projection sharing the most columns with what is joined so far
+    ordered = [projections.pop(0)]
+    joined = set(ordered[0].columns)
+    while projections:
+        shared = [len(set(p.columns) & joined) for p in projections]
+        ordered.append(projections.pop(int(np.argmax(shared))))
+        joined |= set(ordered[-1].columns)
+
+    first, second = ordered[0], ordered[1]
+    on = [col for col in second.columns if col in first.columns]
+    if len(on) == 0:
+        fanout = np.full(len(first), len(second))
+    else:
+        counts = pd.Series(pd.util.hash_pandas_object(second[on], index=False))
+        counts = counts.value_counts()
+        keys = pd.util.hash_pandas_object(first[on], index=False)
+        fanout = counts.reindex(keys.to_numpy()).fillna(0).to_numpy()
+    bounds = np.searchsorted(
+        np.cumsum(fanout), np.arange(max_rows, fanout.sum() + max_rows, max_rows)
+    )
+
+    total = 0
+    start = 0
+    for end in np.unique(np.append(bounds + 1, len(first))):
+        if end <= start:
+            continue
+        if time.perf_counter() > deadline:
+            return None
+        frame = first.iloc[start:end]
+        start = end
+        for right in ordered[1:]:
+            on = [col for col in right.columns if col in frame.columns]
+            if len(on) == len(right.columns):
+                # Every column is already joined, so the projection only filters rows
+                member = pd.util.hash_pandas_object(frame[on], index=False).isin(
+                    pd.util.hash_pandas_object(right, index=False)
+                )
+                frame = frame[member.to_numpy()]
+            elif len(on) == 0:
+                frame = frame.merge(right, how="cross")
+            else:
+                frame = frame.merge(right, on=on, how="inner")
+            if len(frame) > 2 * max_rows:
+                return None
+        total += len(frame)
+        if total > stop:
+            break
+    return total
+
+
+# Find the join dependencies that hold in a table but are not implied by its candidate keys.
+# Every candidate is first joined back on a sample: the rows whose value of one attribute
+# hashes into one of several partitions. Selecting on one attribute keeps a join dependency
+# that holds, so failing on the sample proves failing on the table. Candidates passing the
+# sample are confirmed on the full table. Each candidate gets time_budget seconds and is
+# skipped (counted as aborted) when it runs out or a join chunk cannot be kept near max_rows.
+# Returns the join dependencies found and statistics of the search.
+def find_join_dependencies(
+    df: pd.DataFrame,
+    FDs: list,
+    key: list[str] = None,
+    MVDs: list = None,
+    sample_rows: int = 50_000,
+    time_budget: float = 5.0,
+    max_rows: int = 1_000_000,
+    max_candidates: int = 64,
+) -> tuple[list[JoinDependency], dict]:
+    stats = {
+        "candidates": 0,
+        "implied": 0,
+        "pruned_by_sample": 0,
+        "failed": 0,
+        "aborted": 0,
+        "found": 0,
+    }
+    columns = list(df.columns)
+    if len(df) == 0 or len(columns) < 2:
+        return [], stats
+
+    FDs = [
+        fd for fd in FDs if all(c in columns for c in fd.determinants + fd.dependents)
+    ]
+    keys = candidate_keys(FDs, columns, key)
+    candidates = candidate_JDs(columns, keys, MVDs)[:max_candidates]
+    stats["candidates"] = len(candidates)
+
+    # A join dependency implied by the candidate keys does not break 5NF
+    engine = ClosureEngine(attributes=columns)
+    schema = engine.all_mask
+    for candidate_key in keys:
+        engine.add_mask(engine.mask(candidate_key), schema)
+
+    codes = pd.DataFrame(
+        {
+            col: (
+                dictionary_codes(df[col])[0]
+                if isinstance(df[col].dtype, pd.CategoricalDtype)
+                else pd.factorize(df[col], use_na_sentinel=False)[0]
+            )
+            for col in columns
+        }
+    )
+    codes = codes.drop_duplicates(ignore_index=True)
+    partitions = max(1, -(-len(codes) // sample_rows))
+    samples = {}
+
+    found = []
+    for candidate in candidates:
+        if lossless_join(engine, [engine.mask(c) for c in candidate.components]):
+            stats["implied"] += 1
+            continue
+        deadline = time.perf_counter() + time_budget
+
+        if partitions > 1:
+            # Sample on the attribute with the most distinct values, for even partitions
+            pivot = max(
+                set(itertools.chain(*candidate.components)),
+                key=lambda col: int(codes[col].max()),
+            )
+            if pivot not in samples:
+                hashes = pd.util.hash_array(codes[pivot].to_numpy())
+                samples[pivot] = codes[hashes % partitions == 0].reset_index(drop=True)
+            sample = samples[pivot]
+            size = project_join_size(
+                sample, candidate.components, len(sample), max_rows, deadline
+            )
+            if size is None:
+                stats["aborted"] += 1
+                continue
+            if size > len(sample):
+                stats["pruned_by_sample"] += 1
+                continue
+
+        size = project_join_size(
+            codes, candidate.components, len(codes), max_rows, deadline
+        )
+        if size is None:
+            stats["aborted"] += 1
+        elif size > len(codes):
+            stats["failed"] += 1
+        else:
+            found.append(candidate)
+
+    stats["found"] = len(found)
+    return found, stats
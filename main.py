@@ -1,24 +1,56 @@
+import os
+
 import pandas as pd
-from form_finder import (
-    check_1NF,
-    check_2NF,
-    check_3NF,
-    check_4NF,
-    check_5NF,
-    check_BCNF,
-)
+from discovery import discover_FDs, discover_FDs_hybrid
+from form_finder import analyze_1NF, classify
 from normalizer import (
-    transform_to_1NF,
+    decompose_1NF,
     transform_to_2NF,
     transform_to_3NF,
-    transform_to_BCNF,
+    synthesize_3NF,
+    decompose_BCNF,
     transform_to_4NF,
-    transform_to_5NF,
+    decompose_5NF,
     update_relationNames,
+    minimal_cover,
     Relation,
     MultiValuedDependency,
     FunctionalDependency,
 )
+from validation import check_MVD, validate_FDs, validate_MVDs_data, verify_join
+from chase import verify_decomposition
+from ingest import encode_table, print_table, read_table
+from writers import write_relations
+
+# Limits for mining FDs from the data when no FD file is given
+DISCOVERY_MAX_LHS = 3  # Largest determinant size to search
+DISCOVERY_TIME_BUDGET = 60.0  # Seconds before discovery stops with what it found
+DISCOVERY_WORKERS = (
+    os.cpu_count() or 1
+)  # Processes used on large tables (see discovery.py)
+
+# Reading the input table: "c" reads in chunks, "pyarrow" in parallel, "auto" picks pyarrow
+# when it is installed. Large tables are printed as a sample of PRINT_ROWS rows.
+CSV_ENGINE = "auto"
+CSV_CHUNKSIZE = 1_000_000
+PRINT_TABLE = True
+PRINT_ROWS = 20
+
+# Dictionary-encode the table once after reading it, so checks and transforms work on codes
+ENCODE_TABLE = True
+
+# Check the normalized relations for a lossless join and preserved FDs before writing them
+VERIFY_DECOMPOSITION = True
+
+# Join the normalized relations back together and compare them to the input table
+VERIFY_JOIN = True
+
+# The rows of the normalized relations are streamed to a file per relation in OUTPUT_DIR,
+# as "csv", "json" (JSON Lines) or "parquet" (needs pyarrow), OUTPUT_CHUNK_ROWS rows at a
+# time, next to a schema.json manifest. None writes the tables into output.txt instead.
+OUTPUT_FORMAT = "csv"
+OUTPUT_DIR = "output"
+OUTPUT_CHUNK_ROWS = 100_000
 
 
 def get_inputs():
@@ -31,13 +63,16 @@ def get_inputs():
 
     input_table = "exampleInputTable.csv"
 
-    # Then ask user for functional dependencies as text file
-    input_FD = input("Input functional dependencies file: ")
-    while input_FD[-4:] != ".txt":
+    # Then ask user for functional dependencies as text file, or to discover them from the data
+    input_FD = input("Input functional dependencies file (or 'discover' / 'hybrid'): ")
+    while input_FD[-4:] != ".txt" and input_FD not in ["discover", "hybrid"]:
         print("Invalid input. Please try again.")
-        input_FD = input("Input functional dependencies file: ")
+        input_FD = input(
+            "Input functional dependencies file (or 'discover' / 'hybrid'): "
+        )
 
-    input_FD = "exampleFunctionalDependencies.txt"
+    if input_FD not in ["discover", "hybrid"]:
+        input_FD = "exampleFunctionalDependencies.txt"
 
     # Then ask user for multivalued dependencies as text file
     input_MVD = input("Input multivalued dependencies file: ")
@@ -53,12 +88,12 @@ def get_inputs():
 
     # Ask the user for the highest normal form to reach
     Normal_Form = input(
-        "Choice of the highest normal form to reach (1: 1NF, 2: 2NF, 3: 3NF, B: BCNF, 4: 4NF, 5: 5NF): "
+        "Choice of the highest normal form to reach (1: 1NF, 2: 2NF, 3: 3NF, S: 3NF by synthesis, B: BCNF, 4: 4NF, 5: 5NF): "
     )
-    while Normal_Form not in ["1", "2", "3", "B", "4", "5"]:
+    while Normal_Form not in ["1", "2", "3", "S", "B", "4", "5"]:
         print("Invalid input. Please try again.")
         Normal_Form = input(
-            "Choice of the highest normal form to reach (1: 1NF, 2: 2NF, 3: 3NF, B: BCNF, 4: 4NF, 5: 5NF): "
+            "Choice of the highest normal form to reach (1: 1NF, 2: 2NF, 3: 3NF, S: 3NF by synthesis, B: BCNF, 4: 4NF, 5: 5NF): "
         )
 
     # Ask the user if they want us to find the highest normal form of the input table
@@ -73,11 +108,14 @@ def get_inputs():
 
     highest_Form = highest_Form == "1"
 
-    # Ask the user for the primary key of the table
+    # Ask the user for the primary key of the table, or leave it empty to derive it from the FDs
     done = False
     while not done:
         done = True
-        key = input("Key (can be composite): ")
+        key = input("Key (can be composite, leave empty to find it from the FDs): ")
+        if key == "":
+            key = None
+            break
         key = key.split(", ")
         for k in key:
             if k not in df.columns:
@@ -105,10 +143,38 @@ def get_inputs():
 
 # Parse an input csv file representing a dataset information into a Pandas dataframe structure
 def table_parser(input_file: str) -> pd.DataFrame:
-    df = pd.read_csv(
-        input_file, header=0, sep=",", quotechar='"', encoding="utf8", engine="python"
+    df, stats = read_table(input_file, CSV_ENGINE, CSV_CHUNKSIZE)
+    if PRINT_TABLE:
+        print_table(df, PRINT_ROWS)
+    print(
+        "Read",
+        stats["rows"],
+        "rows in",
+        round(stats["seconds"], 3),
+        "s",
+        "(" + str(int(stats["rows_per_second"])),
+        "rows/s, engine",
+        stats["engine"] + ")",
     )
-    print(df)
+    if stats["peak_memory"] is not None:
+        print(
+            "Table memory:",
+            round(stats["memory"] / 2**20, 1),
+            "MB, peak memory:",
+            round(stats["peak_memory"] / 2**20, 1),
+            "MB",
+        )
+    if ENCODE_TABLE:
+        df, stats = encode_table(df)
+        print(
+            "Encoded",
+            stats["encoded"],
+            "columns:",
+            round(stats["memory_before"] / 2**20, 1),
+            "MB ->",
+            round(stats["memory_after"] / 2**20, 1),
+            "MB",
+        )
     return df
 
 
@@ -123,6 +189,51 @@ def FD_parser(input_file: str) -> list:
     return FD_list
 
 
+# Mine the functional dependencies that hold in the table into a list of strings
+def discover_parser(df: pd.DataFrame) -> list:
+    FDs, stats = discover_FDs(
+        df,
+        max_lhs=DISCOVERY_MAX_LHS,
+        time_budget=DISCOVERY_TIME_BUDGET,
+        workers=DISCOVERY_WORKERS,
+    )
+    print(
+        "\nDiscovered",
+        len(FDs),
+        "FDs from",
+        stats["nodes"],
+        "lattice nodes in",
+        round(stats["seconds"], 3),
+        "seconds",
+    )
+    if not stats["complete"]:
+        print("Discovery stopped at the time budget, the FDs may be incomplete")
+    if len(stats["constant_columns"]) > 0:
+        print("Constant columns:", stats["constant_columns"])
+    return [fd.fd for fd in FDs]
+
+
+# Mine the functional dependencies of a large CSV by sampling and streamed validation
+def hybrid_discover_parser(input_file: str) -> list:
+    FDs, stats = discover_FDs_hybrid(input_file, max_lhs=DISCOVERY_MAX_LHS)
+    print("\nDiscovered", len(FDs), "FDs in", round(stats["seconds"], 3), "seconds")
+    print("Sample:", stats["sample_rows"], "of", stats["rows"], "rows")
+    print("Agree sets from sampled row pairs:", stats["agree_sets"])
+    print("Non-FDs from the sample:", stats["sample_non_FDs"])
+    print(
+        "Candidates validated:",
+        stats["candidates"],
+        "in",
+        stats["validation_passes"],
+        "passes,",
+        stats["candidates_failed"],
+        "failed",
+    )
+    if len(stats["constant_columns"]) > 0:
+        print("Constant columns:", stats["constant_columns"])
+    return [fd.fd for fd in FDs]
+
+
 # Parse multivalued dependencies from input text file into a list of strings
 def MVD_parser(input_file: str) -> list:
     MVD_list = []
@@ -136,39 +247,40 @@ def MVD_parser(input_file: str) -> list:
 
 # Function to find the highest normal form of the input table
 def highest_normal_form(relation: Relation, MVDs: list) -> str:
-    if check_5NF(relation.table, relation.FDs, MVDs, relation.key):
-        return "5NF"
-    elif check_4NF(relation.table, relation.FDs, MVDs, relation.key):
-        return "4NF"
-    elif check_BCNF(relation.table, relation.FDs, relation.key):
-        return "BCNF"
-    elif check_3NF(relation.table, relation.FDs, relation.key):
-        return "3NF"
-    elif check_2NF(relation.table, relation.FDs, relation.key):
-        return "2NF"
-    elif check_1NF(relation.table, relation.key, relation.mvAttributes):
-        return "1NF"
-    else:
+    highest = classify(relation, MVDs).highest
+    if highest is None:
         return "Input table is not in any normal form"
-
-
-# Main function for testing
-def main():
-    # Get user input
-    (
-        df,
-        input_FD,
-        input_MVD,
-        Normal_Form,
-        highest_Form,
-        pkey,
-        mvAttributes,
-    ) = get_inputs()
-
-    # Parse the functional and multivalued dependencies from the input file
-    FDs = FD_parser(input_FD)
-    MVDs = MVD_parser(input_MVD)
-
+    return highest
+
+
+# Read the FD and MVD strings for a table: from files, or mined from the data when the FD
+# file is "discover" or "hybrid" (which streams the CSV at input_table). An MVD file of None
+# means no MVDs.
+def load_dependencies(
+    df: pd.DataFrame, input_table: str, input_FD: str, input_MVD: str
+) -> tuple[list, list]:
+    if input_FD == "discover":
+        FDs = discover_parser(df)
+    elif input_FD == "hybrid":
+        FDs = hybrid_discover_parser(input_table)
+    else:
+        FDs = FD_parser(input_FD)
+    MVDs = MVD_parser(input_MVD) if input_MVD is not None else []
+    return FDs, MVDs
+
+
+# Normalize a table to the normal form chosen (1, 2, 3, S, B, 4 or 5) and print what was
+# found and checked on the way. Returns the normalized relations and the highest normal
+# form of the input table.
+def normalize(
+    df: pd.DataFrame,
+    FDs: list,
+    MVDs: list,
+    Normal_Form: str,
+    pkey: list[str],
+    mvAttributes: list[str],
+    name: str = "Students",
+) -> tuple[list[Relation], str]:
     # Print relevant information of the table
     print("\nFunctional Dependencies:")
     print("------------------------")
@@ -183,74 +295,246 @@ def main():
     print("Key:", pkey)
     print("Multivalued Attributes:", mvAttributes)
 
+    # Point out multivalued attributes found in the data that were not listed above
+    atomicity = analyze_1NF(df)
+    undeclared = [
+        col for col in atomicity.multivalued if col not in (mvAttributes or [])
+    ]
+    if len(undeclared) > 0:
+        print(
+            "Detected multivalued attributes:",
+            undeclared,
+            "(declare them to have them decomposed)",
+        )
+    for col in atomicity.mixed:
+        print("Column", col, "mixes kinds of values")
+
     FDs = [FunctionalDependency(FD) for FD in FDs]
+
+    # Reduce the FDs to a minimal cover once, before any check or transform
+    FDs, removed = minimal_cover(FDs)
+    if len(removed) > 0:
+        print("\nMinimal cover removed:")
+        for change in removed:
+            print(change)
     MVDs = [MultiValuedDependency(MVD) for MVD in MVDs]
     # Relation class structure for each table
-    relation = Relation(df, pkey, FDs, MVDs.copy(), "Students", mvAttributes)
+    relation = Relation(df, pkey, FDs, MVDs.copy(), name, mvAttributes)
+
+    # Make sure the FDs actually hold in the data, a wrong FD gives a lossy decomposition.
+    # The FDs that fail or cannot be checked are dropped before the key is found from the
+    # FDs and before any transform, as the 4NF decomposition skips MVDs that fail.
+    violated = []
+    for violation in validate_FDs(relation):
+        if violation.unknown:
+            print(
+                "\nWarning: functional dependency cannot be checked on the input table"
+            )
+        else:
+            print("\nWarning: functional dependency does not hold in the input table")
+        violation.print()
+        violated.append(violation.fd)
+    if len(violated) > 0:
+        relation.FDs = [fd for fd in relation.FDs if fd not in violated]
+        print("\nLeft out of the normalization:", ", ".join(fd.fd for fd in violated))
+
+    # Without a typed key, use the first candidate key implied by the FDs
+    if relation.key is None:
+        relation.key = relation.candidate_keys(limit=1)[0]
+    print("Candidate Keys:", relation.candidate_keys())
+
+    # MVDs that fail on the data are skipped by the 4NF decomposition
+    for violation in validate_MVDs_data(relation):
+        if violation.unknown:
+            print(
+                "\nWarning: multivalued dependency cannot be checked on the input table"
+            )
+        else:
+            print("\nWarning: multivalued dependency does not hold in the input table")
+        violation.print()
 
     # Highest normal form of input table
     hnf = highest_normal_form(relation, MVDs)
 
-    # List of all relations
-    Relations = [relation]
-
-    # Transform the relation to the highest normal form specified by the user
-    if Normal_Form == "1":
-        Relations = transform_to_1NF(Relations)
+    # The transforms change the relation's FD list in place, so keep what the
+    # decomposition is checked against: the FDs, the declared key and the MVDs that hold.
+    # The table itself is only ever projected, never modified, and the join of the result
+    # is compared with it unless 1NF has to explode declared multivalued attributes.
+    source_FDs = list(relation.FDs)
+    source_table = df if not mvAttributes else None
+    source_key = list(relation.key)
+    source_MVDs = []
+    for mvd in MVDs:
+        if check_MVD(df, mvd) is None:
+            source_MVDs.append(mvd)
+
+    # Every normal form starts from 1NF: split and explode the multivalued attributes once
+    Relations, stats = decompose_1NF([relation])
+    if stats["exploded"] > 0:
+        print(
+            "\n1NF decomposition:",
+            stats["exploded"],
+            "attributes exploded,",
+            stats["splits"],
+            "splits,",
+            stats["rows"],
+            "rows",
+            "(" + str(round(stats["bytes_allocated"] / 2**20, 1)),
+            "MB allocated)",
+        )
 
-    elif Normal_Form == "2":
-        Relations = transform_to_2NF(transform_to_1NF(Relations))
+    # Transform the relation to the highest normal form specified by the user. The join
+    # dependencies a 5NF split relies on are kept for the lossless join check.
+    JDs = []
+    if Normal_Form == "2":
+        Relations = transform_to_2NF(Relations)
 
     elif Normal_Form == "3":
 
-        Relations = transform_to_3NF(transform_to_2NF(transform_to_1NF(Relations)))
-
-    elif Normal_Form == "B":
-        Relations = transform_to_BCNF(
-            transform_to_3NF(transform_to_2NF(transform_to_1NF(Relations)))
+        Relations = transform_to_3NF(transform_to_2NF(Relations))
+
+    elif Normal_Form == "S":
+        Relations = synthesize_3NF(Relations)
+
+    elif Normal_Form != "1":
+        # BCNF decomposition works on the schema, so it starts right after 1NF
+        Relations, stats = decompose_BCNF(Relations)
+        print(
+            "\nBCNF decomposition:",
+            stats["steps"],
+            "splits,",
+            stats["projections"],
+            "projections,",
+            stats["rows_copied"],
+            "rows copied",
+            "(" + str(round(stats["bytes_copied"] / 2**20, 1)),
+            "MB)",
         )
 
-    elif Normal_Form == "4":
-        Relations = transform_to_4NF(
-            transform_to_BCNF(
-                transform_to_3NF(transform_to_2NF(transform_to_1NF(Relations)))
-            ),
-            MVDs,
-        )
+        if Normal_Form == "4":
+            Relations = transform_to_4NF(Relations, MVDs)
 
-    else:
-        Relations = transform_to_5NF(
-            transform_to_4NF(
-                transform_to_BCNF(
-                    transform_to_3NF(transform_to_2NF(transform_to_1NF(Relations)))
-                ),
-                MVDs,
-            )
+        elif Normal_Form == "5":
+            Relations, JDs, _ = decompose_5NF(transform_to_4NF(Relations, MVDs), MVDs)
+
+    if VERIFY_DECOMPOSITION:
+        lossless, lost = verify_decomposition(
+            Relations, source_FDs, source_MVDs, source_key, JDs
+        )
+        print("\nLossless join:", "yes" if lossless else "no")
+        for fd in lost:
+            print("Functional dependency not preserved:", fd.fd)
+
+    # Exploding multivalued attributes changes the values, so the input table is not rebuilt
+    if VERIFY_JOIN and source_table is not None:
+        rebuilt, stats = verify_join(source_table, Relations)
+        print(
+            "Join of the relations rebuilds the input table:",
+            "yes" if rebuilt else "no",
+            "(" + str(stats["joined_rows"]),
+            "of",
+            stats["rows"],
+            "rows)",
         )
 
-    # Update relation names
-    print("\n------------------------------------")
-    print("Updating relation names...\n")
-    update_relationNames(Relations)
+    return Relations, hnf
 
+
+# Write the normalized relations to a text file, with their rows streamed to data files in
+# data_dir or, when data_format is None, printed into the text file
+def write_output(
+    Relations: list[Relation],
+    Normal_Form: str,
+    hnf: str = None,
+    path: str = "output.txt",
+    data_format: str = OUTPUT_FORMAT,
+    data_dir: str = OUTPUT_DIR,
+):
     if Normal_Form == "B":
         Normal_Form = "BC"
+    elif Normal_Form == "S":
+        Normal_Form = "3"
+
+    files = {}
+    if data_format is not None:
+        manifest = write_relations(
+            Relations,
+            data_dir,
+            data_format,
+            OUTPUT_CHUNK_ROWS,
+            Normal_Form + "NF",
+            hnf,
+        )
+        print()
+        for relation, written in zip(Relations, manifest["relations"]):
+            files[id(relation)] = os.path.join(data_dir, written["file"])
+            print(
+                "Wrote",
+                written["rows"],
+                "rows of",
+                relation.name,
+                "to",
+                files[id(relation)],
+                "in",
+                round(written["seconds"], 3),
+                "s",
+                "("
+                + str(written["rows_per_second"] or "-")
+                + " rows/s, "
+                + str(round((written["bytes_per_second"] or 0) / 2**20, 1)),
+                "MB/s)",
+            )
 
-    # Write the output to a text file
-    with open("output.txt", "w") as f:
+    with open(path, "w") as f:
         f.write("Normalized Relations in form (" + Normal_Form + "NF):\n\n")
         for relation in Relations:
             f.write(relation.name + "\n")
-            f.write(str(relation.table) + "\n")
+            if data_format is None:
+                f.write(str(relation.table) + "\n")
+            else:
+                f.write(
+                    "Rows: "
+                    + str(len(relation.table))
+                    + ", written to "
+                    + files[id(relation)]
+                    + "\n"
+                )
             f.write("Key: " + str(relation.key) + "\n")
             f.write("Functional Dependencies:\n")
             for fd in relation.FDs:
                 f.write(fd.fd + "\n")
             f.write("\n")
 
-        if highest_Form:
+        if hnf is not None:
             f.write("Highest Normal Form of input table: " + hnf + "\n")
 
 
+# Main function for testing
+def main():
+    # Get user input
+    (
+        df,
+        input_FD,
+        input_MVD,
+        Normal_Form,
+        highest_Form,
+        pkey,
+        mvAttributes,
+    ) = get_inputs()
+
+    # Parse the functional and multivalued dependencies from the input file
+    FDs, MVDs = load_dependencies(df, df.name + ".csv", input_FD, input_MVD)
+
+    Relations, hnf = normalize(df, FDs, MVDs, Normal_Form, pkey, mvAttributes)
+
+    # Update relation names
+    print("\n------------------------------------")
+    print("Updating relation names...\n")
+    update_relationNames(Relations)
+
+    # Write the output to a text file
+    write_output(Relations, Normal_Form, hnf if highest_Form else None)
+
+
 if __name__ == "__main__":
     main()
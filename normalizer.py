@@ -1,21 +1,63 @@
+from closure import (
+    ClosureEngine,
+    bcnf_violation,
+    candidate_key_masks,
+    candidate_keys,
+    dependency_basis,
+    minimal_cover_masks,
+)
 from form_finder import (
-    check_1NF,
-    check_2NF,
-    check_3NF,
-    check_BCNF,
-    check_4NF,
-    check_5NF,
-    is_superkey,
+    LIST_DELIMITERS,
+    analyze_1NF,
+    classify,
+    group_codes,
+    string_storage,
 )
+from explode import explode_table, split_column
+from join_dependencies import find_join_dependencies
+from validation import check_MVD
+from collections import deque
+import sys
+
+import numpy as np
 import pandas as pd
 
 
-class FunctionalDependency:
-    def __init__(self, fd: str):
-        self.determinant, self.dependent = fd.split(" -> ")
-        self.determinants = self.determinant.split(", ")
-        self.dependents = self.dependent.split(", ")
-        self.fd = fd
+# A dependency "X arrow Y" parsed once into interned attribute lists and frozensets
+class Dependency:
+    __slots__ = (
+        "text",
+        "determinant",
+        "dependent",
+        "determinants",
+        "dependents",
+        "determinant_set",
+        "dependent_set",
+    )
+    arrow = None
+
+    def __init__(self, text: str):
+        self.text = text  # The dependency as written
+        self.determinant, self.dependent = text.split(self.arrow)
+        self.determinants = [sys.intern(a) for a in self.determinant.split(", ")]
+        self.dependents = [sys.intern(a) for a in self.dependent.split(", ")]
+        self.determinant_set = frozenset(self.determinants)
+        self.dependent_set = frozenset(self.dependents)
+
+    def __repr__(self) -> str:
+        return self.text
+
+    def print(self):
+        print(self.text)
+
+
+class FunctionalDependency(Dependency):
+    __slots__ = ()
+    arrow = " -> "
+
+    @property
+    def fd(self) -> str:
+        return self.text
 
     def __iter__(self):
         return iter(
@@ -25,16 +67,14 @@ class FunctionalDependency:
     def __next__(self):
         return [self.determinant, self.dependent, self.determinants, self.dependents]
 
-    def print(self):
-        print(self.fd)
 
+class MultiValuedDependency(Dependency):
+    __slots__ = ()
+    arrow = " ->> "
 
-class MultiValuedDependency:
-    def __init__(self, mvd: str):
-        self.determinant, self.dependent = mvd.split(" ->> ")
-        self.determinants = self.determinant.split(", ")
-        self.dependents = self.dependent.split(", ")
-        self.mvd = mvd
+    @property
+    def mvd(self) -> str:
+        return self.text
 
     def __iter__(self):
         return iter(
@@ -56,13 +96,110 @@ class MultiValuedDependency:
             self.mvd,
         ]
 
-    def print(self):
-        print(self.mvd)
-
     def copy(self):
         return MultiValuedDependency(self.mvd)
 
 
+# A list of dependencies that keeps an index from every attribute to the dependencies
+# having it in their determinant or dependent. Every change to the list goes through the
+# index, so lookups by attribute stay current as transforms move dependencies around and
+# take time in the number of matches instead of the number of dependencies.
+class DependencyList(list):
+    def __init__(self, dependencies: list = ()):
+        super().__init__()
+        self.by_determinant = {}  # Attribute -> {id: dependency} in insertion order
+        self.by_dependent = {}  # Attribute -> {id: dependency} in insertion order
+        self.counts = {}  # id -> number of times the dependency is listed
+        self.extend(dependencies)
+
+    def _index(self, dependency: Dependency):
+        self.counts[id(dependency)] = self.counts.get(id(dependency), 0) + 1
+        for attribute in dependency.determinant_set:
+            self.by_determinant.setdefault(attribute, {})[id(dependency)] = dependency
+        for attribute in dependency.dependent_set:
+            self.by_dependent.setdefault(attribute, {})[id(dependency)] = dependency
+
+    def _unindex(self, dependency: Dependency):
+        # The same object may be listed twice; keep it indexed while it is still listed
+        self.counts[id(dependency)] -= 1
+        if self.counts[id(dependency)] > 0:
+            return
+        del self.counts[id(dependency)]
+        for index, attributes in [
+            (self.by_determinant, dependency.determinant_set),
+            (self.by_dependent, dependency.dependent_set),
+        ]:
+            for attribute in attributes:
+                index[attribute].pop(id(dependency), None)
+                if len(index[attribute]) == 0:
+                    del index[attribute]
+
+    def append(self, dependency: Dependency):
+        super().append(dependency)
+        self._index(dependency)
+
+    def insert(self, position: int, dependency: Dependency):
+        super().insert(position, dependency)
+        self._index(dependency)
+
+    def extend(self, dependencies: list):
+        for dependency in dependencies:
+            self.append(dependency)
+
+    def __iadd__(self, dependencies: list) -> "DependencyList":
+        self.extend(dependencies)
+        return self
+
+    def remove(self, dependency: Dependency):
+        super().remove(dependency)
+        self._unindex(dependency)
+
+    def pop(self, position: int = -1) -> Dependency:
+        dependency = super().pop(position)
+        self._unindex(dependency)
+        return dependency
+
+    def clear(self):
+        super().clear()
+        self.by_determinant.clear()
+        self.by_dependent.clear()
+        self.counts.clear()
+
+    def __setitem__(self, position, value):
+        replaced = self[position]
+        super().__setitem__(position, value)
+        for dependency in replaced if isinstance(position, slice) else [replaced]:
+            self._unindex(dependency)
+        for dependency in value if isinstance(position, slice) else [value]:
+            self._index(dependency)
+
+    def __delitem__(self, position):
+        removed = self[position]
+        super().__delitem__(position)
+        for dependency in removed if isinstance(position, slice) else [removed]:
+            self._unindex(dependency)
+
+    # Dependencies having the attribute, or every one of the attributes, on one side
+    def _find(self, index: dict, attributes) -> list[Dependency]:
+        if isinstance(attributes, str):
+            attributes = [attributes]
+        if len(attributes) == 0:
+            return list(self)
+        matches = [index.get(attribute, {}) for attribute in attributes]
+        smallest = min(matches, key=len)
+        return [
+            dependency
+            for key, dependency in smallest.items()
+            if all(key in match for match in matches)
+        ]
+
+    def with_determinant(self, attributes) -> list[Dependency]:
+        return self._find(self.by_determinant, attributes)
+
+    def with_dependent(self, attributes) -> list[Dependency]:
+        return self._find(self.by_dependent, attributes)
+
+
 class Relation:
     def __init__(
         self,
@@ -80,88 +217,100 @@ class Relation:
         self.name = name  # The name of the relation
         self.mvAttributes = mvAttributes
 
+    # The dependency lists are indexed by attribute, including lists assigned later on
+    @property
+    def FDs(self) -> DependencyList:
+        return self._FDs
+
+    @FDs.setter
+    def FDs(self, FDs: list[FunctionalDependency]):
+        self._FDs = DependencyList(FDs or [])
+
+    @property
+    def MVDs(self) -> DependencyList:
+        return self._MVDs
+
+    @MVDs.setter
+    def MVDs(self, MVDs: list[MultiValuedDependency]):
+        self._MVDs = DependencyList(MVDs or [])
+
     def __iter__(self):
         return iter([self.table, self.key, self.FDs, self.name])
 
     def __next__(self):
         return [self.table, self.key, self.FDs, self.name]
 
-    def find_FD_Dependent(self, attribute: str) -> list[FunctionalDependency]:
-        FDs = []
-        for fd in self.FDs:
-            if attribute in fd.dependents:
-                FDs.append(fd)
-        return FDs
-
-    def find_FD_Determinant(self, attribute: str) -> list[FunctionalDependency]:
-        FDs = []
-        for fd in self.FDs:
-            if attribute in fd.determinants:
-                FDs.append(fd)
-        return FDs
-
-    def find_FD_Determinant(self, attributes: list[str]) -> list[FunctionalDependency]:
-        FDs = []
-        for fd in self.FDs:
-            if all(attribute in fd.determinants for attribute in attributes):
-                FDs.append(fd)
-        return FDs
-
-    def find_FD_Dependent(self, attributes: list[str]) -> list[FunctionalDependency]:
-        FDs = []
-        for fd in self.FDs:
-            if all(attribute in fd.dependents for attribute in attributes):
-                FDs.append(fd)
-        return FDs
-
-    def find_MVD_Dependent(self, attribute: str) -> list[MultiValuedDependency]:
-        MVDs = []
-        for mvd in self.MVDs:
-            if attribute in mvd.dependents:
-                MVDs.append(mvd)
-        return MVDs
-
-    def find_MVD_Determinant(self, attribute: str) -> list[MultiValuedDependency]:
-        MVDs = []
-        for mvd in self.MVDs:
-            if attribute in mvd.determinants:
-                MVDs.append(mvd)
-        return MVDs
-
-    def find_relationship(self, att1: str, att2: str) -> bool:
+    # Find the candidate keys of the relation implied by its FDs and declared key
+    def candidate_keys(self, limit: int = 64) -> list[list[str]]:
+        return candidate_keys(self.FDs, list(self.table.columns), self.key, limit)
+
+    # FDs with the attribute, or all of the attributes, among their dependents
+    def find_FD_Dependent(self, attributes) -> list[FunctionalDependency]:
+        return self.FDs.with_dependent(attributes)
+
+    # FDs with the attribute, or all of the attributes, among their determinants
+    def find_FD_Determinant(self, attributes) -> list[FunctionalDependency]:
+        return self.FDs.with_determinant(attributes)
+
+    def find_MVD_Dependent(self, attributes) -> list[MultiValuedDependency]:
+        return self.MVDs.with_dependent(attributes)
+
+    def find_MVD_Determinant(self, attributes) -> list[MultiValuedDependency]:
+        return self.MVDs.with_determinant(attributes)
+
+    # Whether an FD links the attributes: att1 determined by att2 or determining it
+    def find_relationship(self, att1, att2) -> bool:
         if att1 == att2:
             return True
+        if isinstance(att1, str):
+            att1 = [att1]
 
         # Check if att1 is a dependent of att2
-        fds = self.find_FD_Determinant(att2)
-        for fd in fds:
-            if att1 in fd.dependents:
+        for fd in self.find_FD_Determinant(att2):
+            if all(attribute in fd.dependent_set for attribute in att1):
                 return True
 
         # Check if att1 is a determinant of att2
-        fds = self.find_FD_Dependent(att2)
-        for fd in fds:
-            if att1 in fd.determinants:
+        for fd in self.find_FD_Dependent(att2):
+            if all(attribute in fd.determinant_set for attribute in att1):
                 return True
 
         # No functional dependency found connecting att1 and att2
         return False
 
-    def find_relationship(self, att1: list[str], att2: list[str]) -> bool:
-        if att1 == att2:
-            return True
 
-        # Check if att1 is a dependent of att2
-        fds = self.find_FD_Determinant(att2)
-        for fd in fds:
-            if all(attribute in fd.dependents for attribute in att1):
-                return True
+# Reduce the FDs to a canonical cover: minimal cover FDs with the same determinant merged back
+# together. Returns the cover and a description of every extraneous attribute and redundant FD removed.
+def minimal_cover(
+    FDs: list[FunctionalDependency],
+) -> tuple[list[FunctionalDependency], list[str]]:
+    engine = ClosureEngine(FDs)
+    cover, extraneous, redundant = minimal_cover_masks(engine)
 
-        # Check if att1 is a determinant of att2
-        fds = self.find_FD_Dependent(att2)
-        for fd in fds:
-            if all(attribute in fd.determinants for attribute in att1):
-                return True
+    def text(lhs: int, rhs: int) -> str:
+        return (
+            ", ".join(engine.names_of(lhs)) + " -> " + ", ".join(engine.names_of(rhs))
+        )
+
+    removed = []
+    for lhs, rhs, attributes in extraneous:
+        removed.append(
+            "Extraneous "
+            + ", ".join(engine.names_of(attributes))
+            + " in "
+            + text(lhs, rhs)
+        )
+    for lhs, rhs in redundant:
+        removed.append("Redundant " + text(lhs, rhs))
+
+    # Merge the dependents of FDs that share a determinant, keeping the input order
+    merged = {}
+    for lhs, rhs in cover:
+        merged[lhs] = merged.get(lhs, 0) | rhs
+
+    return [
+        FunctionalDependency(text(lhs, rhs)) for lhs, rhs in merged.items()
+    ], removed
 
 
 # Find the minimum size of determinants of a FD in a list of FDs
@@ -182,452 +331,582 @@ def find_name(relations: list[Relation], name: str) -> list[Relation]:
     return matching_relations
 
 
-# Transform the table to 1NF
-def transform_to_1NF(relations: list[Relation]) -> list[Relation]:
+# Project a table onto the given attributes and drop duplicate rows in one pass. Duplicates
+# are found on the integer group codes of the attributes and the distinct rows are taken in
+# one go, so each column is copied at most once and the source table is never modified. When
+# the projection keeps the given key of the table, or its rows turn out distinct, the result
+# is the column selection itself, which shares the source's data until either is written
+# to. Counts the projection and the rows and bytes copied in stats when it is given.
+def project(
+    table: pd.DataFrame,
+    attributes: list[str],
+    stats: dict = None,
+    key: list[str] = None,
+) -> pd.DataFrame:
+    attributes = list(dict.fromkeys(attributes))
+    projection = table[attributes]
+    keeps_key = key is not None and len(key) > 0 and set(key) <= set(attributes)
+    if len(attributes) > 0 and len(table) > 1 and not keeps_key:
+        first = ~pd.Series(group_codes(table, attributes)).duplicated().to_numpy()
+        if not first.all():
+            projection = projection.take(np.flatnonzero(first))
+            if stats is not None:
+                stats["rows_copied"] += len(projection)
+                stats["bytes_copied"] += int(projection.memory_usage().sum())
+    if stats is not None:
+        stats["projections"] += 1
+    return projection
+
+
+# Project FDs onto a set of columns. Every FD whose determinant lies within the columns
+# gets as dependents what its determinant determines among the columns, by attribute
+# closure over all the FDs, so dependencies that went through attributes now elsewhere
+# are kept. FDs with the same determinant are merged and those left without a dependent
+# are dropped.
+def project_FDs(
+    FDs: list[FunctionalDependency], columns: list[str]
+) -> list[FunctionalDependency]:
+    engine = ClosureEngine(FDs, list(columns))
+    attributes = engine.mask(columns)
+    projected = {}
+    for fd in FDs:
+        lhs = engine.mask(fd.determinants)
+        if lhs & ~attributes == 0 and lhs not in projected:
+            projected[lhs] = engine.closure_mask(lhs) & attributes & ~lhs
+
+    # The columns are interned first, so names come out in the order of the columns
+    def names(mask: int) -> str:
+        return ", ".join(engine.names_of(mask))
+
+    return [
+        FunctionalDependency(names(lhs) + " -> " + names(rhs))
+        for lhs, rhs in projected.items()
+        if rhs
+    ]
+
+
+# How each declared multivalued attribute of a relation stores its values: as the 1NF
+# analysis finds them, or by the first delimiter or bracket they contain when it does not
+# flag them, or as single values when they contain none. Attributes the analysis flags
+# without a declaration are only reported, by main, and never exploded.
+def multivalued_storage(relation: Relation, delimiters: list[str]) -> dict:
+    table = relation.table
+    declared = [col for col in relation.mvAttributes or [] if col in table.columns]
+    storage = analyze_1NF(table[declared], delimiters).multivalued
+    for col in declared:
+        if col not in storage:
+            values = pd.Series(pd.unique(table[col].dropna())).astype(str)
+            storage[col] = string_storage(values, delimiters, min_share=0)
+    return storage
+
+
+# Decompose every relation into 1NF. The declared multivalued attributes are split into list
+# columns and exploded in one pass each. Key attributes are exploded in place. Every
+# other multivalued attribute goes with the key, and the attributes it alone determines
+# together with the key, into a relation of its own named after it, so independent
+# multivalued attributes never form a cross product; the rest of the table keeps the
+# relation's name and comes last. Returns the relations with the number of relations split
+# off, attributes exploded, output rows and bytes allocated by the splits and explodes.
+def decompose_1NF(
+    relations: list[Relation], delimiters: list[str] = LIST_DELIMITERS
+) -> tuple[list[Relation], dict]:
+    stats = {"splits": 0, "exploded": 0, "rows": 0, "bytes_allocated": 0}
     new_relations = []
     for relation in relations:
-
-        # Check if the relation is in 1NF
-        if check_1NF(relation.table, relation.key, relation.mvAttributes):
+        storage = multivalued_storage(relation, delimiters)
+        if len(storage) == 0:
             new_relations.append(relation)
             continue
 
-        if relation.mvAttributes is not None:
-            for attribute in relation.mvAttributes:
-                # Check what FDs the attribute is a determinant and dependent of
-                attribute_fds_det = relation.find_FD_Determinant(attribute)
-                attribute_fds_dep = relation.find_FD_Dependent(attribute)
-
-                new_relation = Relation(pd.DataFrame(), [], [], [], "", [])
-
-                if attribute in relation.key:
-                    # Let the attribute explode as is
-                    continue
-
-                # If the attribute is a determinant of at least 1 FD
-                if len(attribute_fds_det) > 0:
-                    for fd in attribute_fds_det:
-
-                        new_relation = Relation(pd.DataFrame(), [], [], [], "", [])
-
-                        prime_dependent = False
-                        # Check if dependent is part of the key
-                        for dep in fd.dependents:
-                            if dep in relation.key:
-                                prime_dependent = True
-
-                        if prime_dependent:
-                            continue  # Explode the relation as is
-                        else:
-                            # Create a new relation with the determinant as the key and then explode the multivalue attribute
-                            for det in fd.determinants:
-                                new_relation.table[det] = relation.table[det]
-
-                            for dep in fd.dependents:
-                                new_relation.table[dep] = relation.table[dep]
-                                relation.table.drop(dep, axis=1, inplace=True)
-
-                            new_relation.key = fd.determinants
-                            new_relation.name = relation.name + "_" + attribute
-                            new_relation.FDs = [fd]
-                            relation.FDs.remove(fd)
-                            new_relations.append(new_relation)
-
-                    new_relations.append(relation)
-
-                # If the attribute is a dependent a FD
-                if len(attribute_fds_dep) > 0:
-                    for det in attribute_fds_dep[0].determinants:
-                        new_relation.table[det] = relation.table[det]
-
-                    for dep in attribute_fds_dep[0].dependents:
-                        new_relation.table[dep] = relation.table[dep]
-                        relation.table.drop(dep, axis=1, inplace=True)
-
-                    new_relation.key = attribute_fds_dep[0].determinants
-                    new_relation.name = relation.name + "_" + attribute
-                    new_relation.FDs = [attribute_fds_dep[0]]
-                    relation.FDs.remove(attribute_fds_dep[0])
-                    new_relations.append(new_relation)
-
-                    new_relations.append(relation)
-
-                # If the attribute is a determinant of at least 1 FD and a dependent of a FD
-                if len(attribute_fds_det) > 0 and len(attribute_fds_dep) > 0:
-                    for fd in attribute_fds_det:
-                        new_relation = Relation(pd.DataFrame(), [], [], [], "", [])
-
-                        prime_dependent = False
-                        # Check if dependent is part of the key
-                        for dep in fd.dependents:
-                            if dep in relation.key:
-                                prime_dependent = True
+        key = [col for col in relation.key if col in relation.table.columns]
+        table = relation.table
+
+        # Explode the columns in lockstep, or one after another into every combination of
+        # their values, as relations of their own would join back to, when they do not hold
+        # as many values in every row. Returns the table and whether it is in lockstep.
+        def explode(
+            table: pd.DataFrame, columns: list[str]
+        ) -> tuple[pd.DataFrame, bool]:
+            lists = {col: split_column(table[col], storage[col]) for col in columns}
+            lengths = [split.lengths for split in lists.values()]
+            if any(not np.array_equal(lengths[0], other) for other in lengths[1:]):
+                for col in columns:
+                    table = explode(table, [col])[0]
+                return table, False
+
+            exploded = explode_table(table, lists)
+            stats["exploded"] += len(columns)
+            stats["bytes_allocated"] += sum(split.nbytes for split in lists.values())
+            stats["bytes_allocated"] += int(exploded.memory_usage().sum())
+            return exploded, True
+
+        # A multivalued key attribute stands for one row per value, as the key implies
+        for col in key:
+            if col in storage:
+                table = explode(table, [col])[0]
+
+        parts = []
+        split = []
+        for col in table.columns:
+            if col not in storage or col in key or col in split:
+                continue
+
+            # Attributes determined by the key together with this one move along with it,
+            # exploded in lockstep when they are multivalued too
+            group = [col]
+            for fd in relation.find_FD_Determinant(col):
+                if fd.determinant_set <= set(key + [col]):
+                    group += [
+                        dep
+                        for dep in fd.dependents
+                        if dep in table.columns and dep not in key + group + split
+                    ]
+            columns = key + group
+            multivalued = [dep for dep in columns if dep in storage and dep not in key]
+            exploded, lockstep = explode(project(table, columns, key=key), multivalued)
+            split += columns[len(key) :]
+            stats["splits"] += 1
+
+            # Every combination of the values of attributes exploded one after another is a
+            # row of its own, so all of them are part of the key
+            parts.append(
+                Relation(
+                    project(exploded, columns),
+                    key + ([col] if lockstep else multivalued),
+                    [],
+                    [],
+                    relation.name + "_" + col,
+                    None,
+                )
+            )
 
-                        if prime_dependent:
-                            continue  # Explode the relation as is
-                        else:
-                            # Create a new relation with the determinant as the key and then explode the multivalue attribute
-                            for det in fd.determinants:
-                                new_relation.table[det] = relation.table[det]
+        table = project(
+            table, [col for col in table.columns if col not in split], key=key
+        )
+        source = Relation(table, relation.key, [], [], relation.name, None)
+
+        # The FDs are projected onto every relation, so an FD whose attributes were split
+        # apart keeps its part in each of them. An exploded attribute holds one value of a
+        # list per row, which what determined the list does not determine, so it is left
+        # out of the dependents.
+        for part in [source] + parts:
+            for fd in project_FDs(relation.FDs, list(part.table.columns)):
+                dependents = [col for col in fd.dependents if col not in storage]
+                if len(dependents) == len(fd.dependents):
+                    part.FDs.append(fd)
+                elif len(dependents) > 0:
+                    part.FDs.append(
+                        FunctionalDependency(
+                            fd.determinant + " -> " + ", ".join(dependents)
+                        )
+                    )
 
-                            for dep in fd.dependents:
-                                new_relation.table[dep] = relation.table[dep]
-                                relation.table.drop(dep, axis=1, inplace=True)
+        # Every MVD goes to the first relation that holds all of its attributes
+        for mvd in relation.MVDs:
+            attributes = set(mvd.determinants + mvd.dependents)
+            for part in [source] + parts:
+                if attributes <= set(part.table.columns):
+                    part.MVDs.append(mvd)
+                    break
 
-                            new_relation.key = fd.determinants
-                            new_relation.name = relation.name + "_" + attribute
-                            new_relation.FDs = [fd]
-                            relation.FDs.remove(fd)
-                            new_relations.append(new_relation)
+        # As in the other splitting transforms, the source relation comes after its splits
+        new_relations.extend(parts)
+        new_relations.append(source)
 
-                    new_relations.append(relation)
+    stats["rows"] = sum(len(relation.table) for relation in new_relations)
+    return new_relations, stats
 
-                    for det in attribute_fds_dep[0].determinants:
-                        new_relation.table[det] = relation.table[det]
 
-                    for dep in attribute_fds_dep[0].dependents:
-                        new_relation.table[dep] = relation.table[dep]
-                        relation.table.drop(dep, axis=1, inplace=True)
+# Transform the table to 1NF
+def transform_to_1NF(relations: list[Relation]) -> list[Relation]:
+    return decompose_1NF(relations)[0]
 
-                    new_relation.key = attribute_fds_dep[0].determinants
-                    new_relation.name = relation.name + "_" + attribute
-                    new_relation.FDs = [attribute_fds_dep[0]]
-                    relation.FDs.remove(attribute_fds_dep[0])
-                    new_relations.append(new_relation)
 
-                    new_relations.append(relation)
+# Split relations on their 2NF or 3NF violations, as found by classify: the determinant of
+# the first violating FD and its non-prime dependents move to a relation of their own, while
+# the prime dependents stay with the keys they are part of. The FDs are projected onto both
+# relations and they are split again while they have violations; other 1NF violations, such
+# as multivalued attributes that were not declared, are left as they are. A 2NF split is
+# named after its relation, a 3NF split after the attributes it moved.
+def split_violations(relations: list[Relation], form: str) -> list[Relation]:
+    new_relations = []
+    for relation in relations:
 
-    for relation in new_relations:
-        attributes = set(relation.table.columns)
+        # Only FDs within the relation's columns apply to it: attributes that an earlier
+        # split moved to another relation are projected out before the checks index them
+        relation.FDs = project_FDs(relation.FDs, relation.table.columns)
+        violations = classify(relation, upto=form).violations[form]
+        if len(violations) == 0:
+            new_relations.append(relation)
+            continue
 
-        for attribute in attributes:
-            if relation.table[attribute].dtype == "object":
-                relation.table = relation.table.explode(attribute)
+        fd = violations[0]
+        keys = candidate_keys(relation.FDs, list(relation.table.columns), relation.key)
+        prime = set(attribute for key in keys for attribute in key)
+        moved = [col for col in fd.dependents if col not in prime]
+        name = relation.name if form == "2NF" else ", ".join(moved)
+        new_relation = Relation(
+            project(relation.table, fd.determinants + moved),
+            fd.determinants,
+            [],
+            [],
+            name + "_1",
+            [],
+        )
+        relation.table = project(
+            relation.table,
+            [col for col in relation.table.columns if col not in moved],
+            key=relation.key,
+        )
+        new_relation.FDs = project_FDs(relation.FDs, new_relation.table.columns)
+        relation.FDs = project_FDs(relation.FDs, relation.table.columns)
 
-        relation.mvAttributes = None
-
-    for relation in new_relations:
-        if not check_1NF(relation.table, relation.key, relation.mvAttributes):
+        # As in the other splitting transforms, the source relation comes after its split
+        new_relations.append(new_relation)
+        new_relations.append(relation)
 
+    for relation in list(new_relations):
+        if len(classify(relation, upto=form).violations[form]) > 0:
             new_relations.remove(relation)
-            r = transform_to_1NF([relation])
-            for i in r:
-                new_relations.append(i)
+            new_relations.extend(split_violations([relation], form))
 
     return new_relations
 
 
 def transform_to_2NF(relations: list[Relation]) -> list[Relation]:
+    return split_violations(relations, "2NF")
+
+
+def transform_to_3NF(relations: list[Relation]) -> list[Relation]:
+    return split_violations(relations, "3NF")
+
+
+# The closure engine of a relation over the FDs that lie inside its columns, the mask of its
+# columns and the masks to seed its candidate key search with. A declared key determines
+# every column, as it does for the candidate key search, so it is added as an FD and a seed.
+def relation_engine(relation: Relation) -> tuple[ClosureEngine, int, list[int]]:
+    columns = list(relation.table.columns)
+    FDs = [
+        fd
+        for fd in relation.FDs
+        if all(col in columns for col in fd.determinants + fd.dependents)
+    ]
+    engine = ClosureEngine(FDs, columns)
+    schema = engine.mask(columns)
+    seeds = []
+    if relation.key and all(col in columns for col in relation.key):
+        seeds.append(engine.mask(relation.key))
+        engine.add_mask(seeds[0], schema)
+    return engine, schema, seeds
+
+
+# Synthesize a 3NF schema from the dependencies alone (Bernstein): take a minimal cover,
+# make one schema per determinant, add a key schema if no schema holds a candidate key
+# and drop schemas contained in another. Each output relation is then projected from the
+# source table exactly once, instead of splitting and re-checking the data per FD.
+def synthesize_3NF(relations: list[Relation]) -> list[Relation]:
     new_relations = []
     for relation in relations:
+        columns = list(relation.table.columns)
+        engine, schema, seeds = relation_engine(relation)
+        cover, _, _ = minimal_cover_masks(engine)
+
+        # One schema per determinant, holding the determinant and everything it determines
+        merged = {}
+        for lhs, rhs in cover:
+            merged[lhs] = merged.get(lhs, 0) | rhs
+        schemas = [(lhs | rhs, lhs) for lhs, rhs in merged.items()]
+
+        # Make sure some schema holds a candidate key so the decomposition is lossless
+        key = candidate_key_masks(engine, schema, seeds, limit=1)[0]
+        if not any(key & ~attributes == 0 for attributes, _ in schemas):
+            schemas.append((key, key))
+
+        # Drop schemas contained in another one; of two equal schemas the first is kept
+        kept = []
+        for i, (attributes, lhs) in enumerate(schemas):
+            if not any(
+                attributes & ~other == 0 and (attributes != other or j < i)
+                for j, (other, _) in enumerate(schemas)
+                if j != i
+            ):
+                kept.append((attributes, lhs))
+
+        order = {attribute: i for i, attribute in enumerate(columns)}
+
+        def names(mask: int) -> list[str]:
+            return sorted(engine.names_of(mask), key=order.get)
+
+        # Materialize every schema with a single projection of the source table. As in the
+        # splitting transforms, the schema holding the key keeps the source name and comes last.
+        i = 0  # Iterator to name synthesized relations
+        source = None
+        for attributes, lhs in kept:
+            FDs = [
+                FunctionalDependency(
+                    ", ".join(names(det)) + " -> " + ", ".join(names(dep))
+                )
+                for det, dep in merged.items()
+                if (det | dep) & ~attributes == 0
+            ]
+            MVDs = [
+                mvd
+                for mvd in relation.MVDs
+                if engine.mask(mvd.determinants + mvd.dependents) & ~attributes == 0
+            ]
+            table = project(relation.table, names(attributes), key=relation.key)
 
-        # Check if the relation is in 2NF
-        if check_2NF(relation.table, relation.FDs, relation.key):
-            new_relations.append(relation)
-            continue
+            if source is None and key & ~attributes == 0:
+                source = Relation(
+                    table, names(key), FDs, MVDs, relation.name, relation.mvAttributes
+                )
+                continue
 
-        partial_dependencies = []
-        # Check each FD to see if it is a partial dependency
-        for fd in relation.FDs:
-            partial = False
-            if fd.determinant != relation.key:
-                for det in fd.determinants:
-                    # If the determinant is a subset of the key then it is a partial dependency of the key
-                    if det in relation.key:
-                        partial_dependencies.append(fd)
-                        break
-
-                    # If the determinant is not a subset of the key, but a determinant of more then 1 FD then there is a partial dependency somewhere
-                    if len(relation.find_FD_Determinant(det)) > 1:
-                        # The smaller of the FDs is guaranteed to be a partial dependency
-                        # If there is more then 2 partial dependencies it will catch it in the next iteration
-                        partial_dependencies.append(
-                            min_FD(relation.find_FD_Determinant(det))
-                        )
-                        break
-
-        # Decompose partial dependencies into their own relations
-        i = 0  # Iterator to name decomposed relations
-        if len(partial_dependencies) > 0:
-            fd = partial_dependencies[0]
             i += 1
-            new_relation = Relation(
-                pd.DataFrame(), [], [], [], relation.name + "_" + str(i), []
-            )
-
-            for det in fd.determinants:
-                new_relation.table[det] = relation.table[det].copy()
+            name = ", ".join(names(attributes & ~lhs)) + "_" + str(i)
+            new_relations.append(Relation(table, names(lhs), FDs, MVDs, name, []))
 
-            for dep in fd.dependents:
-                new_relation.table[dep] = relation.table[dep].copy()
-                relation.table.drop(dep, axis=1, inplace=True)
+        new_relations.append(source)
 
-            new_relation.table = new_relation.table.drop_duplicates()
-
-            # Update the key of the new relation
-            new_relation.key = fd.determinants
-
-            # Update the FDs of the new relation
-            new_relation.FDs = [fd]
+    return new_relations
 
-            # Remove the FD from the original relation
-            relation.FDs.remove(fd)
 
-            # Add the new relation to the list of new relations
-            new_relations.append(new_relation)
+# Project each decomposed schema of a relation from its table once. Schemas are given as
+# (attributes, superkey, split, named) masks; the source schema (split 0) keeps the relation's
+# name and comes last, and the others are named after the attributes their split moved.
+# Every schema lists the FDs and the given MVDs that lie inside it.
+def materialize_schemas(
+    relation: Relation,
+    engine: ClosureEngine,
+    schemas: list[tuple[int, int, int, int]],
+    MVDs: list[MultiValuedDependency],
+    stats: dict,
+) -> list[Relation]:
+    order = {attribute: i for i, attribute in enumerate(relation.table.columns)}
 
-        # Add the modified original relation to the list of new relations
-        new_relations.append(relation)
+    def names(mask: int) -> list[str]:
+        return sorted(engine.names_of(mask), key=order.get)
 
-        # Check if the new relations are in 2NF
-        for relation in new_relations:
-            if not check_2NF(relation.table, relation.FDs, relation.key):
+    relations = []
+    source = None
+    for attributes, superkey, split, named in schemas:
+        key = candidate_key_masks(engine, attributes, [superkey], limit=1)[0]
 
-                new_relations.remove(relation)
-                r = transform_to_2NF([relation])
-                for i in r:
-                    new_relations.append(i)
+        # The FDs are projected by closure, as project_FDs does, so what a determinant
+        # gives within the schema through attributes outside it is kept
+        projected = {}
+        for fd in relation.FDs:
+            lhs = engine.mask(fd.determinants)
+            if lhs & ~attributes == 0 and lhs not in projected:
+                closure = engine.closure_mask(lhs, target=attributes)
+                projected[lhs] = closure & attributes & ~lhs
+        FDs = [
+            FunctionalDependency(", ".join(names(lhs)) + " -> " + ", ".join(names(rhs)))
+            for lhs, rhs in projected.items()
+            if rhs
+        ]
+        inside = [
+            mvd
+            for mvd in MVDs
+            if engine.mask(mvd.determinants + mvd.dependents) & ~attributes == 0
+        ]
+        table = project(relation.table, names(attributes), stats, relation.key)
 
-        return new_relations
+        # As in the splitting transforms, the source relation comes after its splits
+        if split == 0:
+            source = Relation(
+                table, names(key), FDs, inside, relation.name, relation.mvAttributes
+            )
+        else:
+            name = ", ".join(names(named & attributes or attributes)) + "_" + str(split)
+            relations.append(Relation(table, names(key), FDs, inside, name, []))
+    relations.append(source)
+    return relations
 
 
-def transform_to_3NF(relations: list[Relation]) -> list[Relation]:
-    # New list of relations to return
+# Decompose every relation into BCNF at the schema level. Pending schemas are kept in a
+# queue and a violation X -> X+ found by attribute closure over the FDs splits a schema
+# into X+ and the rest plus X. The data is only touched to project each final schema once.
+# Returns the relations with the number of splits, projections and the rows and bytes copied.
+def decompose_BCNF(relations: list[Relation]) -> tuple[list[Relation], dict]:
+    stats = {"steps": 0, "projections": 0, "rows_copied": 0, "bytes_copied": 0}
     new_relations = []
     for relation in relations:
+        engine, schema, seeds = relation_engine(relation)
+        key = candidate_key_masks(engine, schema, seeds, limit=1)[0]
 
-        # Check if the relation is in 3NF
-        if check_3NF(relation.table, relation.FDs, relation.key):
-            new_relations.append(relation)
-            continue
-
-        transitive_dependencies = []
-
-        for fd in relation.FDs:
-            if fd.determinant != relation.key and fd.dependent not in relation.key:
-                transitive_dependencies.append(fd)
-
-        # For every transitive dependency, decompose the table into a new relation
+        # Each entry is a schema, a superkey of it, the split that made it (0 for the source)
+        # and the attributes that split moved into it
         i = 0  # Iterator to name decomposed relations
-        if len(transitive_dependencies) > 0:
-            fd = transitive_dependencies[0]
+        pending = deque([(schema, key, 0, 0)])
+        done = []
+        while pending:
+            attributes, superkey, split, named = pending.popleft()
+            violation = bcnf_violation(engine, attributes)
+            if violation is None:
+                done.append((attributes, superkey, split, named))
+                continue
+
+            determinant, closure = violation
             i += 1
-            new_relation = Relation(
-                pd.DataFrame(), [], [], [], fd.dependent + "_" + str(i), []
-            )
-
-            for determinant in fd.determinants:
-                new_relation.table[determinant] = relation.table[determinant].copy()
-
-            for dependent in fd.dependents:
-                new_relation.table[dependent] = relation.table[dependent].copy()
-                relation.table.drop(columns=dependent, inplace=True)
-
-            new_relation.key = fd.determinants
-            new_relation.FDs = [fd]
-            new_relation.table = new_relation.table.drop_duplicates()
-
-            # Remove the functional dependency from the original relation
-            relation.FDs.remove(fd)
-
-            # Add the new relation to the list of relations
-            new_relations.append(new_relation)
-
-        # Add the modified original relation to the list of relations
-        new_relations.append(relation)
+            stats["steps"] += 1
+            moved = closure & ~determinant
+            pending.append((closure, determinant, i, moved))
+            if superkey & moved:
+                superkey = superkey & ~moved | determinant
+            pending.append((attributes & ~moved, superkey, split, named))
+
+        new_relations.extend(
+            materialize_schemas(relation, engine, done, relation.MVDs, stats)
+        )
 
-    # Final Check to make sure all relations are in 3NF
-    for relation in new_relations:
-        if not check_3NF(relation.table, relation.FDs, relation.key):
+    return new_relations, stats
 
-            new_relations.remove(relation)
-            r = transform_to_3NF([relation])
-            for i in r:
-                new_relations.append(i)
 
-    return new_relations
+def transform_to_BCNF(relations: list[Relation]) -> list[Relation]:
+    return decompose_BCNF(relations)[0]
 
 
-def transform_to_BCNF(relations: list[Relation]) -> list[Relation]:
-    # New list of relations to return
+# Decompose every relation into 4NF at the schema level. The MVDs are projected onto each
+# relation (X ->> Y becomes X ->> Y within the relation when it holds X), kept only when they
+# hold in its table, and indexed by determinant. Pending schemas are kept in a queue; a schema
+# violates 4NF when a determinant inside it is not a superkey and its dependency basis, cut
+# down to the schema, has more than one block. The schema is then split on one block.
+# Returns the relations with the number of splits, projections and the rows and bytes copied.
+def decompose_4NF(
+    relations: list[Relation], MVDs: list[MultiValuedDependency]
+) -> tuple[list[Relation], dict]:
+    stats = {"steps": 0, "projections": 0, "rows_copied": 0, "bytes_copied": 0}
     new_relations = []
     for relation in relations:
-
-        # Check if the relation is in BCNF
-        if check_BCNF(relation.table, relation.FDs, relation.key):
+        columns = list(relation.table.columns)
+        engine, schema, seeds = relation_engine(relation)
+        key = candidate_key_masks(engine, schema, seeds, limit=1)[0]
+
+        # MVDs of the relation by determinant, only those that hold in its table
+        held = []
+        by_determinant = {}
+        cache = {}
+        for mvd in MVDs:
+            if not all(col in columns for col in mvd.determinants):
+                continue
+            lhs = engine.mask(mvd.determinants)
+            rhs = engine.mask([col for col in mvd.dependents if col in columns]) & ~lhs
+            if rhs == 0 or lhs | rhs == schema:
+                continue
+            projected = MultiValuedDependency(
+                ", ".join(engine.names_of(lhs))
+                + " ->> "
+                + ", ".join(engine.names_of(rhs))
+            )
+            if check_MVD(relation.table, projected, cache) is not None:
+                continue
+            held.append(projected)
+            by_determinant.setdefault(lhs, []).append(rhs)
+        if len(held) == 0:
             new_relations.append(relation)
             continue
 
-        violations = []
-
-        # Find all FDs that violate BCNF
-        for fd in relation.FDs:
-            # For a relationship to be in BCNF, the determinant must be a superkey
-            if not is_superkey(relation.table, fd.determinants):
-                violations.append(fd)
+        # FDs imply MVDs, so they take part in the dependency basis as well
+        dependencies = [(lhs, rhs) for lhs, rhs in zip(engine.lhs, engine.rhs)]
+        for lhs, dependents in by_determinant.items():
+            dependencies.extend((lhs, rhs) for rhs in dependents)
+        bases = {}
 
-        # For every violation, decompose the table into two relations R-A and XA
+        # Entries are as in decompose_BCNF: schema, superkey, split and moved attributes
         i = 0  # Iterator to name decomposed relations
-        if len(violations) > 0:
-            i += 1
-            new_relation = Relation(
-                pd.DataFrame(), [], [], [], fd.dependent + "_" + str(i), []
-            )
-
-            # Add the determinants over to the new relation
-            for determinant in fd.determinants:
-                new_relation.table[determinant] = relation.table[determinant].copy()
-
-            # Add the dependents over to the new relation and remove them from the original relation
-            for dependent in fd.dependents:
-                new_relation.table[dependent] = relation.table[dependent].copy()
-                relation.table.drop(columns=dependent, inplace=True)
-
-            # Update the key of the new relation
-            new_relation.key = fd.determinants
-
-            new_relation.table = new_relation.table.drop_duplicates()
-            # Update the FDs of the new relation
-            new_relation.FDs = [fd]
-
-            # Add the new relation to the list of new relations
-            new_relations.append(new_relation)
-
-            # Remove the FD from the original relation
-            relation.FDs.remove(fd)
-
-        # Add the modified original relation to the list of new relations
-        new_relations.append(relation)
-
-    # Final Check to make sure all relations are in BCNF
-    for relation in new_relations:
-        if not check_BCNF(relation.table, relation.FDs, relation.key):
+        pending = deque([(schema, key, 0, 0)])
+        done = []
+        while pending:
+            attributes, superkey, split, named = pending.popleft()
+            block = 0
+            for lhs in by_determinant:
+                if (
+                    lhs & ~attributes
+                    or attributes & ~engine.closure_mask(lhs, target=attributes) == 0
+                ):
+                    continue
+                if lhs not in bases:
+                    bases[lhs] = dependency_basis(schema, lhs, dependencies)
+                blocks = [b & attributes for b in bases[lhs] if b & attributes]
+                if len(blocks) > 1:
+                    block = blocks[0]
+                    break
+            if block == 0:
+                done.append((attributes, superkey, split, named))
+                continue
 
-            new_relations.remove(relation)
+            i += 1
+            stats["steps"] += 1
+            pending.append((lhs | block, lhs | block, i, block))
+            if superkey & block:
+                superkey = superkey & ~block | lhs
+            pending.append((attributes & ~block, superkey, split, named))
 
-            # Since new relations were not in BCNF, decompose them further
-            r = transform_to_BCNF([relation])
-            for i in r:
-                new_relations.append(i)
+        new_relations.extend(materialize_schemas(relation, engine, done, held, stats))
 
-    return new_relations
+    return new_relations, stats
 
 
-# Assume the table is in BCNF. Transform it to 4NF
 def transform_to_4NF(
     relations: list[Relation], MVDs: list[MultiValuedDependency]
 ) -> list[Relation]:
-    new_relations = []
-
-    # Check to see if any of the original MVDs are still valid
-    MVDs = validate_MVDs(relations, MVDs)
+    return decompose_4NF(relations, MVDs)[0]
 
-    if MVDs == []:
-        return relations
 
+# Decompose every relation into 5NF. Pending relations are kept in a queue; a relation with a
+# join dependency that holds in its table but is not implied by its candidate keys is split
+# into the projections of that dependency, which are queued again. The largest projection
+# keeps the relation's name. Returns the relations, the join dependencies they were split on,
+# which a chase needs to find the join lossless, and the number of splits, projections, rows
+# and bytes copied and the join dependency search statistics summed over every relation
+# checked.
+def decompose_5NF(
+    relations: list[Relation], MVDs: list[MultiValuedDependency]
+) -> tuple[list[Relation], list, dict]:
+    stats = {"steps": 0, "projections": 0, "rows_copied": 0, "bytes_copied": 0}
+    new_relations = []
+    JDs = []
+    pending = deque(relations)
     i = 0  # Iterator to name decomposed relations
-    for mvd in MVDs:
-
-        relation = find_relation_MVD(relations, mvd)
-
-        # For every non-trivial MVD, if the determinant is a superkey, then it is in 4nf
-        if is_superkey(relation.table, mvd.determinants):
+    while pending:
+        relation = pending.popleft()
+        found, search = find_join_dependencies(
+            relation.table, relation.FDs, relation.key, MVDs
+        )
+        for name, value in search.items():
+            stats[name] = stats.get(name, 0) + value
+        if len(found) == 0:
+            new_relations.append(relation)
             continue
 
-        i += 1
-
-        # Decompose each MVD into a new trivial relation
-        for det in mvd.determinants:
-            new_relation = Relation(pd.DataFrame(), [], [], [], det + "_" + str(i), [])
-
-            # Add the determinants over to the new relation
-            for determinant in mvd.determinants:
-                new_relation.table[determinant] = relation.table[determinant].copy()
-
-            # Add the dependents over to the new relation and remove them from the original relation
-            for dependent in mvd.dependents:
-                new_relation.table[dependent] = relation.table[dependent].copy()
-                relation.table.drop(columns=dependent, inplace=True)
-
-            # Update the key of the new relation
-            for det in mvd.determinants:
-                new_relation.key.append(det)
-
-            for dep in mvd.dependents:
-                new_relation.key.append(dep)
-
-            # Add the new relation to the list of new relations
-            new_relations.append(new_relation)
-            new_relations.table = new_relations.table.drop_duplicates()
-
-        # Add the modified original relation to the list of new relations
-        new_relations.append(relation)
-
-        # Remove the relation temporarily to add all the relations together
-        relations.remove(relation)
-
-        # Add the remaining relations to the list of new relations
-        for r in relations:
-            new_relations.append(r)
+        columns = list(relation.table.columns)
+        engine = ClosureEngine(relation.FDs, columns)
+        components = sorted(
+            (engine.mask(c) for c in found[0].components), key=int.bit_count
+        )
+        stats["steps"] += 1
+        JDs.append(found[0])
+        schemas = []
+        for component in components[:-1]:
+            i += 1
+            schemas.append((component, component, i, component))
+        schemas.append((components[-1], components[-1], 0, 0))
+        pending.extend(materialize_schemas(relation, engine, schemas, MVDs, stats))
 
-    return new_relations
+    return new_relations, JDs, stats
 
 
-# Assume the table is in 4NF. Transform it to 5NF
 def transform_to_5NF(
     relations: list[Relation], MVDs: list[MultiValuedDependency]
 ) -> list[Relation]:
-    new_relations = []
-
-    for relation in relations:
-
-        if check_5NF(relation.table, relation.FDs, relation.key):
-            new_relations.append(relation)
-            continue
-
-    return relations
+    return decompose_5NF(relations, MVDs)[0]
 
 
-# Check if initial multivalue dependencies are still valid after decomposition
-def validate_MVDs(
-    relations: list[Relation], MVDs: list[MultiValuedDependency]
-) -> list[MultiValuedDependency]:
-    valid_MVDs = MVDs.copy()
-    for mvd in valid_MVDs:
-        mvd.print()
-
-    for relation in relations:
-        for MVD in MVDs:
-            valid = True
-            group = relation.find_MVD_Determinant(MVD.determinant)
-            for i in range(len(group)):
-                for j in range(len(group)):
-                    if relation.find_relationship(
-                        group[i].dependent, group[j].dependent
-                    ):
-                        valid = False
-                        break
-            if not valid:
-                valid_MVDs.remove(MVD)
-
-    return valid_MVDs
-
-
-# Find what relation a MVD belongs to
-def find_relation_MVD(
-    relations: list[Relation], MVD: MultiValuedDependency
-) -> Relation:
-    for relation in relations:
-        if (
-            len(relation.find_MVD_Determinant(MVD.determinant)) > 0
-            and len(relation.find_MVD_Dependent(MVD.dependent)) > 0
-        ):
-            return relation
-
-    return None
-
-
-def update_relationNames(relations: list[Relation]) -> list[Relation]:
+# Print every relation and ask for a new name for it, or only print them when not rename
+def update_relationNames(
+    relations: list[Relation], rename: bool = True
+) -> list[Relation]:
     for relation in relations:
         print(relation.name)
         print(relation.table)
@@ -636,11 +915,12 @@ def update_relationNames(relations: list[Relation]) -> list[Relation]:
         for fd in relation.FDs:
             fd.print()
 
-        change_name = input(
-            "\nWould you like to change the name of this relation? (y/n): "
-        )
-        if change_name == "y":
-            relation.name = input("Enter the new name: ")
+        if rename:
+            change_name = input(
+                "\nWould you like to change the name of this relation? (y/n): "
+            )
+            if change_name == "y":
+                relation.name = input("Enter the new name: ")
         print()
 
     return relations
@@ -0,0 +1,101 @@
+import csv
+import os
+import shutil
+
+import pytest
+
+from batch import batch_main, read_manifest
+
+EXAMPLES = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_manifest(tmp_path, rows: list[str]) -> str:
+    path = tmp_path / "jobs.csv"
+    path.write_text("\n".join(["table,fds,form,name"] + rows) + "\n")
+    return str(path)
+
+
+# Relative paths are taken from the manifest's directory and a job is named after its table
+def test_manifest_resolves_paths_and_names(tmp_path):
+    path = write_manifest(
+        tmp_path, ["data/people.csv,discover,3,", "orders.csv,fds.txt,,"]
+    )
+
+    people, orders = read_manifest(path)
+
+    assert people.name == "people"
+    assert people.table == str(tmp_path / "data" / "people.csv")
+    assert people.FDs == "discover"
+    assert orders.FDs == str(tmp_path / "fds.txt")
+    assert orders.form == "B"
+
+
+# A job name is the job's output directory, so one that is a path is refused
+@pytest.mark.parametrize("name", ["..", "../escape", "sub/job", "sub\\job", "/tmp/job"])
+def test_manifest_rejects_job_names_that_are_paths(tmp_path, name):
+    path = write_manifest(tmp_path, ["people.csv,discover,3," + name])
+
+    with pytest.raises(ValueError, match="jobs.csv:2: job name"):
+        read_manifest(path)
+
+
+# Two jobs writing to the same output directory are refused
+def test_manifest_rejects_duplicate_names(tmp_path):
+    path = write_manifest(
+        tmp_path, ["a/people.csv,discover,3,", "b/people.csv,discover,3,"]
+    )
+
+    with pytest.raises(ValueError, match="jobs.csv:3: job name people is used twice"):
+        read_manifest(path)
+
+
+# The example table and FDs with a manifest of a job on them and a job on a missing table
+def example_jobs(tmp_path) -> str:
+    for name in ["exampleInputTable.csv", "exampleFunctionalDependencies.txt"]:
+        shutil.copy(os.path.join(EXAMPLES, name), tmp_path)
+    path = tmp_path / "jobs.csv"
+    path.write_text(
+        "table,fds,form,key,name\n"
+        'exampleInputTable.csv,exampleFunctionalDependencies.txt,B,"StudentID, Course",'
+        "students\n"
+        "missing.csv,discover,3,,missing\n"
+    )
+    return str(path)
+
+
+def read_summary(directory) -> dict:
+    with open(directory / "summary.csv", newline="") as f:
+        return {row["name"]: row for row in csv.DictReader(f)}
+
+
+# Every job runs in its own process and writes its outputs; a failing job is reported in
+# the summary without stopping the others, and the exit code says not every job succeeded
+def test_batch_runs_jobs_and_writes_summary(tmp_path):
+    output = tmp_path / "out"
+
+    code = batch_main(
+        [example_jobs(tmp_path), "--output-dir", str(output), "--workers", "2"]
+        + ["--format", "csv"]
+    )
+
+    assert code == 1
+    summary = read_summary(output)
+    assert summary["students"]["status"] == "ok"
+    assert summary["students"]["relations"] == "5"
+    assert summary["missing"]["status"] == "failed"
+    assert "FileNotFoundError" in summary["missing"]["error"]
+    assert (output / "students" / "output.txt").exists()
+    assert (output / "students" / "relations" / "students.csv").exists()
+    assert (output / "missing" / "log.txt").exists()
+
+
+# A job still running at its timeout is stopped and reported as such
+def test_batch_stops_jobs_at_timeout(tmp_path):
+    output = tmp_path / "out"
+
+    code = batch_main(
+        [example_jobs(tmp_path), "--output-dir", str(output)] + ["--timeout", "0.001"]
+    )
+
+    assert code == 1
+    assert read_summary(output)["students"]["status"] == "timeout"
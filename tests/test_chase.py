@@ -0,0 +1,81 @@
+import random
+
+import pandas as pd
+
+from chase import lossless_join, lost_dependencies, verify_decomposition
+from closure import ClosureEngine
+from normalizer import FunctionalDependency, Relation, decompose_5NF
+from test_closure import random_FDs
+from validation import verify_join
+
+
+# Agents sell the products of the companies they represent that they also sell, so the
+# table is the join of its three binary projections and of no two of them
+def agent_company_product() -> pd.DataFrame:
+    ac = pd.DataFrame({"Agent": ["a1", "a1", "a2", "a2"], "Company": ["c1", "c2"] * 2})
+    cp = pd.DataFrame(
+        {"Company": ["c1", "c1", "c2", "c2"], "Product": ["p1", "p2", "p1", "p3"]}
+    )
+    ap = pd.DataFrame(
+        {"Agent": ["a1", "a1", "a2", "a2"], "Product": ["p1", "p3", "p2", "p1"]}
+    )
+    return ac.merge(cp).merge(ap)
+
+
+# A 5NF split on a ternary join dependency is lossless once the chase is given that dependency
+def test_ternary_5NF_split_is_lossless_with_its_JD():
+    df = agent_company_product()
+    key = list(df.columns)
+    relation = Relation(df, key, [], [], "Sales", None)
+
+    relations, JDs, stats = decompose_5NF([relation], [])
+
+    assert stats["steps"] == 1
+    assert len(relations) == 3
+    assert all(len(r.table.columns) == 2 for r in relations)
+    assert verify_join(df, relations)[0]
+    assert not verify_decomposition(relations, [], [], key)[0]
+    assert verify_decomposition(relations, [], [], key, JDs) == (True, [])
+
+
+# A split in two is lossless exactly when the shared attributes determine one of the parts
+def test_binary_split_lossless_by_closure():
+    rng = random.Random(6)
+    columns = ["c" + str(i) for i in range(6)]
+    for _ in range(50):
+        engine = ClosureEngine(
+            [FunctionalDependency(fd) for fd in random_FDs(rng, columns, 3)], columns
+        )
+        first = engine.mask(rng.sample(columns, 3))
+        second = engine.all_mask & ~first | engine.mask(rng.sample(columns, 1))
+        closure = engine.closure_mask(first & second)
+
+        expected = first & ~closure == 0 or second & ~closure == 0
+        assert lossless_join(engine, [first, second]) == expected
+
+
+# An MVD makes a split on its determinant lossless, which the FDs alone do not
+def test_MVD_makes_split_lossless():
+    engine = ClosureEngine(attributes=["A", "B", "C"])
+    schemas = [engine.mask(["A", "B"]), engine.mask(["A", "C"])]
+    MVD = (engine.mask(["A"]), engine.mask(["B"]))
+
+    assert not lossless_join(engine, schemas)
+    assert lossless_join(engine, schemas, [MVD])
+
+
+# An FD spanning two relations is preserved only when closures inside them reach it
+def test_lost_dependencies():
+    FDs = [FunctionalDependency("A, B -> C"), FunctionalDependency("C -> B")]
+    engine = ClosureEngine(FDs)
+    pairs = [(engine.mask(fd.determinants), engine.mask(fd.dependents)) for fd in FDs]
+
+    lost = lost_dependencies(
+        engine, [engine.mask(["A", "C"]), engine.mask(["B", "C"])], pairs
+    )
+
+    assert lost == [pairs[0]]
+    chained = ClosureEngine([FunctionalDependency(fd) for fd in ["A -> B", "B -> C"]])
+    A, C = chained.mask(["A"]), chained.mask(["C"])
+    schemas = [chained.mask(["A", "B"]), chained.mask(["B", "C"])]
+    assert lost_dependencies(chained, schemas, [(A, C)]) == []
@@ -0,0 +1,180 @@
+import itertools
+import random
+
+from closure import (
+    ClosureEngine,
+    candidate_key_masks,
+    candidate_keys,
+    minimal_cover_masks,
+)
+from normalizer import FunctionalDependency, minimal_cover
+
+# FDs whose keys on a part of the schema are only found through attributes outside it
+SUBSCHEMA_FDS = [
+    "c0, c1 -> c2",
+    "c1, c3 -> c2, c4",
+    "c0, c2, c4 -> c3",
+    "c0, c3, c4 -> c2",
+    "c2, c3, c4 -> c0, c1",
+]
+
+
+# Keys of a sub-schema are minimal even when its attributes are derived through others
+def test_candidate_keys_of_subschema():
+    engine = ClosureEngine(
+        [FunctionalDependency(fd) for fd in SUBSCHEMA_FDS],
+        ["c0", "c1", "c2", "c3", "c4"],
+    )
+    schema = engine.mask(["c0", "c1", "c3", "c4"])
+
+    keys = candidate_key_masks(engine, schema, [engine.mask(["c0", "c1", "c3"])])
+
+    assert sorted(engine.names_of(keys[0])) == ["c1", "c3"]
+    for key in keys:
+        assert schema & ~engine.closure_mask(key) == 0
+        for bit in engine.names_of(key):
+            reduced = key & ~engine.mask([bit])
+            assert schema & ~engine.closure_mask(reduced) != 0
+
+
+# Closure by applying every FD until nothing changes
+def naive_closure(FDs: list[tuple[set, set]], attributes: set) -> set:
+    closure = set(attributes)
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rhs in FDs:
+            if lhs <= closure and not rhs <= closure:
+                closure |= rhs
+                changed = True
+    return closure
+
+
+def random_FDs(rng: random.Random, columns: list[str], count: int) -> list[str]:
+    FDs = []
+    for _ in range(count):
+        lhs = rng.sample(columns, rng.randint(1, 3))
+        rhs = rng.sample([col for col in columns if col not in lhs], rng.randint(1, 2))
+        FDs.append(", ".join(lhs) + " -> " + ", ".join(rhs))
+    return FDs
+
+
+# Closures of one engine agree with the fixpoint, however many closures it computed before
+def test_closure_matches_fixpoint():
+    rng = random.Random(0)
+    columns = ["c" + str(i) for i in range(8)]
+    for _ in range(20):
+        FDs = [FunctionalDependency(fd) for fd in random_FDs(rng, columns, 6)]
+        pairs = [(set(fd.determinants), set(fd.dependents)) for fd in FDs]
+        engine = ClosureEngine(FDs, columns)
+        for _ in range(10):
+            attributes = set(rng.sample(columns, rng.randint(0, 4)))
+            assert engine.closure(attributes) == naive_closure(pairs, attributes)
+
+
+# A skipped FD takes no part in the closure, FDs with an empty determinant always do, and a
+# removed FD takes no part in any later closure
+def test_closure_skip_unconditional_and_remove():
+    engine = ClosureEngine(attributes=["A", "B", "C", "D"])
+    first = engine.add(["A"], ["B"])
+    engine.add(["B"], ["C"])
+    constant = engine.add([], ["D"])
+
+    assert engine.closure(["A"]) == {"A", "B", "C", "D"}
+    A = engine.mask(["A"])
+    assert engine.closure_mask(A, skip=first) == engine.mask(["A", "D"])
+    assert engine.closure_mask(A, skip=constant) == engine.mask(["A", "B", "C"])
+    assert engine.implies(["A"], ["C"])
+
+    engine.remove(first)
+    assert engine.closure(["A"]) == {"A", "D"}
+    assert not engine.implies(["A"], ["C"])
+
+
+# The search may stop once the target is reached, but always returns at least the target
+def test_closure_stops_at_target():
+    engine = ClosureEngine(
+        [FunctionalDependency("A -> B"), FunctionalDependency("B -> C")]
+    )
+    target = engine.mask(["B"])
+
+    closure = engine.closure_mask(engine.mask(["A"]), target=target)
+
+    assert closure & target == target
+    assert engine.closure(["A"]) == {"A", "B", "C"}
+
+
+# Candidate keys by testing every subset of the attributes, smallest first
+def brute_force_keys(FDs: list[tuple[set, set]], columns: list[str]) -> set:
+    keys = set()
+    for size in range(len(columns) + 1):
+        for subset in itertools.combinations(columns, size):
+            if any(key <= set(subset) for key in keys):
+                continue
+            if naive_closure(FDs, set(subset)) >= set(columns):
+                keys.add(frozenset(subset))
+    return keys
+
+
+# Every candidate key is found, without walking the subsets of the attributes
+def test_candidate_keys_match_brute_force():
+    rng = random.Random(1)
+    columns = ["c" + str(i) for i in range(7)]
+    for _ in range(30):
+        FDs = [FunctionalDependency(fd) for fd in random_FDs(rng, columns, 5)]
+        pairs = [(set(fd.determinants), set(fd.dependents)) for fd in FDs]
+
+        keys = candidate_keys(FDs, columns)
+
+        assert set(frozenset(key) for key in keys) == brute_force_keys(pairs, columns)
+
+
+# A declared key is minimized and comes first, in the order of the columns, and at most
+# limit keys are returned
+def test_candidate_keys_from_declared_key():
+    FDs = [
+        FunctionalDependency("A -> B"),
+        FunctionalDependency("B -> A"),
+        FunctionalDependency("C -> D"),
+    ]
+
+    assert candidate_keys(FDs, ["A", "B", "C", "D"], ["C", "B", "D"]) == [
+        ["B", "C"],
+        ["A", "C"],
+    ]
+    assert len(candidate_keys(FDs, ["A", "B", "C", "D"], limit=1)) == 1
+
+
+# The cover implies every FD it came from, has single dependents, and loses the closure of
+# its FDs when any FD or determinant attribute of it is dropped
+def test_minimal_cover_is_equivalent_and_minimal():
+    rng = random.Random(2)
+    columns = ["c" + str(i) for i in range(7)]
+    for _ in range(30):
+        FDs = [FunctionalDependency(fd) for fd in random_FDs(rng, columns, 8)]
+        original = ClosureEngine(FDs, columns)
+
+        cover, _, _ = minimal_cover_masks(original)
+
+        engine = ClosureEngine(attributes=columns)
+        positions = [engine.add_mask(lhs, rhs) for lhs, rhs in cover]
+        for fd in FDs:
+            assert engine.implies(fd.determinants, fd.dependents)
+        for position, (lhs, rhs) in zip(positions, cover):
+            assert rhs.bit_count() == 1 and original.implies_mask(lhs, rhs)
+            assert not engine.implies_mask(lhs, rhs, skip=position)
+            for bit in engine.names_of(lhs):
+                assert not engine.implies_mask(lhs & ~engine.mask([bit]), rhs)
+
+
+# The canonical cover merges dependents by determinant and names what it removed
+def test_minimal_cover_reports_removals():
+    FDs = [
+        FunctionalDependency(fd)
+        for fd in ["A -> B, C", "B -> C", "A -> B", "A, B -> C"]
+    ]
+
+    cover, removed = minimal_cover(FDs)
+
+    assert [fd.fd for fd in cover] == ["A -> B", "B -> C"]
+    assert removed == ["Extraneous A in A, B -> C", "Redundant A -> C"]
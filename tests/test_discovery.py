@@ -0,0 +1,115 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+import discovery
+from discovery import discover_FDs, discover_FDs_hybrid
+
+
+def random_table(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"c" + str(i): rng.integers(0, 4, rows) for i in range(4)})
+    df["c4"] = df["c0"] * 4 + df["c1"]
+    return df
+
+
+# A small table is mined serially, without starting a process pool for it
+def test_small_table_is_mined_serially():
+    FDs, stats = discover_FDs(random_table(100), workers=4)
+
+    assert stats["workers"] == 1
+    assert "c0, c1 -> c4" in [fd.fd for fd in FDs]
+
+
+# The process pool finds exactly the FDs of a serial run
+def test_parallel_run_finds_the_serial_FDs(monkeypatch):
+    monkeypatch.setattr(discovery, "PARALLEL_MIN_CELLS", 0)
+    df = random_table(200)
+
+    serial, _ = discover_FDs(df, workers=1)
+    parallel, stats = discover_FDs(df, workers=2)
+
+    assert stats["workers"] == 2
+    assert [fd.fd for fd in parallel] == [fd.fd for fd in serial]
+
+
+# The minimal FDs with at most max_lhs determinant attributes, found by grouping on every
+# subset of the columns, as (determinant, dependent) pairs
+def brute_force_FDs(df: pd.DataFrame, max_lhs: int) -> set:
+    FDs = set()
+    for dependent in df.columns:
+        others = [col for col in df.columns if col != dependent]
+        holding = []
+        for size in range(max_lhs + 1):
+            for lhs in itertools.combinations(others, size):
+                if any(set(known) <= set(lhs) for known in holding):
+                    continue
+                if size == 0:
+                    holds = df[dependent].nunique(dropna=False) <= 1
+                else:
+                    counts = df.groupby(list(lhs), dropna=False)[dependent].nunique(
+                        dropna=False
+                    )
+                    holds = (counts <= 1).all()
+                if holds:
+                    holding.append(lhs)
+                    if size > 0:
+                        FDs.add((frozenset(lhs), dependent))
+    return FDs
+
+
+def pairs(FDs: list) -> set:
+    return {
+        (frozenset(fd.determinants), dependent)
+        for fd in FDs
+        for dependent in fd.dependents
+    }
+
+
+# TANE finds exactly the minimal FDs, within the determinant size limit
+def test_discovery_matches_brute_force():
+    for seed in range(5):
+        df = random_table(60, seed)
+        for max_lhs in [1, 2, 4]:
+            FDs, stats = discover_FDs(df, max_lhs=max_lhs)
+
+            assert stats["complete"]
+            assert pairs(FDs) == brute_force_FDs(df, max_lhs)
+
+
+# A constant column is reported instead of becoming an FD with an empty determinant
+def test_discovery_reports_constant_columns():
+    df = random_table(30)
+    df["k"] = 7
+
+    FDs, stats = discover_FDs(df)
+
+    assert stats["constant_columns"] == ["k"]
+    assert all("k" not in fd.dependents for fd in FDs)
+
+
+# A search out of time stops with what it found and says it is incomplete
+def test_discovery_stops_at_time_budget():
+    FDs, stats = discover_FDs(random_table(60), time_budget=0)
+
+    assert not stats["complete"]
+    assert pairs(FDs) <= brute_force_FDs(random_table(60), 4)
+
+
+# Sampling only prunes: the hybrid search over the streamed file finds the FDs of TANE, even
+# when the sample is too small to rule out the false candidates by itself
+def test_hybrid_discovery_matches_TANE(tmp_path):
+    df = random_table(500, 3)
+    path = tmp_path / "table.csv"
+    df.to_csv(path, index=False)
+    expected, _ = discover_FDs(df, max_lhs=3)
+
+    for sample_size, refined in [(10, True), (500, False)]:
+        FDs, stats = discover_FDs_hybrid(
+            str(path), max_lhs=3, sample_size=sample_size, chunksize=64
+        )
+
+        assert stats["rows"] == 500
+        assert (stats["candidates_failed"] > 0) == refined
+        assert pairs(FDs) == pairs(expected)
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+from explode import explode_table, split_column
+
+
+# Delimited strings are split and trimmed, and nulls and empty pieces hold no values
+def test_split_delimited_column():
+    column = pd.Series(["a; b", None, "b;;c ", "a; b", ""])
+
+    split = split_column(column, ";")
+
+    assert split.lengths.tolist() == [2, 0, 2, 2, 0]
+    assert split.values.tolist() == ["a", "b", "b", "c", "a", "b"]
+
+
+# Bracketed text, container cells and encoded columns are split as well
+def test_split_nested_list_and_encoded_columns():
+    nested = split_column(pd.Series(['["x", "y"]', "[]", "['z']"]), "nested")
+    assert nested.lengths.tolist() == [2, 0, 1]
+    assert nested.values.tolist() == ["x", "y", "z"]
+
+    lists = split_column(pd.Series([[1, 2], None, (3,)]), "list")
+    assert lists.lengths.tolist() == [2, 0, 1]
+    assert lists.values.tolist() == [1, 2, 3]
+
+    encoded = split_column(pd.Series(["a,b", "b", "a,b"]).astype("category"), ",")
+    assert isinstance(encoded.values.dtype, pd.CategoricalDtype)
+    assert encoded.values.astype(str).tolist() == ["a", "b", "b", "a", "b"]
+
+
+# Exploding in one pass gives the rows of pandas' explode, keeping the other columns' dtypes
+def test_explode_matches_pandas():
+    table = pd.DataFrame(
+        {"ID": [1, 2, 3], "Phones": ["1;2", "3", None], "Types": ["h;w", "c", None]}
+    )
+    lists = {col: split_column(table[col], ";") for col in ["Phones", "Types"]}
+
+    exploded = explode_table(table, lists)
+
+    expected = table.assign(
+        Phones=table["Phones"].str.split(";"), Types=table["Types"].str.split(";")
+    ).explode(["Phones", "Types"])
+    expected = expected.dropna(subset=["Phones"]).astype({"ID": table["ID"].dtype})
+    assert exploded.reset_index(drop=True).equals(expected.reset_index(drop=True))
+
+
+# Columns of different lengths in a row cannot be laid out in lockstep
+def test_explode_refuses_columns_of_different_lengths():
+    table = pd.DataFrame({"Phones": ["1;2", "3"], "Types": ["h", "w;c"]})
+    lists = {col: split_column(table[col], ";") for col in table.columns}
+
+    with pytest.raises(ValueError, match="Phones, Types"):
+        explode_table(table, lists)
@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+from form_finder import (
+    NORMAL_FORMS,
+    SuperkeyCache,
+    analyze_1NF,
+    check_1NF,
+    check_2NF,
+    check_3NF,
+    check_BCNF,
+    classify,
+    is_superkey,
+)
+from normalizer import FunctionalDependency, Relation
+
+
+# Names written as "Surname, Given" share surnames at the same position and are single values
+def test_names_with_shared_surname_are_atomic():
+    df = pd.DataFrame({"Name": ["Doe, John", "Doe, Jane", "Roe, John", "Roe, Jane"]})
+    assert analyze_1NF(df).multivalued == {}
+
+
+# Numbers with thousands separators are single values
+def test_thousands_separated_numbers_are_atomic():
+    df = pd.DataFrame({"Amount": ["1,000", "1,500", "2,000", "2,500"]})
+    assert analyze_1NF(df).multivalued == {}
+
+
+# Lists of values that never recur are found by the number of pieces they hold
+def test_lists_of_unique_values_are_multivalued():
+    df = pd.DataFrame({"Phones": ["1;2", "4;5;6"]})
+    assert analyze_1NF(df).multivalued == {"Phones": ";"}
+
+
+# Lists of a shared domain are found by values recurring at different positions
+def test_lists_of_shared_values_are_multivalued():
+    df = pd.DataFrame({"Courses": ["Math, CS", "CS, Bio", "Bio", "Math"]})
+    assert analyze_1NF(df).multivalued == {"Courses": ","}
+
+
+# Prose and addresses holding several commas are single values
+def test_prose_with_commas_is_atomic():
+    df = pd.DataFrame(
+        {
+            "Note": [
+                "I came, I saw, I conquered",
+                "Ships late, check stock, call back",
+                "Fine",
+            ],
+            "Address": [
+                "12 Main St, Springfield, IL",
+                "4 Elm Rd, Rolla, MO",
+                "9 Oak Ave, Denver, CO",
+            ],
+        }
+    )
+    assert analyze_1NF(df).multivalued == {}
+
+
+# Bracketed text is nested, container cells are lists, an encoded column is analyzed from its
+# dictionary, and a column of numbers and strings is neither atomic nor multivalued
+def test_1NF_analysis_of_column_kinds():
+    df = pd.DataFrame(
+        {
+            "Tags": ['["a", "b"]', '["c"]', "[]"],
+            "Sets": [[1, 2], [3], None],
+            "Codes": pd.Series(["a;b", "c;a;d", "b"]).astype("category"),
+            "Mixed": [1, "x", 2.5],
+            "Count": [1, 2, 3],
+        }
+    )
+
+    report = analyze_1NF(df)
+
+    assert report.multivalued == {"Tags": "nested", "Sets": "list", "Codes": ";"}
+    assert report.mixed == ["Mixed"]
+    assert report.kinds["Count"] == "numeric"
+    assert not report.atomic
+
+
+# The superkey test reads the columns without adding any to the table, and nulls are a value
+def test_superkey_keeps_table_and_groups_nulls():
+    df = pd.DataFrame({"A": [1, 1, None, None], "B": ["x", "y", "x", "x"]})
+    columns = list(df.columns)
+
+    assert is_superkey(df, ["A", "B"]) is False
+    assert is_superkey(df.iloc[:3], ["A", "B"]) is True
+    assert list(df.columns) == columns
+
+
+# Categorical columns group by their codes the same way as the strings they hold
+def test_superkey_of_categorical_columns():
+    values = pd.Series(["a", None, "b", None])
+    df = pd.DataFrame({"A": values, "C": values.astype("category"), "B": [1, 2, 1, 3]})
+
+    assert is_superkey(df, ["A", "B"]) == is_superkey(df, ["C", "B"]) is True
+    assert is_superkey(df, ["A"]) == is_superkey(df, ["C"]) is False
+
+
+# Combinations of many wide columns are told apart past the int64 range of their product
+def test_superkey_of_many_wide_columns():
+    rows = 20_000
+    df = pd.DataFrame({"c" + str(i): np.arange(rows) for i in range(6)})
+    df["c5"] = np.arange(rows) // 2
+
+    assert is_superkey(df, list(df.columns)) is True
+    assert is_superkey(df, ["c5"]) is False
+    df.loc[1, ["c0", "c1", "c2", "c3", "c4"]] = 0
+    assert is_superkey(df, list(df.columns)) is False
+
+
+# A repeated superkey test is answered from the cache, whatever the order of the attributes
+def test_superkey_cache_answers_repeated_tests():
+    df = pd.DataFrame({"A": [1, 2, 3], "B": [1, 1, 2]})
+    cache = SuperkeyCache()
+
+    assert is_superkey(df, ["A", "B"], cache)
+    assert is_superkey(df, ["B", "A"], cache)
+    assert not is_superkey(df, ["B"], cache)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+# Adding a column or a row changes the table's fingerprint and drops its results
+def test_superkey_cache_forgets_changed_tables():
+    df = pd.DataFrame({"A": [1, 2], "B": [1, 1]})
+    cache = SuperkeyCache()
+    assert is_superkey(df, ["A"], cache)
+
+    df.loc[2] = [1, 2]
+    assert not is_superkey(df, ["A"], cache)
+    df["C"] = [0, 1, 2]
+    assert not is_superkey(df, ["A"], cache)
+    assert cache.hits == 0
+
+
+# The cache keeps at most max_entries attribute sets per table, dropping the least recent
+def test_superkey_cache_is_bounded():
+    df = pd.DataFrame({"c" + str(i): [1, 2] for i in range(4)})
+    cache = SuperkeyCache(max_entries=2)
+
+    for col in df.columns:
+        is_superkey(df, [col], cache)
+
+    assert cache.get(df, ["c0"]) is None
+    assert cache.get(df, ["c3"]) is True
+
+
+def advisors() -> Relation:
+    df = pd.DataFrame(
+        {
+            "StudentID": [1, 2, 3, 4],
+            "Advisor": ["Smith", "Jones", "Smith", "Lee"],
+            "Office": ["M1", "C1", "M1", "C1"],
+        }
+    )
+    FDs = [
+        FunctionalDependency("StudentID -> Advisor"),
+        FunctionalDependency("Advisor -> Office"),
+    ]
+    return Relation(df, ["StudentID"], FDs, [], "Students", [])
+
+
+# One pass reports the violations of every level, agreeing with the check_* chain
+def test_classify_reports_every_level():
+    relation = advisors()
+    df, FDs, key = relation.table, relation.FDs, relation.key
+
+    report = classify(relation)
+
+    assert report.checked == NORMAL_FORMS
+    assert report.highest == "2NF"
+    assert [fd.fd for fd in report.violations["3NF"]] == ["Advisor -> Office"]
+    assert [fd.fd for fd in report.violations["BCNF"]] == ["Advisor -> Office"]
+    assert report.violations["4NF"] == report.violations["5NF"] == []
+    assert report.satisfies("1NF") == check_1NF(df, key, None)
+    assert report.satisfies("2NF") == check_2NF(df, FDs, key)
+    assert report.satisfies("3NF") == check_3NF(df, FDs, key)
+    assert report.satisfies("BCNF") == check_BCNF(df, FDs, key)
+
+
+# Levels above upto are not evaluated, and a relation cannot satisfy a level left unchecked
+def test_classify_stops_at_upto():
+    relation = advisors()
+    relation.mvAttributes = ["Office"]
+
+    report = classify(relation, upto="2NF")
+
+    assert report.checked == ["1NF", "2NF"]
+    assert report.violations["1NF"] == ["multivalued attribute Office"]
+    assert report.highest is None
+    assert not report.satisfies("3NF")
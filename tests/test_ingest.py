@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from ingest import dictionary_codes, encode_table, read_chunks, read_table
+
+
+# Write rows of (id, value) to a CSV and return its path
+def write_csv(path, values: list[str]) -> str:
+    lines = ["id,value"] + [str(i) + "," + value for i, value in enumerate(values)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+# A column that is numeric in the first chunk and holds text later is read as text
+# throughout, keeping the spelling of its numbers
+def test_column_turning_to_text_after_first_chunk(tmp_path):
+    values = ["%03d" % i for i in range(25)]
+    values[17] = "x17"
+    path = write_csv(tmp_path / "table.csv", values)
+
+    df, chunks = read_chunks(path, chunksize=10)
+
+    assert chunks == 3
+    assert pd.api.types.is_integer_dtype(df["id"].dtype)
+    assert isinstance(df["value"].dtype, pd.CategoricalDtype)
+    assert df["value"].astype(str).tolist() == values
+
+
+# Integer and float chunks of a column give one float column
+def test_numbers_upcast_across_chunks(tmp_path):
+    values = [str(i) for i in range(12)] + ["2.5", ""]
+    path = write_csv(tmp_path / "table.csv", values)
+
+    df, stats = read_table(path, engine="c", chunksize=10)
+
+    expected = pd.read_csv(path)
+    assert stats["chunks"] == 2
+    assert df["value"].dtype == "float64"
+    assert df["value"].equals(expected["value"])
+    assert df["id"].tolist() == expected["id"].tolist()
+
+
+# A table smaller than a chunk is read in one pass with the dtypes read_csv infers
+def test_single_chunk_matches_read_csv(tmp_path):
+    path = write_csv(tmp_path / "table.csv", ["a", "b", "a"])
+
+    df, chunks = read_chunks(path, chunksize=10)
+
+    assert chunks == 1
+    assert df["value"].astype(str).tolist() == ["a", "b", "a"]
+    assert df["id"].tolist() == [0, 1, 2]
+
+
+# Integers take the smallest width holding them, and text becomes categorical only when it
+# repeats enough
+def test_read_table_compacts_columns(tmp_path):
+    path = write_csv(tmp_path / "table.csv", ["a", "b"] * 10)
+    (tmp_path / "unique.csv").write_text(
+        "id,value\n" + "".join(str(i) + ",v" + str(i) + "\n" for i in range(20))
+    )
+
+    df, stats = read_table(path, engine="c")
+    unique, _ = read_table(str(tmp_path / "unique.csv"), engine="c")
+
+    assert df["id"].dtype == "int8"
+    assert isinstance(df["value"].dtype, pd.CategoricalDtype)
+    assert not isinstance(unique["value"].dtype, pd.CategoricalDtype)
+    assert unique["value"].tolist() == ["v" + str(i) for i in range(20)]
+    assert stats["rows"] == 20 and stats["memory"] > 0
+
+
+# Columns that are not numeric become categoricals, and numbers are kept as they are
+def test_encode_table_encodes_text_columns():
+    df = pd.DataFrame({"id": [1, 2, 3], "city": ["Oslo", "Rome", "Oslo"]})
+
+    encoded, stats = encode_table(df)
+
+    assert stats["encoded"] == 1
+    assert encoded["id"].dtype == df["id"].dtype
+    assert isinstance(encoded["city"].dtype, pd.CategoricalDtype)
+    assert encoded["city"].astype(str).tolist() == df["city"].tolist()
+
+
+# Nulls take the code just past the dictionary, so they group as a value of their own
+def test_dictionary_codes_of_nulls():
+    column = pd.Series(["b", None, "a", "b", None]).astype("category")
+
+    codes, size = dictionary_codes(column)
+
+    assert size == 3
+    assert codes.tolist() == [1, 2, 0, 1, 2]
+    assert dictionary_codes(pd.Series([], dtype="category"))[1] == 1
+    assert np.issubdtype(codes.dtype, np.integer)
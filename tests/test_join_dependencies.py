@@ -0,0 +1,82 @@
+import pandas as pd
+
+from join_dependencies import candidate_JDs, find_join_dependencies
+from normalizer import FunctionalDependency, MultiValuedDependency
+from test_chase import agent_company_product
+
+
+# Agents who sell two products of a company but not a third: the binary projections join
+# into a row the table lacks
+def agent_company_product_broken() -> pd.DataFrame:
+    return pd.DataFrame(
+        [("a1", "c1", "p1"), ("a1", "c2", "p2"), ("a2", "c1", "p2")],
+        columns=["Agent", "Company", "Product"],
+    )
+
+
+# Copies of a table on disjoint agents and companies, sharing the products
+def copies(df: pd.DataFrame, count: int) -> pd.DataFrame:
+    return pd.concat(
+        [
+            df.assign(
+                Agent=df["Agent"] + "_" + str(i), Company=df["Company"] + "_" + str(i)
+            )
+            for i in range(count)
+        ],
+        ignore_index=True,
+    )
+
+
+# MVDs give binary candidates and every three key attributes a ternary one
+def test_candidate_JDs():
+    candidates = candidate_JDs(
+        ["A", "B", "C", "D"], [["A", "B", "C"]], [MultiValuedDependency("A ->> B")]
+    )
+
+    assert [jd.jd for jd in candidates] == [
+        "*(A, B | A, C, D)",
+        "*(A, B, D | B, C, D | A, C, D)",
+    ]
+
+
+# The ternary join dependency is found when the projections join back to the table, on the
+# whole table or through a sample of it
+def test_ternary_JD_found():
+    df = agent_company_product()
+    for table, sample_rows in [(df, 50_000), (copies(df, 50), 40)]:
+        found, stats = find_join_dependencies(
+            table, [], list(df.columns), sample_rows=sample_rows
+        )
+
+        assert [jd.components for jd in found] == [
+            [["Agent", "Company"], ["Company", "Product"], ["Agent", "Product"]]
+        ]
+        assert stats["found"] == 1
+
+
+# A candidate whose projections join into extra rows fails, on a sample when there is one
+def test_ternary_JD_fails_on_extra_rows():
+    df = agent_company_product_broken()
+
+    found, stats = find_join_dependencies(df, [], list(df.columns))
+    assert found == [] and stats["failed"] == 1
+
+    found, stats = find_join_dependencies(
+        copies(df, 50), [], list(df.columns), sample_rows=30
+    )
+    assert found == [] and stats["pruned_by_sample"] == 1
+
+
+# A join dependency implied by a candidate key is no violation, and is not even tested
+def test_JD_implied_by_key_is_skipped():
+    df = pd.DataFrame(
+        {"ID": [1, 2, 3], "Name": ["a", "b", "a"], "City": ["x", "x", "y"]}
+    )
+    FDs = [FunctionalDependency("ID -> Name, City")]
+
+    found, stats = find_join_dependencies(
+        df, FDs, ["ID"], [MultiValuedDependency("ID ->> Name")]
+    )
+
+    assert found == []
+    assert stats["implied"] == stats["candidates"] == 1
@@ -0,0 +1,41 @@
+import pandas as pd
+
+import main
+from ingest import encode_table
+
+
+# An FD that does not hold in the data is left out instead of driving the transforms
+def test_violated_FD_is_left_out(capsys):
+    df = pd.DataFrame({"c0": [1, 1, 2], "c1": ["a", "b", "a"]})
+
+    relations, _ = main.normalize(df, ["c0 -> c1"], [], "3", None, None)
+
+    assert [list(r.table.columns) for r in relations] == [["c0", "c1"]]
+    assert relations[0].key == ["c0", "c1"]
+    assert len(relations[0].FDs) == 0
+    assert "Left out of the normalization: c0 -> c1" in capsys.readouterr().out
+
+
+# Normalizing the dictionary-encoded table gives the relations of the plain table, which
+# keep their codes
+def test_encoded_table_normalizes_alike():
+    df = pd.DataFrame(
+        {
+            "StudentID": [1, 2, 3, 4, 5],
+            "Advisor": ["Smith", "Jones", "Smith", "Lee", None],
+            "Office": ["M1", "C1", "M1", "C1", None],
+            "Course": ["DB, OS", "AI", "DB", "OS, AI", "DB"],
+        }
+    )
+    FDs = ["StudentID -> Advisor", "Advisor -> Office"]
+    encoded, _ = encode_table(df)
+
+    plain, _ = main.normalize(df, FDs, [], "B", ["StudentID"], ["Course"])
+    relations, _ = main.normalize(encoded, FDs, [], "B", ["StudentID"], ["Course"])
+
+    assert [r.name for r in relations] == [r.name for r in plain]
+    assert isinstance(relations[-1].table["Advisor"].dtype, pd.CategoricalDtype)
+    for relation, expected in zip(relations, plain):
+        assert relation.key == expected.key
+        table = relation.table.astype(str).reset_index(drop=True)
+        assert table.equals(expected.table.astype(str).reset_index(drop=True))
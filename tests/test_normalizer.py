@@ -0,0 +1,333 @@
+import itertools
+import random
+
+import pandas as pd
+
+from chase import verify_decomposition
+from closure import ClosureEngine, bcnf_violation
+from form_finder import classify
+from normalizer import (
+    DependencyList,
+    FunctionalDependency,
+    MultiValuedDependency,
+    Relation,
+    decompose_1NF,
+    decompose_4NF,
+    decompose_BCNF,
+    project,
+    project_FDs,
+    synthesize_3NF,
+    transform_to_2NF,
+    transform_to_3NF,
+)
+from test_closure import SUBSCHEMA_FDS, random_FDs
+from validation import verify_join
+
+
+# An FD naming a column that an earlier split moved away is projected onto the columns left,
+# and the dependencies it implied through that column are kept for the 3NF check
+def test_3NF_with_FD_on_moved_column():
+    df = pd.DataFrame(
+        {
+            "StudentID": [1, 2, 3, 4],
+            "Advisor": ["Smith", "Jones", "Smith", "Lee"],
+            "Office": ["M1", "C1", "M1", "C1"],
+            "Building": ["North", "South", "North", "South"],
+        }
+    )
+    FDs = [
+        FunctionalDependency("StudentID -> Advisor"),
+        FunctionalDependency("Advisor -> Office"),
+        FunctionalDependency("Office -> Building"),
+    ]
+    relation = Relation(df, ["StudentID"], FDs, [], "Students", [])
+
+    relations = transform_to_3NF([relation])
+
+    assert len(relations) == 3
+    columns = set(col for r in relations for col in r.table.columns)
+    assert columns == set(df.columns)
+    for r in relations:
+        assert all(col in r.table.columns for fd in r.FDs for col in fd.determinants)
+        assert classify(r, upto="3NF").satisfies("3NF")
+
+
+# Only the declared multivalued attributes are exploded: a scalar column holding commas stays
+# as it is, and the FD that covered the exploded attribute keeps its other dependents
+def test_1NF_explodes_declared_attributes_only():
+    df = pd.DataFrame(
+        {
+            "ID": [1, 2, 3],
+            "Name": ["Doe, John", "Doe, Jane", "Roe, Jim"],
+            "Phones": ["1;2", "4;5;6", "7"],
+        }
+    )
+    FDs = [FunctionalDependency("ID -> Name, Phones")]
+    relation = Relation(df, ["ID"], FDs, [], "People", ["Phones"])
+
+    relations, stats = decompose_1NF([relation])
+
+    assert stats["exploded"] == 1
+    phones, people = relations
+    assert phones.table["Phones"].tolist() == ["1", "2", "4", "5", "6", "7"]
+    assert people.table["Name"].tolist() == df["Name"].tolist()
+    assert [fd.fd for fd in people.FDs] == ["ID -> Name"]
+
+
+# Attributes exploded together that hold a different number of values in a row are crossed
+# into every combination of their values, and all of them become part of the key
+def test_1NF_crosses_attributes_of_different_lengths():
+    df = pd.DataFrame(
+        {"ID": [1, 2], "Phones": ["1;2", "3"], "Types": ["home", "work;cell"]}
+    )
+    FDs = [FunctionalDependency("ID, Phones -> Types")]
+    relation = Relation(df, ["ID"], FDs, [], "People", ["Phones", "Types"])
+
+    relations, stats = decompose_1NF([relation])
+
+    phones = relations[0]
+    assert phones.key == ["ID", "Phones", "Types"]
+    assert not phones.table.duplicated(phones.key).any()
+    rows = set(phones.table.itertuples(index=False, name=None))
+    assert rows == {
+        (1, "1", "home"),
+        (1, "2", "home"),
+        (2, "3", "work"),
+        (2, "3", "cell"),
+    }
+
+
+# A BCNF split keeps a minimal key and the FDs implied through the attribute it moved away
+def test_BCNF_projects_implied_FDs():
+    columns = ["c0", "c1", "c2", "c3", "c4"]
+    df = pd.DataFrame([[i] * 5 for i in range(4)], columns=columns)
+    FDs = [FunctionalDependency(fd) for fd in SUBSCHEMA_FDS]
+    relation = Relation(df, ["c2", "c3", "c4"], FDs, [], "R", None)
+
+    relations, _ = decompose_BCNF([relation])
+
+    split, source = relations
+    assert list(split.table.columns) == ["c0", "c1", "c2"]
+    assert list(source.table.columns) == ["c0", "c1", "c3", "c4"]
+    assert source.key == ["c1", "c3"]
+    assert "c1, c3 -> c0, c4" in [fd.fd for fd in source.FDs]
+    for r in relations:
+        assert classify(r, upto="BCNF").satisfies("BCNF")
+
+
+# Every schema of a BCNF decomposition is free of violations under the closure of all the FDs,
+# and the schemas join back losslessly
+def test_BCNF_decomposition_is_lossless():
+    rng = random.Random(5)
+    columns = ["c" + str(i) for i in range(6)]
+    df = pd.DataFrame([[i] * 6 for i in range(4)], columns=columns)
+    for _ in range(30):
+        FDs = [FunctionalDependency(fd) for fd in random_FDs(rng, columns, 4)]
+        engine = ClosureEngine(FDs, columns)
+        relation = Relation(df, columns, FDs, [], "R", None)
+
+        relations, stats = decompose_BCNF([relation])
+
+        assert len(relations) == stats["steps"] + 1
+        for r in relations:
+            assert bcnf_violation(engine, engine.mask(r.table.columns)) is None
+        assert verify_decomposition(relations, FDs)[0]
+
+
+# Every teacher of a course uses every book of it, and the course has one room
+def courses() -> pd.DataFrame:
+    rows = []
+    for course, teachers, books, room in [
+        ("DB", ["t1", "t2"], ["b1", "b2", "b3"], "r1"),
+        ("OS", ["t3"], ["b1", "b4"], "r2"),
+        ("AI", ["t1", "t4"], ["b5"], "r1"),
+    ]:
+        for teacher, book in itertools.product(teachers, books):
+            rows.append((course, teacher, book, room))
+    return pd.DataFrame(rows, columns=["Course", "Teacher", "Book", "Room"])
+
+
+# The dependency basis of Course, from its FD and its MVD, splits the table into one
+# relation per block, which join back to the table
+def test_4NF_splits_on_dependency_basis():
+    df = courses()
+    FDs = [FunctionalDependency("Course -> Room")]
+    relation = Relation(df, ["Course", "Teacher", "Book"], FDs, [], "Courses", None)
+    MVDs = [MultiValuedDependency("Course ->> Teacher")]
+
+    relations, stats = decompose_4NF([relation], MVDs)
+
+    assert stats["steps"] == 2
+    assert [list(r.table.columns) for r in relations] == [
+        ["Course", "Room"],
+        ["Course", "Teacher"],
+        ["Course", "Book"],
+    ]
+    assert relations[-1].name == "Courses"
+    assert verify_join(df, relations)[0]
+
+
+# MVDs of different determinants split the table one after the other, and the relations left
+# have nothing to split on and join back losslessly
+def test_4NF_splits_on_each_determinant():
+    hobbies = {"s1": ["chess", "golf"], "s2": ["golf"], "s3": ["piano", "chess"]}
+    teachers = {"DB": ["t1", "t2"], "OS": ["t3"], "AI": ["t1", "t4"]}
+    enrolled = [("s1", "DB"), ("s1", "OS"), ("s2", "DB"), ("s3", "AI"), ("s3", "OS")]
+    rows = [
+        (student, course, teacher, hobby)
+        for student, course in enrolled
+        for teacher, hobby in itertools.product(teachers[course], hobbies[student])
+    ]
+    df = pd.DataFrame(rows, columns=["Student", "Course", "Teacher", "Hobby"])
+    relation = Relation(df, list(df.columns), [], [], "Enrolment", None)
+    MVDs = [
+        MultiValuedDependency("Course ->> Teacher"),
+        MultiValuedDependency("Student ->> Hobby"),
+    ]
+
+    relations, stats = decompose_4NF([relation], MVDs)
+
+    assert stats["steps"] == 2
+    assert [(r.name, r.key) for r in relations] == [
+        ("Teacher_1", ["Course", "Teacher"]),
+        ("Hobby_2", ["Student", "Hobby"]),
+        ("Enrolment", ["Student", "Course"]),
+    ]
+    assert decompose_4NF(relations, MVDs)[1]["steps"] == 0
+    assert verify_join(df, relations)[0]
+    assert verify_decomposition(relations, [], MVDs, relation.key) == (True, [])
+
+
+# An MVD that does not hold in the table does not split it
+def test_4NF_skips_MVD_failing_on_data():
+    df = courses().drop(index=0)
+    relation = Relation(df, list(df.columns), [], [], "Courses", None)
+    MVDs = [MultiValuedDependency("Course ->> Teacher")]
+
+    relations, stats = decompose_4NF([relation], MVDs)
+
+    assert stats["steps"] == 0
+    assert relations == [relation]
+
+
+# A partial dependency on the key moves to a relation named after the source
+def test_2NF_moves_partial_dependency():
+    df = courses()
+    FDs = [FunctionalDependency("Course -> Room")]
+    relation = Relation(df, ["Course", "Teacher", "Book"], FDs, [], "Courses", None)
+
+    relations = transform_to_2NF([relation])
+
+    assert [(r.name, list(r.table.columns), r.key) for r in relations] == [
+        ("Courses_1", ["Course", "Room"], ["Course"]),
+        ("Courses", ["Course", "Teacher", "Book"], ["Course", "Teacher", "Book"]),
+    ]
+    assert [fd.fd for fd in relations[0].FDs] == ["Course -> Room"]
+    assert len(relations[1].FDs) == 0
+
+
+# Synthesis makes one relation per determinant of the minimal cover, each in 3NF, and keeps
+# the source name for the one holding the key; the relations join back and keep every FD
+def test_3NF_synthesis_from_minimal_cover():
+    rows = [(a, a % 3, a % 3 % 2, d, (a + d) % 4) for a in range(6) for d in range(3)]
+    df = pd.DataFrame(rows, columns=["A", "B", "C", "D", "E"])
+    FDs = [
+        FunctionalDependency("A -> B, C"),
+        FunctionalDependency("B -> C"),
+        FunctionalDependency("A, D -> E"),
+    ]
+    relation = Relation(df, ["A", "D"], FDs, [], "R", [])
+
+    relations = synthesize_3NF([relation])
+
+    assert [(r.name, r.key, list(r.table.columns)) for r in relations] == [
+        ("B_1", ["A"], ["A", "B"]),
+        ("C_2", ["B"], ["B", "C"]),
+        ("R", ["A", "D"], ["A", "D", "E"]),
+    ]
+    assert all(classify(r, upto="3NF").satisfies("3NF") for r in relations)
+    assert verify_join(df, relations)[0]
+    assert verify_decomposition(relations, FDs, [], relation.key) == (True, [])
+
+
+# When no determinant schema holds a candidate key, a relation of the key alone is added
+def test_3NF_synthesis_adds_key_relation():
+    df = pd.DataFrame(
+        [(a, a % 2, c, c % 3) for a in range(4) for c in range(5)],
+        columns=["A", "B", "C", "D"],
+    )
+    FDs = [FunctionalDependency("A -> B"), FunctionalDependency("C -> D")]
+    relation = Relation(df, ["A", "C"], FDs, [], "R", [])
+
+    relations = synthesize_3NF([relation])
+
+    source = relations[-1]
+    assert (source.name, list(source.table.columns), len(source.table)) == (
+        "R",
+        ["A", "C"],
+        20,
+    )
+    assert verify_join(df, relations)[0]
+
+
+# A projection holds the distinct rows in their first order, nulls included, and copies rows
+# only when it drops some; keeping the key of the table it copies nothing
+def test_project_deduplicates_once():
+    df = pd.DataFrame(
+        {"A": [1, 1, None, None, 2], "B": ["x", "x", "y", "y", "x"], "C": range(5)}
+    )
+    stats = {"projections": 0, "rows_copied": 0, "bytes_copied": 0}
+
+    projection = project(df, ["B", "A", "B"], stats)
+
+    assert projection.equals(df[["B", "A"]].drop_duplicates())
+    assert stats["projections"] == 1 and stats["rows_copied"] == 3
+    assert list(df.columns) == ["A", "B", "C"] and len(df) == 5
+
+    assert len(project(df, ["C", "A"], stats, key=["C"])) == 5
+    assert stats["projections"] == 2 and stats["rows_copied"] == 3
+
+
+# Projected FDs keep what their determinant reaches among the columns through the others
+def test_project_FDs_by_closure():
+    FDs = [
+        FunctionalDependency("A -> B"),
+        FunctionalDependency("B -> C"),
+        FunctionalDependency("C -> D"),
+    ]
+
+    projected = project_FDs(FDs, ["A", "C", "D"])
+
+    assert [fd.fd for fd in projected] == ["A -> C, D", "C -> D"]
+
+
+# Lookups by attribute follow every change of the list, and an FD listed twice stays found
+# until both are gone
+def test_dependency_list_index_follows_changes():
+    AB, BC, CD = [FunctionalDependency(fd) for fd in ["A -> B", "B -> C", "C -> D"]]
+    FDs = DependencyList([AB, BC, AB])
+
+    assert FDs.with_determinant("A") == [AB]
+    FDs.remove(AB)
+    assert FDs.with_determinant("A") == [AB]
+    FDs.pop()
+    assert FDs.with_determinant("A") == [] and FDs.with_dependent("B") == []
+
+    FDs += [CD]
+    FDs[0] = AB
+    assert FDs == [AB, CD] and FDs.with_dependent("C") == []
+    FDs[:1] = [BC]
+    del FDs[-1]
+    assert FDs.with_determinant("B") == [BC] and FDs.with_determinant("C") == []
+    assert FDs.with_determinant([]) == [BC]
+
+
+# Relations index assigned dependency lists, and find the ones holding all given attributes
+def test_relation_finds_dependencies_by_attribute():
+    df = pd.DataFrame({"A": [1], "B": [1], "C": [1]})
+    relation = Relation(df, ["A"], [], [], "R", None)
+    relation.FDs = [FunctionalDependency("A, B -> C"), FunctionalDependency("A -> B")]
+
+    assert [fd.fd for fd in relation.find_FD_Determinant(["A", "B"])] == ["A, B -> C"]
+    assert [fd.fd for fd in relation.find_FD_Dependent("B")] == ["A -> B"]
+    assert relation.find_relationship("C", ["A", "B"])
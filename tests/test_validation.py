@@ -0,0 +1,173 @@
+import itertools
+import random
+
+import numpy as np
+import pandas as pd
+
+from normalizer import FunctionalDependency, MultiValuedDependency, Relation
+from validation import check_MVD, validate_FDs, validate_MVDs_data, verify_join
+
+
+def orders() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Order": [1, 1, 2, 2, 3],
+            "Customer": ["ann", "ann", "bob", "cid", None],
+            "City": ["Oslo", "Oslo", "Rome", "Rome", None],
+            "Item": ["pen", "ink", "pen", "pen", "cap"],
+        }
+    )
+
+
+# Only the FDs that fail are reported, each with the determinant values and rows breaking it
+def test_FD_validation_reports_failing_groups():
+    FDs = [
+        FunctionalDependency("Order -> Customer"),
+        FunctionalDependency("Order -> City"),
+        FunctionalDependency("Customer -> City"),
+        FunctionalDependency("Order, Item -> Customer"),
+    ]
+    relation = Relation(orders(), ["Order", "Item"], FDs, [], "Orders", None)
+
+    violations = validate_FDs(relation)
+
+    assert [v.fd.fd for v in violations] == [
+        "Order -> Customer",
+        "Order, Item -> Customer",
+    ]
+    assert violations[0].groups.to_dict("list") == {"Order": [2], "rows": [2]}
+    assert violations[1].rows == 2
+
+
+# Nulls are a value of their own, so a null determinant maps to one dependent like any other
+def test_FD_validation_groups_nulls():
+    df = pd.DataFrame({"A": [None, None, 1], "B": ["x", "x", "y"], "C": [1, 2, 3]})
+    FDs = [FunctionalDependency("A -> B"), FunctionalDependency("A -> C")]
+
+    violations = validate_FDs(Relation(df, ["C"], FDs, [], "T", None))
+
+    assert [v.fd.fd for v in violations] == ["A -> C"]
+    assert np.isnan(violations[0].groups["A"][0])
+
+
+# An FD naming a column the table lacks is reported with it, and the others are still checked
+def test_FD_validation_reports_unknown_attributes():
+    FDs = [
+        FunctionalDependency("Order -> Region"),
+        FunctionalDependency("Order -> City"),
+    ]
+
+    violations = validate_FDs(Relation(orders(), ["Order"], FDs, [], "Orders", None))
+
+    assert len(violations) == 1
+    assert violations[0].unknown == ["Region"]
+    assert violations[0].rows == 0
+
+
+# Courses of a teacher combine freely with the teacher's books: Teacher ->> Course holds
+def teaching() -> pd.DataFrame:
+    rows = [
+        (teacher, course, book)
+        for teacher, courses, books in [
+            ("t1", ["math", "cs"], ["b1", "b2"]),
+            ("t2", ["bio"], ["b1", "b3", "b4"]),
+        ]
+        for course, book in itertools.product(courses, books)
+    ]
+    return pd.DataFrame(rows, columns=["Teacher", "Course", "Book"])
+
+
+# An MVD holds while each group is the product of its two sides, and a missing combination
+# is counted in the group that lacks it
+def test_MVD_check_counts_missing_combinations():
+    mvd = MultiValuedDependency("Teacher ->> Course")
+    df = teaching()
+    assert check_MVD(df, mvd) is None
+
+    violation = check_MVD(df.drop(index=1), mvd)
+
+    assert violation.missing == 1
+    assert violation.groups.to_dict("list") == {
+        "Teacher": ["t1"],
+        "XY": [2],
+        "XZ": [2],
+        "XYZ": [3],
+    }
+
+
+# MVD X ->> Y holds exactly when the table equals the join of its XY and XZ projections
+def test_MVD_check_matches_projection_join():
+    rng = random.Random(4)
+    for _ in range(40):
+        df = pd.DataFrame(
+            [[rng.randint(0, 2) for _ in range(4)] for _ in range(rng.randint(2, 12))],
+            columns=["A", "B", "C", "D"],
+        ).drop_duplicates()
+        joined = df[["A", "B"]].drop_duplicates().merge(df[["A", "C", "D"]])
+
+        holds = check_MVD(df, MultiValuedDependency("A ->> B")) is None
+
+        assert holds == (len(joined.drop_duplicates()) == len(df))
+
+
+# Trivial MVDs hold, and an MVD naming a column the table lacks is reported with it
+def test_MVD_validation_trivial_and_unknown():
+    MVDs = [
+        MultiValuedDependency("Teacher ->> Course, Book"),
+        MultiValuedDependency("Teacher ->> Room"),
+        MultiValuedDependency("Book ->> Course"),
+    ]
+    relation = Relation(teaching(), ["Course", "Book"], [], MVDs, "Teaching", None)
+
+    violations = validate_MVDs_data(relation)
+
+    assert [v.mvd.mvd for v in violations] == ["Teacher ->> Room", "Book ->> Course"]
+    assert violations[0].unknown == ["Room"]
+
+
+def split(df: pd.DataFrame, *parts: list[str]) -> list[Relation]:
+    return [
+        Relation(df[part].drop_duplicates(), part[:1], [], [], "R" + str(i), None)
+        for i, part in enumerate(parts)
+    ]
+
+
+# A lossless split joins back to the distinct rows, in one partition or in several
+def test_join_back_of_lossless_split():
+    df = pd.concat([teaching(), teaching()], ignore_index=True)
+    relations = split(df, ["Teacher", "Course"], ["Teacher", "Book"])
+
+    for partition_rows in [1_000_000, 2]:
+        joined, stats = verify_join(df, relations, partition_rows)
+
+        assert joined
+        assert stats["rows"] == stats["joined_rows"] == 7
+    assert stats["partitions"] > 1
+
+
+# Spurious rows of a lossy split, a column no relation holds and a value the table lacks
+# all fail the join back
+def test_join_back_failures():
+    df = orders()
+    assert not verify_join(df, split(df, ["Order", "Customer"], ["Customer", "Item"]))[
+        0
+    ]
+
+    joined, stats = verify_join(df, split(df, ["Order", "Customer", "Item"]))
+    assert not joined and stats["missing_columns"] == ["City"]
+
+    relations = split(df, ["Order", "Customer", "City", "Item"])
+    relations[0].table.loc[0, "Item"] = "mug"
+    joined, stats = verify_join(df, relations)
+    assert not joined and stats["unknown_values"] == 1
+
+
+# Dictionary-encoded tables with nulls join back through their shared codes
+def test_join_back_of_categorical_table():
+    df = orders().astype({"Customer": "category", "City": "category"})
+
+    lossless = split(df, ["Order", "Customer", "City"], ["Order", "Item"])
+    lossy = split(df, ["Order", "Item"], ["Item", "Customer", "City"])
+
+    assert verify_join(df, lossless)[0]
+    assert not verify_join(df, lossy)[0]
@@ -0,0 +1,93 @@
+import json
+
+import pandas as pd
+import pytest
+
+from normalizer import FunctionalDependency, Relation
+from writers import file_names, write_relations
+
+
+# An encoded relation holding a null, and an empty one whose file name clashes with it
+def relations() -> list[Relation]:
+    people = pd.DataFrame(
+        {
+            "ID": [1, 2, 3, 4, 5],
+            "City": pd.Series(["Oslo", "Rome", None, "Oslo", "Rome"]).astype(
+                "category"
+            ),
+        }
+    )
+    FDs = [FunctionalDependency("ID -> City")]
+    empty = pd.DataFrame({"City": pd.Series([], dtype=str)})
+    return [
+        Relation(people, ["ID"], FDs, [], "People: main", None),
+        Relation(empty, ["City"], [], [], "People/main", None),
+    ]
+
+
+# Names are made safe for files and kept apart when they clash, whatever their case
+def test_file_names():
+    assert file_names(["A B", "a/b", "..", "x.y"]) == [
+        "A_B",
+        "a_b_2",
+        "relation",
+        "x.y",
+    ]
+
+
+# Chunks written one after another read back as the table, with encoded columns written as
+# their values, and the manifest lists every relation
+def test_CSV_written_in_chunks(tmp_path):
+    manifest = write_relations(
+        relations(), str(tmp_path), "csv", chunk_rows=2, normal_form="BCNF"
+    )
+
+    people = pd.read_csv(tmp_path / "People_main.csv")
+    assert people["ID"].tolist() == [1, 2, 3, 4, 5]
+    assert people["City"].fillna("").tolist() == ["Oslo", "Rome", "", "Oslo", "Rome"]
+    assert (tmp_path / "People_main_2.csv").read_text() == "City\n"
+
+    schema = json.loads((tmp_path / "schema.json").read_text())
+    assert schema["normal_form"] == manifest["normal_form"] == "BCNF"
+    first, second = schema["relations"]
+    assert (first["name"], first["file"], first["rows"]) == (
+        "People: main",
+        "People_main.csv",
+        5,
+    )
+    assert first["columns"] == [
+        {"name": "ID", "type": "int64"},
+        {"name": "City", "type": "str"},
+    ]
+    assert first["key"] == ["ID"] and first["FDs"] == ["ID -> City"]
+    assert second["rows"] == 0
+
+
+# JSON Lines hold one object per row
+def test_JSON_lines(tmp_path):
+    write_relations(relations(), str(tmp_path), "json", chunk_rows=2)
+
+    lines = (tmp_path / "People_main.jsonl").read_text().splitlines()
+    assert [json.loads(line) for line in lines][1:3] == [
+        {"ID": 2, "City": "Rome"},
+        {"ID": 3, "City": None},
+    ]
+    assert len(lines) == 5
+    assert (tmp_path / "People_main_2.jsonl").read_text() == ""
+
+
+# Parquet keeps the encoded columns as dictionary columns, in one row group per chunk
+def test_parquet_row_groups(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+
+    write_relations(relations(), str(tmp_path), "parquet", chunk_rows=2)
+
+    file = parquet.ParquetFile(tmp_path / "People_main.parquet")
+    assert file.metadata.num_row_groups == 3
+    assert file.read().to_pandas()["ID"].tolist() == [1, 2, 3, 4, 5]
+
+
+# Only the formats there are writers for can be chosen
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError, match="Unknown output format xml"):
+        write_relations(relations(), str(tmp_path), "xml")
@@ -0,0 +1,414 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from form_finder import factorize_column, group_codes
+from ingest import dictionary_codes
+
+
+# The rows of a table that break one functional dependency. The determinant values are only
+# looked up when they are asked for, so validating many failing FDs stays cheap. An FD that
+# names attributes the table lacks cannot be checked and has no rows, only those attributes.
+class FDViolation:
+    def __init__(
+        self,
+        fd,
+        table: pd.DataFrame,
+        first_rows: np.ndarray,
+        row_counts: np.ndarray,
+        unknown: list[str] = None,
+    ):
+        self.fd = fd  # The FD that does not hold
+        self.table = table  # The table the FD was checked against
+        self.first_rows = (
+            first_rows  # One row position for each violating determinant value
+        )
+        self.row_counts = (
+            row_counts  # Number of rows with each violating determinant value
+        )
+        self.unknown = unknown or []  # Attributes of the FD that are not in the table
+
+    # Number of rows whose determinant value maps to more than one dependent value
+    @property
+    def rows(self) -> int:
+        return int(self.row_counts.sum())
+
+    # The violating determinant values with the number of rows that carry each of them
+    @property
+    def groups(self) -> pd.DataFrame:
+        values = (
+            self.table[self.fd.determinants]
+            .iloc[self.first_rows]
+            .reset_index(drop=True)
+        )
+        values["rows"] = self.row_counts
+        return values
+
+    def print(self, limit: int = 5):
+        if self.unknown:
+            print(
+                self.fd.fd,
+                "names attributes not in the table:",
+                ", ".join(self.unknown),
+            )
+            return
+        print(
+            self.fd.fd,
+            "fails for",
+            len(self.first_rows),
+            "determinant values,",
+            self.rows,
+            "rows",
+        )
+        print(self.groups.head(limit).to_string(index=False))
+
+
+# Check every FD of the relation against its table in one batched pass. Each column is
+# factorized once and each distinct determinant is grouped once; FDs sharing a determinant
+# share that grouping, and each dependent attribute is compared once per determinant.
+# Returns one FDViolation per FD that does not hold. An FD naming attributes the table lacks
+# is skipped and reported by a violation listing them, and the other FDs are still checked.
+def validate_FDs(relation) -> list[FDViolation]:
+    df = relation.table
+    cache = {}
+
+    violations = []
+    by_determinant = {}
+    for fd in relation.FDs:
+        unknown = [
+            col
+            for col in dict.fromkeys(fd.determinants + fd.dependents)
+            if col not in df.columns
+        ]
+        if len(unknown) > 0:
+            empty = np.zeros(0, dtype=np.int64)
+            violations.append(FDViolation(fd, df, empty, empty, unknown))
+            continue
+        by_determinant.setdefault(tuple(fd.determinants), []).append(fd)
+
+    for determinant, FDs in by_determinant.items():
+        columns = list(determinant)
+        if len(df) == 0:
+            continue
+
+        # Group by determinant value, hashing only when the mixed radix ids span too wide a range
+        group = group_codes(df, columns, cache)
+        if group.max() >= 4 * len(df) + 1024:
+            group, _ = pd.factorize(group)
+        size = int(group.max()) + 1
+        row_counts = np.bincount(group, minlength=size)
+
+        # Any row of a group can stand for it; when indices repeat one of the writes is kept
+        representative = np.zeros(size, dtype=np.int64)
+        representative[group] = np.arange(len(group))
+
+        # A group breaks X -> A when any of its rows has a different A than its representative
+        varies = {}
+        for fd in FDs:
+            for col in fd.dependents:
+                if col not in varies:
+                    codes = factorize_column(df, col, cache)[0]
+                    differs = codes != codes[representative][group]
+                    varies[col] = np.zeros(size, dtype=bool)
+                    varies[col][group[differs]] = True
+
+        for fd in FDs:
+            failing = np.flatnonzero(
+                np.logical_or.reduce([varies[col] for col in fd.dependents])
+            )
+            if len(failing) > 0:
+                violations.append(
+                    FDViolation(fd, df, representative[failing], row_counts[failing])
+                )
+
+    return violations
+
+
+# The determinant values for which a multivalued dependency X ->> Y does not hold. In such
+# a group the Y values and the Z values (all other attributes) do not combine freely: fewer
+# distinct XYZ rows exist than the product of the distinct XY and XZ rows. An MVD that names
+# attributes the table lacks cannot be checked and has no groups, only those attributes.
+class MVDViolation:
+    def __init__(
+        self,
+        mvd,
+        table: pd.DataFrame,
+        first_rows: np.ndarray,
+        dependent_counts: np.ndarray,
+        rest_counts: np.ndarray,
+        row_counts: np.ndarray,
+        unknown: list[str] = None,
+    ):
+        self.mvd = mvd  # The MVD that does not hold
+        self.table = table  # The table the MVD was checked against
+        self.first_rows = (
+            first_rows  # One row position for each violating determinant value
+        )
+        self.dependent_counts = (
+            dependent_counts  # Distinct XY values of each violating group
+        )
+        self.rest_counts = rest_counts  # Distinct XZ values of each violating group
+        self.row_counts = row_counts  # Distinct XYZ values of each violating group
+        self.unknown = unknown or []  # Attributes of the MVD that are not in the table
+
+    # Combinations of Y and Z values that the MVD requires but the table does not contain
+    @property
+    def missing(self) -> int:
+        return int((self.dependent_counts * self.rest_counts - self.row_counts).sum())
+
+    # The violating determinant values with the cardinalities that were compared
+    @property
+    def groups(self) -> pd.DataFrame:
+        values = (
+            self.table[self.mvd.determinants]
+            .iloc[self.first_rows]
+            .reset_index(drop=True)
+        )
+        values["XY"] = self.dependent_counts
+        values["XZ"] = self.rest_counts
+        values["XYZ"] = self.row_counts
+        return values
+
+    def print(self, limit: int = 5):
+        if self.unknown:
+            print(
+                self.mvd.mvd,
+                "names attributes not in the table:",
+                ", ".join(self.unknown),
+            )
+            return
+        print(
+            self.mvd.mvd,
+            "fails for",
+            len(self.first_rows),
+            "determinant values,",
+            self.missing,
+            "missing rows",
+        )
+        print(self.groups.head(limit).to_string(index=False))
+
+
+# Count the distinct values of the given columns inside each group of a grouping
+def distinct_per_group(
+    df: pd.DataFrame, columns: list[str], group: np.ndarray, size: int, cache: dict
+) -> np.ndarray:
+    ids = group_codes(df, columns, cache)
+    if ids.max() >= 4 * len(df) + 1024:
+        ids, _ = pd.factorize(ids)
+    span = int(ids.max()) + 1
+    representative = np.zeros(span, dtype=np.int64)
+    representative[ids] = np.arange(len(ids))
+    present = np.flatnonzero(np.bincount(ids, minlength=span))
+    return np.bincount(group[representative[present]], minlength=size)
+
+
+# Check one MVD X ->> Y against a table without building any cross product. X ->> Y holds
+# exactly when every X group has |pi_XYZ| = |pi_XY| * |pi_XZ|, where Z is every other
+# column, and the three counts come from grouped distinct counting. Returns None when it holds,
+# and a violation listing the attributes the table lacks when the MVD cannot be checked.
+def check_MVD(df: pd.DataFrame, mvd, cache: dict = None) -> MVDViolation:
+    if cache is None:
+        cache = {}
+    unknown = [
+        col
+        for col in dict.fromkeys(mvd.determinants + mvd.dependents)
+        if col not in df.columns
+    ]
+    if len(unknown) > 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return MVDViolation(mvd, df, empty, empty, empty, empty, unknown)
+
+    determinant = list(dict.fromkeys(mvd.determinants))
+    dependent = [col for col in dict.fromkeys(mvd.dependents) if col not in determinant]
+    rest = [
+        col for col in df.columns if col not in determinant and col not in dependent
+    ]
+
+    # Trivial MVDs hold on every table
+    if len(df) == 0 or len(dependent) == 0 or len(rest) == 0:
+        return None
+
+    group = group_codes(df, determinant, cache)
+    if group.max() >= 4 * len(df) + 1024:
+        group, _ = pd.factorize(group)
+    size = int(group.max()) + 1
+
+    dependent_counts = distinct_per_group(
+        df, determinant + dependent, group, size, cache
+    )
+    rest_counts = distinct_per_group(df, determinant + rest, group, size, cache)
+    row_counts = distinct_per_group(
+        df, determinant + dependent + rest, group, size, cache
+    )
+
+    failing = np.flatnonzero(row_counts < dependent_counts * rest_counts)
+    if len(failing) == 0:
+        return None
+
+    representative = np.zeros(size, dtype=np.int64)
+    representative[group] = np.arange(len(group))
+    return MVDViolation(
+        mvd,
+        df,
+        representative[failing],
+        dependent_counts[failing],
+        rest_counts[failing],
+        row_counts[failing],
+    )
+
+
+# Check every MVD of the relation against its table, sharing column codes between MVDs.
+# Returns one MVDViolation per MVD that does not hold or names attributes the table lacks;
+# such an MVD is skipped and the others are still checked.
+def validate_MVDs_data(relation) -> list[MVDViolation]:
+    df = relation.table
+    cache = {}
+    violations = []
+    for mvd in relation.MVDs:
+        violation = check_MVD(df, mvd, cache)
+        if violation is not None:
+            violations.append(violation)
+    return violations
+
+
+# Pick the order to join relations back in. The first relation is the one whose columns hold
+# the keys of most others, and each next one is preferably joined on its own key, so joins
+# follow key lookups and do not multiply rows.
+def plan_joins(relations: list) -> list[int]:
+    columns = [set(relation.table.columns) for relation in relations]
+    keys = [set(relation.key or relation.table.columns) for relation in relations]
+
+    def covered(i: int) -> int:
+        return sum(1 for j in range(len(relations)) if j != i and keys[j] <= columns[i])
+
+    first = max(
+        range(len(relations)), key=lambda i: (covered(i), len(relations[i].table))
+    )
+    order = [first]
+    joined = set(columns[first])
+    remaining = [i for i in range(len(relations)) if i != first]
+    while remaining:
+        best = max(
+            remaining, key=lambda i: (keys[i] <= joined, len(columns[i] & joined))
+        )
+        order.append(best)
+        joined |= columns[best]
+        remaining.remove(best)
+    return order
+
+
+# Hash each row of integer codes into one 64 bit value
+def row_hashes(codes: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(codes, index=False).to_numpy()
+
+
+# Check that joining the relations back together gives exactly the distinct rows of the
+# original table. Every value is replaced by its code in the original table, relations are
+# joined by hash lookups on those codes in the planned order, and the result is compared by
+# a multiset hash (row count and wrapping sum of row hashes) instead of being sorted.
+# The first relation is joined in partitions by the hash of its key so no more than about
+# partition_rows of the join exist at once. Returns whether the table is reconstructed and
+# statistics of the run.
+def verify_join(
+    table: pd.DataFrame, relations: list, partition_rows: int = 1_000_000
+) -> tuple[bool, dict]:
+    start = time.perf_counter()
+    columns = list(table.columns)
+    joined_columns = set(
+        col for relation in relations for col in relation.table.columns
+    )
+    stats = {
+        "rows": 0,
+        "joined_rows": 0,
+        "partitions": 0,
+        "missing_columns": [col for col in columns if col not in joined_columns],
+        "unknown_values": 0,
+        "seconds": 0.0,
+    }
+
+    # Codes of the original table, and the distinct rows it should be rebuilt into.
+    # Dictionary-encoded columns already hold their codes.
+    uniques = {}
+    dictionaries = {}
+    source = {}
+    for col in columns:
+        column = table[col]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            source[col], size = dictionary_codes(column)
+            dictionaries[col] = (column.cat.categories, size)
+            values = column.cat.categories
+            if column.hasnans:
+                values = values.append(pd.Index([np.nan]))
+        else:
+            source[col], values = pd.factorize(column, use_na_sentinel=False)
+        uniques[col] = pd.Index(values)
+    expected = pd.unique(row_hashes(pd.DataFrame(source)))
+    stats["rows"] = len(expected)
+    expected_sum = int(expected.sum())
+
+    # The relations as codes of the original table; a value the table lacks cannot match
+    encoded = []
+    for relation in relations:
+        codes = {}
+        for col in relation.table.columns:
+            if col not in uniques:
+                continue
+            column = relation.table[col]
+            if (
+                col in dictionaries
+                and isinstance(column.dtype, pd.CategoricalDtype)
+                and column.cat.categories.equals(dictionaries[col][0])
+            ):
+                # A projection of the table shares its dictionary, and so its codes;
+                # only a null the table lacks falls outside them
+                size = dictionaries[col][1]
+                codes[col] = dictionary_codes(column)[0]
+                codes[col] = np.where(codes[col] < size, codes[col], -1)
+            else:
+                codes[col] = uniques[col].get_indexer(column)
+            stats["unknown_values"] += int((codes[col] < 0).sum())
+        encoded.append(pd.DataFrame(codes))
+    if stats["missing_columns"] or stats["unknown_values"]:
+        stats["seconds"] = time.perf_counter() - start
+        return False, stats
+
+    order = plan_joins(relations)
+    first = encoded[order[0]]
+    partitions = max(1, -(-len(first) // partition_rows))
+    stats["partitions"] = partitions
+    key = [col for col in (relations[order[0]].key or []) if col in first.columns]
+    part = row_hashes(first[key or list(first.columns)]) % partitions
+
+    # Relations joined on their key are unique on it, so the lookup index is built once
+    lookups = {}
+
+    joined_sum = 0
+    for p in range(partitions):
+        frame = first[part == p].reset_index(drop=True)
+        for i in order[1:]:
+            right = encoded[i]
+            on = [col for col in right.columns if col in frame.columns]
+            if len(on) == 0:
+                frame = frame.merge(right, how="cross")
+                continue
+            if i not in lookups:
+                index = pd.Index(row_hashes(right[on]))
+                lookups[i] = (on, index if index.is_unique else None)
+            on, index = lookups[i]
+            if index is None:
+                frame = frame.merge(right, on=on, how="inner")
+                continue
+            position = index.get_indexer(row_hashes(frame[on]))
+            found = position >= 0
+            frame = frame[found].reset_index(drop=True)
+            rest = right.drop(columns=on).iloc[position[found]].reset_index(drop=True)
+            frame = pd.concat([frame, rest], axis=1)
+
+        # Equal rows share their first relation row, so they meet in the same partition
+        hashes = pd.unique(row_hashes(frame[columns]))
+        stats["joined_rows"] += len(hashes)
+        joined_sum = (joined_sum + int(hashes.sum())) % 2**64
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats["joined_rows"] == stats["rows"] and joined_sum == expected_sum, stats
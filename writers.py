@@ -0,0 +1,169 @@
+# Writing the normalized relations as data files. Every relation is streamed to a file of its
+# own in chunks of rows, so only one chunk of a dictionary-encoded table is turned back into
+# values at a time and writing never holds a second copy of the table. The formats are CSV,
+# JSON Lines and Parquet (with pyarrow, when it is installed); a schema.json manifest lists
+# every relation with its file, columns, key, dependencies and row count.
+import json
+import os
+import re
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+# Streams the chunks of one table to a file: open, write every chunk in order, then close
+class RelationWriter:
+    extension = None
+
+    def __init__(self, path: str):
+        self.path = path  # The file written
+
+    def open(self):
+        self.file = open(self.path, "w", encoding="utf8", newline="")
+
+    def write(self, chunk: pd.DataFrame, first: bool):
+        raise NotImplementedError
+
+    def close(self):
+        self.file.close()
+
+
+class CSVWriter(RelationWriter):
+    extension = ".csv"
+
+    def write(self, chunk: pd.DataFrame, first: bool):
+        chunk.to_csv(self.file, header=first, index=False)
+
+
+# One JSON object per row and per line
+class JSONWriter(RelationWriter):
+    extension = ".jsonl"
+
+    def write(self, chunk: pd.DataFrame, first: bool):
+        if len(chunk) > 0:
+            self.file.write(chunk.to_json(orient="records", lines=True).rstrip("\n"))
+            self.file.write("\n")
+
+
+# One row group per chunk. Categorical columns are stored as Parquet dictionary columns, so
+# the encoded values are written as they are.
+class ParquetWriter(RelationWriter):
+    extension = ".parquet"
+
+    def open(self):
+        if not HAS_PYARROW:
+            raise ImportError("Writing Parquet files requires pyarrow")
+        self.file = None
+
+    def write(self, chunk: pd.DataFrame, first: bool):
+        batch = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+        if self.file is None:
+            self.file = pyarrow.parquet.ParquetWriter(self.path, batch.schema)
+        self.file.write_table(batch.cast(self.file.schema))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+WRITERS = {"csv": CSVWriter, "json": JSONWriter, "parquet": ParquetWriter}
+
+
+# A file name for every relation name, with characters that are not safe in file names
+# replaced and a number appended to names already taken
+def file_names(names: list[str]) -> list[str]:
+    taken = set()
+    files = []
+    for name in names:
+        base = re.sub(r"[^\w.-]+", "_", name).strip("._") or "relation"
+        file = base
+        suffix = 1
+        while file.lower() in taken:
+            suffix += 1
+            file = base + "_" + str(suffix)
+        taken.add(file.lower())
+        files.append(file)
+    return files
+
+
+# Stream a table to a file with the writer, chunk_rows rows at a time. Returns the rows and
+# bytes written and the time taken.
+def write_table(
+    table: pd.DataFrame, writer: RelationWriter, chunk_rows: int
+) -> tuple[int, int, float]:
+    start = time.perf_counter()
+    writer.open()
+    try:
+        for offset in range(0, max(len(table), 1), chunk_rows):
+            writer.write(table.iloc[offset : offset + chunk_rows], offset == 0)
+    finally:
+        writer.close()
+    return len(table), os.path.getsize(writer.path), time.perf_counter() - start
+
+
+# The type of a column's values, the type of its dictionary for encoded columns
+def column_type(column: pd.Series) -> str:
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return str(column.cat.categories.dtype)
+    return str(column.dtype)
+
+
+# Write every relation to a file of the format ("csv", "json" or "parquet") in directory, and
+# a schema.json manifest of the relations. Returns the manifest, with the rows, bytes,
+# seconds, rows per second and bytes per second of every relation written.
+def write_relations(
+    relations: list,
+    directory: str,
+    format: str = "csv",
+    chunk_rows: int = 100_000,
+    normal_form: str = None,
+    highest_form: str = None,
+) -> dict:
+    if format not in WRITERS:
+        raise ValueError(
+            "Unknown output format " + format + ", choose one of " + ", ".join(WRITERS)
+        )
+    writer_class = WRITERS[format]
+    os.makedirs(directory, exist_ok=True)
+
+    manifest = {
+        "normal_form": normal_form,
+        "highest_normal_form": highest_form,
+        "format": format,
+        "relations": [],
+    }
+    names = file_names([relation.name for relation in relations])
+    for relation, name in zip(relations, names):
+        writer = writer_class(os.path.join(directory, name + writer_class.extension))
+        rows, size, seconds = write_table(relation.table, writer, chunk_rows)
+        manifest["relations"].append(
+            {
+                "name": relation.name,
+                "file": os.path.basename(writer.path),
+                "columns": [
+                    {"name": col, "type": column_type(relation.table[col])}
+                    for col in relation.table.columns
+                ],
+                "key": list(relation.key) if relation.key is not None else None,
+                "FDs": [fd.fd for fd in relation.FDs],
+                "MVDs": [mvd.mvd for mvd in relation.MVDs],
+                "rows": rows,
+                "bytes": size,
+                "seconds": round(seconds, 6),
+                "rows_per_second": int(rows / seconds) if seconds > 0 else None,
+                "bytes_per_second": int(size / seconds) if seconds > 0 else None,
+            }
+        )
+
+    with open(os.path.join(directory, "schema.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    return manifest